@@ -0,0 +1 @@
+"""Data and analysis layer behind the ElectraPulse dashboard (``main.py``)."""
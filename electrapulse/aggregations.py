@@ -0,0 +1,180 @@
+"""Every dashboard rollup from one pass over the registration frame.
+
+The frame is grouped once by all dimensions the charts use into a *cube*: one
+row per distinct (year, county, city, make, model, type) combination with a
+vehicle count and an ``Electric Range`` sum. The cube is orders of magnitude
+smaller than the frame, and every chart's rollup is a cheap re-aggregation of
+it. Cubes are additive, so partial cubes (chunks, partitions, deltas) merge
+by summing.
+
+:class:`Cells` keeps the cube cell of every row, so the cube of any subset of
+rows (a filtered view) is a ``bincount`` over that subset's positions rather
+than a new groupby over a copied frame.
+"""
+from dataclasses import dataclass
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from electrapulse import settings
+from electrapulse.memo import derived
+
+DIMENSIONS = ('Model Year', 'County', 'City', 'Make', 'Model', 'Electric Vehicle Type')
+MEASURES = ('count', 'range_sum')
+VEHICLES = 'Number of Vehicles'
+
+
+@dataclass(frozen=True, eq=False)
+class Cells:
+    """The cube cell of every row of a frame, and each cell's dimension values."""
+    ids: np.ndarray
+    keys: pd.DataFrame
+    ranges: np.ndarray
+
+    @classmethod
+    def build(cls, frame):
+        ids = frame.groupby(list(DIMENSIONS), observed=True, sort=False).ngroup()
+        # Rows with a missing dimension (cleaned frames have none) go to a
+        # trailing cell that is never reported.
+        cells = int(ids.max()) + 1 if ids.notna().any() else 0
+        ids = ids.fillna(-1).to_numpy(dtype=np.int32)
+        ids[ids < 0] = cells
+        _, first = np.unique(ids, return_index=True)
+        keys = frame.iloc[first[:cells]][list(DIMENSIONS)].reset_index(drop=True)
+        for name in DIMENSIONS:
+            if isinstance(keys[name].dtype, pd.CategoricalDtype):
+                # Plain labels, so cubes built from differently-encoded chunks merge.
+                keys[name] = keys[name].astype(str)
+        return cls(ids=ids, keys=keys, ranges=frame['Electric Range'].to_numpy(dtype=np.float64))
+
+    def cube(self, positions=None):
+        """The cube of all rows, or of the rows at ``positions``."""
+        ids, ranges = self.ids, self.ranges
+        if positions is not None:
+            ids, ranges = ids[positions], ranges[positions]
+        cells = len(self.keys)
+        counts = np.bincount(ids, minlength=cells + 1)[:cells]
+        sums = np.bincount(ids, weights=ranges, minlength=cells + 1)[:cells]
+        cube = self.keys.assign(count=counts.astype(np.int64), range_sum=np.rint(sums).astype(np.int64))
+        return cube[counts > 0].reset_index(drop=True)
+
+
+def build_cube(frame):
+    """Group ``frame`` by every dimension, counting rows and summing range."""
+    return Cells.build(frame).cube()
+
+
+def merge_cubes(cubes):
+    """Sum any number of cubes into one; cells that cancel out (negated deltas) are dropped."""
+    combined = pd.concat(cubes, ignore_index=True)
+    merged = combined.groupby(list(DIMENSIONS), sort=False, as_index=False)[list(MEASURES)].sum()
+    return merged[merged['count'] != 0].reset_index(drop=True)
+
+
+def _ranked(series):
+    # Sort by label first so ties rank the same way however the cube was built.
+    return series.sort_index().sort_values(ascending=False, kind='mergesort')
+
+
+@dataclass(frozen=True, eq=False)
+class Rollups:
+    """The aggregates read by the dashboard's chart and metric sections.
+
+    Each aggregate is computed from the cube on first access, so a page that
+    shows one section pays for that section only.
+    """
+    cube: pd.DataFrame
+    top_counties: int = 3
+    top_makes: int = 3
+    top_n: int = 10
+
+    AGGREGATES = ('total', 'mean_range', 'adoption_by_year', 'county_counts', 'type_counts', 'make_counts',
+                  'top_cities', 'top_models', 'range_by_year', 'range_by_model')
+
+    @classmethod
+    def from_cube(cls, cube, top_counties=3, top_makes=3, top_n=10):
+        return cls(cube, top_counties, top_makes, top_n)
+
+    def compute(self):
+        """Compute every aggregate now; returns self."""
+        for name in self.AGGREGATES:
+            getattr(self, name)
+        return self
+
+    @cached_property
+    def total(self):
+        return int(self.cube['count'].sum())
+
+    @cached_property
+    def mean_range(self):
+        return float(self.cube['range_sum'].sum() / self.total) if self.total else float('nan')
+
+    @cached_property
+    def adoption_by_year(self):
+        return self._counts('Model Year')
+
+    @cached_property
+    def county_counts(self):
+        return _ranked(self._counts('County'))
+
+    @cached_property
+    def type_counts(self):
+        return _ranked(self._counts('Electric Vehicle Type'))
+
+    @cached_property
+    def make_counts(self):
+        return _ranked(self._counts('Make'))
+
+    @cached_property
+    def top_cities(self):
+        in_top_counties = self.cube[self.cube['County'].isin(self.county_counts.index[:self.top_counties])]
+        return _ranked(in_top_counties.groupby(['County', 'City'])['count'].sum()) \
+            .head(self.top_n).reset_index(name=VEHICLES)
+
+    @cached_property
+    def top_models(self):
+        return _ranked(self._in_top_makes.groupby(['Make', 'Model'])['count'].sum()) \
+            .head(self.top_n).reset_index(name=VEHICLES)
+
+    @cached_property
+    def range_by_year(self):
+        return _mean_range(self.cube, 'Model Year').reset_index()
+
+    @cached_property
+    def range_by_model(self):
+        return _ranked(_mean_range(self._in_top_makes, ['Make', 'Model'])).head(self.top_n).reset_index()
+
+    @cached_property
+    def _in_top_makes(self):
+        return self.cube[self.cube['Make'].isin(self.make_counts.index[:self.top_makes])]
+
+    def _counts(self, by):
+        return self.cube.groupby(by, sort=True)['count'].sum()
+
+
+def _mean_range(cube, by):
+    sums = cube.groupby(by, sort=True)[list(MEASURES)].sum()
+    return (sums['range_sum'] / sums['count']).rename('Electric Range')
+
+
+@derived
+def cells_for(cleaned):
+    """The :class:`Cells` of a cleaned dataset, built once per data version."""
+    if settings.PARALLEL:
+        # Imported here: the parallel module builds on this one.
+        from electrapulse.parallel import build_cells
+        return build_cells(cleaned.frame)
+    return Cells.build(cleaned.frame)
+
+
+@derived
+def cube_for(cleaned):
+    """The cube of a cleaned dataset, built once per data version."""
+    return cells_for(cleaned).cube()
+
+
+@derived
+def rollups_for(cleaned):
+    """The rollups of a cleaned dataset, built once per data version."""
+    return Rollups.from_cube(cube_for(cleaned))
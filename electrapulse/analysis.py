@@ -0,0 +1,125 @@
+"""Everything the dashboard shows, computed without Streamlit.
+
+:func:`analyze` (in-memory rows) and :func:`analyze_partials` (streamed
+aggregates) produce an :class:`Analysis` for one filter selection. Its
+:meth:`~Analysis.figures` lists the charts as ``(builder, *args)`` jobs, which
+the dashboard renders through the figure cache and the batch report renders
+in a process pool, and :meth:`~Analysis.metrics` gives the numbers as JSON.
+"""
+import math
+from dataclasses import dataclass
+
+import pandas as pd
+
+from electrapulse import charts
+from electrapulse.aggregations import Rollups
+from electrapulse.distribution import RangeDistribution, filtered_distribution
+from electrapulse.filters import Selection, filtered_view
+from electrapulse.forecasting import forecast_registrations
+from electrapulse.index import index_for
+
+
+@dataclass(frozen=True, eq=False)
+class Analysis:
+    """Aggregates of one selection and the chart jobs built from them."""
+    cube: pd.DataFrame
+    rollups: Rollups
+    year_counts: pd.Series
+    ranges: RangeDistribution
+    range_filtered: bool = True
+
+    def forecast(self):
+        """Registration forecast of the selection; raises RuntimeError if it has too little history."""
+        return forecast_registrations(self.rollups.adoption_by_year)
+
+    def figure(self, name, forecast=None):
+        """The ``(builder, *args)`` job of chart ``name``, computing only its own aggregate."""
+        if name == 'forecast':
+            return charts.forecast, forecast.history, forecast.as_dict(), forecast.lower, forecast.upper
+        return FIGURES[name](self)
+
+    def figures(self, forecast=None):
+        """``{name: (builder, *args)}`` for every chart, in page order."""
+        names = list(FIGURES) + (['forecast'] if forecast is not None else [])
+        return {name: self.figure(name, forecast) for name in names}
+
+    def metrics(self, forecast=None):
+        """The page's numbers and chart aggregates as JSON-ready values; undefined means are None."""
+        rollups = self.rollups
+        metrics = {
+            'registrations': rollups.total,
+            'mean_range': _scalar(rollups.mean_range),
+            'range_quartiles': dict(zip(('p25', 'p50', 'p75'),
+                                        map(_scalar, self.ranges.quantile([0.25, 0.5, 0.75]).tolist()))),
+            'registrations_by_year': _plain(self.year_counts),
+            'county_counts': _plain(rollups.county_counts),
+            'type_counts': _plain(rollups.type_counts),
+            'make_counts': _plain(rollups.make_counts),
+            'top_cities': _plain(rollups.top_cities),
+            'top_models': _plain(rollups.top_models),
+            'range_by_year': _plain(rollups.range_by_year),
+            'range_by_model': _plain(rollups.range_by_model),
+        }
+        if forecast is not None:
+            metrics['forecast'] = {
+                'model': forecast.model,
+                'level': forecast.level,
+                'resamples': forecast.resamples,
+                'history': _plain(forecast.history),
+                'values': _plain(forecast.values),
+                'lower': _plain(forecast.lower),
+                'upper': _plain(forecast.upper),
+            }
+        return metrics
+
+
+# The job of every chart but the forecast, in page order.
+FIGURES = {
+    'adoption_by_year': lambda analysis: (charts.adoption_by_year, analysis.rollups.adoption_by_year),
+    'top_cities': lambda analysis: (charts.top_cities, analysis.rollups.top_cities),
+    'type_distribution': lambda analysis: (charts.type_distribution, analysis.rollups.type_counts),
+    'top_makes': lambda analysis: (charts.top_makes, analysis.rollups.make_counts.head(10)),
+    'top_models': lambda analysis: (charts.top_models, analysis.rollups.top_models),
+    'range_distribution': lambda analysis: (charts.range_distribution, analysis.ranges.histogram(),
+                                            analysis.ranges.kde(), analysis.rollups.mean_range),
+    'range_by_year': lambda analysis: (charts.range_by_year, analysis.rollups.range_by_year),
+    'range_by_model': lambda analysis: (charts.range_by_model, analysis.rollups.range_by_model),
+}
+
+
+def analyze(cleaned, selection=Selection()):
+    """The :class:`Analysis` of ``selection`` over a cleaned dataset."""
+    view = filtered_view(cleaned, selection)
+    if selection:
+        year_counts = view.rollups.adoption_by_year
+    else:
+        # Per-year row positions; counts are O(1) lookups
+        year_counts = index_for(cleaned, 'Model Year').counts()
+    return Analysis(view.cube, view.rollups, year_counts, filtered_distribution(cleaned, selection))
+
+
+def analyze_partials(partials, selection=Selection()):
+    """The :class:`Analysis` of ``selection`` over streamed partials.
+
+    No rows are kept in streaming mode, so the range distribution always
+    covers every registration.
+    """
+    if selection:
+        cube = selection.apply_to_cube(partials.cube)
+        rollups = Rollups.from_cube(cube)
+    else:
+        cube, rollups = partials.cube, partials.rollups()
+    return Analysis(cube, rollups, rollups.adoption_by_year, partials.ranges, range_filtered=not selection)
+
+
+def _plain(value):
+    """Series as ``{label: value}`` and frames as records, with NumPy scalars unwrapped."""
+    if isinstance(value, pd.DataFrame):
+        return [{column: _scalar(item) for column, item in row.items()} for row in value.to_dict('records')]
+    return {str(label): _scalar(item) for label, item in value.items()}
+
+
+def _scalar(value):
+    """``value`` unwrapped from NumPy, with NaN (the mean of no registrations) as None."""
+    value = value.item() if hasattr(value, 'item') else value
+    return None if isinstance(value, float) and math.isnan(value) else value
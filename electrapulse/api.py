@@ -0,0 +1,274 @@
+"""Headless JSON API over the dashboard's aggregates.
+
+Serves what the page shows, the registrations per model year, county, city,
+type, make and model counts, range by year and model, and the forecast, for
+any filter selection, without running the Streamlit script. Run as::
+
+    python -m electrapulse.api [--port 8600] [--csv Electric_Vehicle_Population_Data.csv]
+
+``GET /api/aggregates`` returns every aggregate and ``/api/aggregates/<name>``
+one of them (a key of :meth:`~electrapulse.analysis.Analysis.metrics`).
+Filters are query arguments, repeatable and matching the sidebar:
+``county``, ``city``, ``make``, ``type`` and ``years=2015-2020``.
+``GET /api/query?q=...`` runs an ad hoc query (:mod:`electrapulse.query`)
+and ``/metrics`` gives :mod:`electrapulse.instrumentation` in Prometheus text.
+
+The aggregates of each data version and selection (or the result of each
+normalized query) are computed once, on a
+worker thread, and published as encoded JSON bodies with a content-hash
+ETag, so answering a request is a dictionary lookup: no pandas, no encoding,
+and a ``304`` when ``If-None-Match`` still matches. Requests that arrive
+while their aggregates are being computed wait for that one computation.
+Computations run on ``ELECTRAPULSE_API_WORKERS`` threads, and once
+``ELECTRAPULSE_API_MAX_PENDING`` are queued or running, requests needing
+another one are turned away with ``503``. The data file's version is checked
+at most every ``ELECTRAPULSE_API_CHECK_SECONDS``; a new version is computed
+on demand like a new selection.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import tornado.web
+
+from electrapulse import instrumentation, settings
+from electrapulse.analysis import analyze, analyze_partials
+from electrapulse.cleaning import clean_dataset
+from electrapulse.filters import Selection
+from electrapulse.instrumentation import count, span
+from electrapulse.loader import file_version, load_dataset
+from electrapulse.query import QueryError, parse, run_query
+from electrapulse.schema import DATA_PATH
+
+# Query argument of each filter field.
+FILTER_ARGUMENTS = {'county': 'counties', 'city': 'cities', 'make': 'makes', 'type': 'types'}
+# Published selections kept per process, least recently used dropped first.
+MAX_PUBLISHED = 256
+
+
+@dataclass(frozen=True, eq=False)
+class Published:
+    """The encoded JSON body and ETag of every aggregate of one data version and selection."""
+    version: tuple
+    documents: dict
+
+    @classmethod
+    def from_metrics(cls, version, metrics):
+        documents = {name: _document(value) for name, value in metrics.items()}
+        documents[''] = _document(metrics)
+        return cls(version, documents)
+
+
+def _document(value):
+    body = json.dumps(value, default=str, separators=(',', ':'), allow_nan=False).encode()
+    return body, '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def compute(path, version, selection, streaming=settings.STREAMING):
+    """The :class:`Published` aggregates of ``selection`` over the data at ``path``."""
+    with span('api.compute'):
+        if streaming:
+            from electrapulse.streaming import load_partials
+            analysis = analyze_partials(load_partials(path), selection)
+        else:
+            analysis = analyze(clean_dataset(load_dataset(path)), selection)
+        try:
+            forecast = analysis.forecast()
+        except RuntimeError:
+            forecast = None
+        return Published.from_metrics(version, analysis.metrics(forecast))
+
+
+def compute_query(path, version, query):
+    """The :class:`Published` result of a parsed ``query`` over the data at ``path``."""
+    result = run_query(query.text(), path)
+    return Published(version, {'': _document({
+        'query': result.query,
+        'columns': result.table.column_names,
+        # NaN is not JSON; a float aggregate of nothing is sent as null.
+        'rows': [{name: None if isinstance(value, float) and math.isnan(value) else value
+                  for name, value in row.items()} for row in result.table.to_pylist()],
+        'rows_scanned': result.rows_scanned,
+        'seconds': result.seconds,
+    })})
+
+
+class Aggregates:
+    """Published aggregates of the data at ``path``, computed on demand and coalesced per key."""
+
+    def __init__(self, path=DATA_PATH, streaming=settings.STREAMING, workers=settings.API_WORKERS,
+                 max_pending=settings.API_MAX_PENDING, check_seconds=settings.API_CHECK_SECONDS):
+        self.path = os.path.abspath(path)
+        self.streaming = streaming
+        self.max_pending = max_pending
+        self.check_seconds = check_seconds
+        self.pending = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='electrapulse-api')
+        self._published = OrderedDict()
+        self._version = None
+        self._checked = float('-inf')
+
+    def version(self):
+        """The data version, re-read from the file at most every ``check_seconds``."""
+        now = time.monotonic()
+        if now - self._checked >= self.check_seconds:
+            self._version = file_version(self.path)
+            self._checked = now
+        return self._version
+
+    def get(self, selection):
+        """A future of the :class:`Published` aggregates of ``selection``; None if too many are pending.
+
+        Only called on the event loop thread, which is what makes the
+        bookkeeping safe without locks.
+        """
+        version = self.version()
+        return self._publish((version, selection), compute, self.path, version, selection, self.streaming)
+
+    def query(self, query):
+        """A future of the :class:`Published` result of a parsed ``query``, like :meth:`get`."""
+        version = self.version()
+        return self._publish((version, 'query', query.text()), compute_query, self.path, version, query)
+
+    def _publish(self, key, fn, *args):
+        future = self._published.get(key)
+        if future is not None:
+            self._published.move_to_end(key)
+            return future
+        if self.pending >= self.max_pending:
+            return None
+        self.pending += 1
+        count('api_computations')
+        future = asyncio.wrap_future(self._executor.submit(fn, *args))
+        future.add_done_callback(lambda done: self._finished(key, done))
+        self._published[key] = future
+        while len(self._published) > MAX_PUBLISHED:
+            self._published.popitem(last=False)
+        return future
+
+    def _finished(self, key, future):
+        self.pending -= 1
+        if future.cancelled() or future.exception() is not None:
+            # Failures are not cached; the next request tries again.
+            if self._published.get(key) is future:
+                del self._published[key]
+
+
+def parse_selection(arguments):
+    """The :class:`Selection` of request query ``arguments`` (``{name: [bytes, ...]}``), normalized.
+
+    Values are sorted so that the same filters in any order share one key.
+    Raises ValueError for a malformed ``years``.
+    """
+    values = {field: tuple(sorted({value.decode() for value in arguments.get(name, ())}))
+              for name, field in FILTER_ARGUMENTS.items()}
+    years = arguments.get('years')
+    if years:
+        first, _, last = years[-1].decode().partition('-')
+        values['years'] = (int(first), int(last or first))
+    return Selection(**values)
+
+
+class AggregatesHandler(tornado.web.RequestHandler):
+
+    def initialize(self, aggregates):
+        self.aggregates = aggregates
+
+    async def get(self, name=''):
+        count('api_requests')
+        try:
+            selection = parse_selection(self.request.query_arguments)
+            future = self.aggregates.get(selection)
+        except ValueError as error:
+            raise tornado.web.HTTPError(400, reason=str(error))
+        except OSError:
+            raise tornado.web.HTTPError(503, reason='Data unavailable')
+        await self.respond(future, name)
+
+    async def respond(self, future, name=''):
+        """Send document ``name`` of the :class:`Published` that ``future`` resolves to."""
+        if future is None:
+            count('api_rejected')
+            # Not an HTTPError: error pages drop the headers set so far.
+            self.set_status(503, reason='Too many aggregations pending')
+            self.set_header('Retry-After', '1')
+            return
+        try:
+            published = await future
+        except QueryError as error:
+            raise tornado.web.HTTPError(400, reason=str(error))
+        except Exception:
+            raise tornado.web.HTTPError(500, reason='Aggregation failed')
+        document = published.documents.get(name)
+        if document is None:
+            raise tornado.web.HTTPError(404, reason=f'No aggregate {name!r}')
+        body, etag = document
+        self.set_header('Etag', etag)
+        self.set_header('Cache-Control', 'no-cache')
+        self.set_header('X-Data-Version', '-'.join(map(str, published.version)))
+        if self.check_etag_header():
+            count('api_not_modified')
+            self.set_status(304)
+            return
+        self.set_header('Content-Type', 'application/json')
+        self.write(body)
+
+
+class QueryHandler(AggregatesHandler):
+
+    async def get(self):
+        count('api_queries')
+        try:
+            future = self.aggregates.query(parse(self.get_query_argument('q', '')))
+        except QueryError as error:
+            raise tornado.web.HTTPError(400, reason=str(error))
+        except OSError:
+            raise tornado.web.HTTPError(503, reason='Data unavailable')
+        await self.respond(future)
+
+
+class MetricsHandler(tornado.web.RequestHandler):
+
+    def get(self):
+        self.set_header('Content-Type', 'text/plain; version=0.0.4')
+        self.write(instrumentation.to_prometheus(instrumentation.metrics.snapshot()))
+
+
+def make_app(aggregates):
+    return tornado.web.Application([
+        (r'/api/aggregates/?', AggregatesHandler, {'aggregates': aggregates}),
+        (r'/api/aggregates/([a-z_]+)', AggregatesHandler, {'aggregates': aggregates}),
+        (r'/api/query', QueryHandler, {'aggregates': aggregates}),
+        (r'/metrics', MetricsHandler),
+    ])
+
+
+async def serve(port, path=DATA_PATH, streaming=settings.STREAMING, address=''):
+    aggregates = Aggregates(path, streaming)
+    make_app(aggregates).listen(port, address)
+    # Publish the unfiltered aggregates before the first request asks for them.
+    aggregates.get(Selection())
+    await asyncio.Event().wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the dashboard aggregates as JSON.')
+    parser.add_argument('--port', type=int, default=8600, help='port to listen on (default: %(default)s)')
+    parser.add_argument('--address', default='', help='address to bind (default: all interfaces)')
+    parser.add_argument('--csv', default=DATA_PATH, help='source CSV (default: %(default)s)')
+    parser.add_argument('--streaming', action='store_true', default=settings.STREAMING,
+                        help='aggregate the data out of core, as ELECTRAPULSE_STREAMING does')
+    args = parser.parse_args(argv)
+    print(f'Serving the aggregates of {args.csv} on port {args.port}')
+    asyncio.run(serve(args.port, args.csv, args.streaming, args.address))
+
+
+if __name__ == '__main__':
+    main()
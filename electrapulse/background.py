@@ -0,0 +1,70 @@
+"""Work done off the Streamlit script thread.
+
+The data load runs in the background while the page header is drawn, and,
+with ``ELECTRAPULSE_PREFETCH`` set, afterwards the caches of the sections
+nobody has opened yet are warmed, so that switching sections finds their
+figures already rendered. Urgent jobs
+(what the page is waiting for) have their own worker and never queue behind
+prefetching. Jobs are keyed: submitting a key that is still queued or
+running returns the same future.
+
+Prefetching is best effort and must not pile up behind a crowd of sessions
+changing filters: at most ``MAX_PREFETCH`` prefetch jobs wait in the queue,
+the oldest (those of selections the sessions have likely moved on from) are
+dropped to make room, and a job that comes up while computations wait for
+an admission slot is skipped, leaving the slots to the pages being viewed.
+"""
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from electrapulse.instrumentation import count
+from electrapulse.memory import admission
+
+# Most prefetch jobs waiting to start; older ones are dropped past it.
+MAX_PREFETCH = 16
+
+_urgent = ThreadPoolExecutor(max_workers=1, thread_name_prefix='electrapulse-urgent')
+_prefetch = ThreadPoolExecutor(max_workers=1, thread_name_prefix='electrapulse-prefetch')
+_pending = {}
+_queued = OrderedDict()
+_lock = threading.RLock()
+
+
+def submit(key, fn, *args, urgent=False):
+    """Run ``fn(*args)`` in the background unless ``key`` is already pending; returns its future."""
+    with _lock:
+        future = _pending.get(key)
+        if future is None:
+            future = _pending[key] = (_urgent if urgent else _prefetch).submit(fn, *args)
+            future.add_done_callback(lambda _: _forget(key))
+        return future
+
+
+def prefetch(key, fn, *args):
+    """Like :func:`submit`, for work nobody waits for: bounded, and skipped when slots are contended."""
+    with _lock:
+        if key in _pending:
+            return _pending[key]
+        future = submit(key, _unless_contended, key, fn, *args)
+        _queued[key] = future
+        while len(_queued) > MAX_PREFETCH:
+            _, oldest = _queued.popitem(last=False)
+            if oldest.cancel():
+                count('prefetch_dropped')
+        return future
+
+
+def _unless_contended(key, fn, *args):
+    with _lock:
+        _queued.pop(key, None)
+    if admission.waiting:
+        count('prefetch_skipped')
+        return None
+    return fn(*args)
+
+
+def _forget(key):
+    with _lock:
+        _pending.pop(key, None)
+        _queued.pop(key, None)
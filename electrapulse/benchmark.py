@@ -0,0 +1,293 @@
+"""Benchmark suite over synthetic registration files of growing size.
+
+Run as ``python -m electrapulse.benchmark``. For each size a synthetic CSV
+(:mod:`electrapulse.synthetic`, reused between runs) goes through every stage
+the dashboard runs: CSV and snapshot loading, cleaning, each aggregation,
+ad hoc queries, out-of-core streaming, an incremental refresh from a 1%
+churn release, the rendering of every figure and the forecast fits, plus
+the partitioned aggregation of :mod:`electrapulse.parallel` when there is
+more than one worker.
+Each section records its wall time and how far it raised memory above where
+it started: the resident set's high-water mark, reset before every section
+through ``/proc/self/clear_refs`` on Linux, or else ``tracemalloc``'s peak
+(which only sees Python and NumPy allocations and slows allocation-heavy
+sections several-fold). The results are written as JSON. Given ``--baseline`` (an
+earlier results file), sections that got slower than the tolerance are
+listed and the exit status is 1, so the suite can gate a CI job.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from electrapulse import parallel, settings, snapshot, synthetic
+from electrapulse.aggregations import Cells, Rollups
+from electrapulse.analysis import analyze
+from electrapulse.cleaning import clean
+from electrapulse.distribution import RangeDistribution
+from electrapulse.figcache import encode
+from electrapulse.filters import Selection, filtered_view
+from electrapulse.forecasting import MODELS, bootstrap, forecast_registrations, select_model
+from electrapulse.geo import HEX_SIZES, LocationCells, hex_bins, parse_points
+from electrapulse.index import SegmentIndex
+from electrapulse.loader import clear_cache, load_dataset
+from electrapulse.query import execute, parse
+from electrapulse.refresh import KEY, apply_delta, diff, read_release
+from electrapulse.schema import ANALYSIS_COLUMNS, read_csv
+from electrapulse.segments import forecast_segments
+from electrapulse.streaming import stream_partials
+
+SIZES = (10_000, 100_000, 1_000_000, 10_000_000)
+
+# Ad hoc queries run against the snapshot, over the columns synthetic files have.
+QUERIES = {
+    'group_by': 'SELECT County, Make, count(*) AS n, mean("Electric Range") AS mean_range '
+                'WHERE "Model Year" >= 2018 ORDER BY n DESC LIMIT 20',
+    'bands': 'SELECT bucket("Electric Range", 50) AS band, count(*) AS n WHERE Make IN (\'TESLA\', \'KIA\')',
+    'like': 'SELECT City, count_distinct(Model) AS models WHERE "Electric Vehicle Type" LIKE \'%Battery%\'',
+    'top_rows': 'SELECT Make, Model, City, "Electric Range" WHERE "Model Year" = 2020 '
+                'ORDER BY "Electric Range" DESC LIMIT 10',
+}
+
+# Differences below this many seconds are noise, whatever the ratio.
+NOISE_SECONDS = 0.005
+
+
+class Recorder:
+    """Collects ``{section: {'seconds', 'peak_bytes'}}`` for one run.
+
+    ``memory`` is ``'rss'``, ``'traced'`` or ``None`` (time only).
+    """
+
+    def __init__(self, memory=None):
+        self.memory = memory
+        self.sections = {}
+
+    @contextmanager
+    def section(self, name):
+        if self.memory == 'rss':
+            baseline = _reset_peak_rss()
+        elif self.memory == 'traced':
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        yield
+        result = {'seconds': round(time.perf_counter() - started, 6)}
+        if self.memory == 'rss':
+            result['peak_bytes'] = max(0, _proc_status('VmHWM') - baseline)
+        elif self.memory == 'traced':
+            result['peak_bytes'] = tracemalloc.get_traced_memory()[1] - baseline
+        self.sections[name] = result
+
+
+def default_memory():
+    """``'rss'`` where the peak resident set can be reset, else ``'traced'``."""
+    try:
+        _reset_peak_rss()
+    except OSError:
+        return 'traced'
+    return 'rss'
+
+
+def _reset_peak_rss():
+    with open('/proc/self/clear_refs', 'w') as file:
+        file.write('5')
+    return _proc_status('VmRSS')
+
+
+def _proc_status(field):
+    with open('/proc/self/status') as file:
+        for line in file:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) * 1024
+    raise OSError(f'{field} missing from /proc/self/status')
+
+
+def run_size(rows, workdir, seed=0, memory=None):
+    """Benchmark every section on a synthetic file of ``rows`` registrations."""
+    record = Recorder(memory)
+    path = os.path.join(workdir, f'synthetic-{rows}-{seed}.csv')
+    if not os.path.exists(path):
+        with record.section('generate'):
+            synthetic.write_csv(path + '.partial', rows, seed)
+            os.replace(path + '.partial', path)
+    release = os.path.join(workdir, f'synthetic-{rows}-{seed}-release.csv')
+    if not os.path.exists(release):
+        with record.section('generate.release'):
+            synthetic.write_release(release + '.partial', path, seed=seed)
+            os.replace(release + '.partial', release)
+    if os.path.exists(snapshot.snapshot_path(path)):
+        os.remove(snapshot.snapshot_path(path))
+
+    clear_cache()
+    with record.section('load.csv'):
+        dataset = load_dataset(path)
+    with record.section('snapshot.compile'):
+        snapshot.compile_snapshot(path)
+    clear_cache()
+    with record.section('load.snapshot'):
+        dataset = load_dataset(path)
+    with record.section('clean'):
+        cleaned = clean(dataset.frame)
+    frame = cleaned.frame
+
+    with record.section('aggregate.cells'):
+        cells = Cells.build(frame)
+    with record.section('aggregate.cube'):
+        cube = cells.cube()
+    with record.section('aggregate.rollups'):
+        Rollups.from_cube(cube).compute()
+    with record.section('aggregate.year_index'):
+        SegmentIndex.build(frame['Model Year'])
+    with record.section('aggregate.range_counts'):
+        ranges = RangeDistribution.from_ranges(frame['Electric Range'])
+    with record.section('aggregate.range_statistics'):
+        ranges.histogram(), ranges.kde(), ranges.quantile([0.25, 0.5, 0.75])
+    selection = Selection(counties=('King',), makes=('TESLA',))
+    with record.section('aggregate.filtered_view'):
+        filtered_view(cleaned, selection)
+    points = read_csv(path, ['Vehicle Location'])['Vehicle Location']
+    with record.section('geo.parse_points'):
+        parse_points(points)
+    del points
+    with record.section('geo.locations'):
+        locations = LocationCells.build(frame['Longitude'], frame['Latitude']).locations()
+    for level, size in HEX_SIZES.items():
+        with record.section(f'geo.hex_bins.{level.lower()}'):
+            hex_bins(locations, size)
+    table = snapshot.read_table(snapshot.snapshot_path(path))
+    for name, text in QUERIES.items():
+        with record.section(f'query.{name}'):
+            execute(parse(text), table)
+    del table
+    with record.section('stream'):
+        partials = stream_partials(path)
+    if parallel.workers() > 1:
+        # Start the worker processes outside the timed sections.
+        list(parallel.process_pool().map(abs, range(parallel.workers())))
+        with record.section('parallel.cells'):
+            parallel.build_cells(frame)
+        with record.section('parallel.stream'):
+            parallel.stream_partials_parallel(path)
+
+    with record.section('refresh.read'):
+        released = read_release(release)
+    previous = snapshot.read_snapshot(snapshot.snapshot_path(path), (KEY, *ANALYSIS_COLUMNS))
+    with record.section('refresh.diff'):
+        delta = diff(previous, released)
+    with record.section('refresh.apply'):
+        apply_delta(partials, previous, released, delta)
+    del released, previous
+
+    analysis = analyze(cleaned)
+    counts = analysis.rollups.adoption_by_year.astype(float)
+    x = (counts.index.to_numpy() - counts.index.min()).astype(float)
+    y = counts.to_numpy()
+    with record.section('forecast.curve_fit'):
+        _, best = select_model(x, y)
+    function = MODELS[best.name][0]
+    with record.section('forecast.bootstrap'):
+        bootstrap(best.name, x, y, function(x, *best.params), best.params, x[-1] + np.arange(1, 7),
+                  settings.BOOTSTRAP_RESAMPLES)
+    with record.section('forecast.registrations'):
+        forecast = forecast_registrations(counts)
+    with record.section('forecast.segments'):
+        forecast_segments(cube, 'City')
+
+    for name, (build, *args) in analysis.figures(forecast).items():
+        with record.section(f'render.{name}'):
+            encode(build(*args))
+    return {'rows': rows, 'rows_cleaned': len(frame), 'sections': record.sections}
+
+
+def run(sizes=SIZES, workdir=None, seed=0, memory='default'):
+    """Run every size; returns the JSON-ready results."""
+    workdir = workdir or tempfile.mkdtemp(prefix='electrapulse-bench-')
+    os.makedirs(workdir, exist_ok=True)
+    memory = default_memory() if memory == 'default' else memory
+    if memory == 'traced':
+        tracemalloc.start()
+    try:
+        results = [run_size(rows, workdir, seed, memory) for rows in sizes]
+    finally:
+        if memory == 'traced':
+            tracemalloc.stop()
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'workers': settings.WORKERS,
+            'bootstrap_resamples': settings.BOOTSTRAP_RESAMPLES,
+        },
+        'seed': seed,
+        'memory': memory,
+        'max_rss_bytes': _max_rss(),
+        'results': results,
+    }
+
+
+def regressions(current, baseline, tolerance=0.25):
+    """``(rows, section, before, after)`` for every section over ``tolerance`` slower than ``baseline``."""
+    before = {(result['rows'], name): section['seconds']
+              for result in baseline['results'] for name, section in result['sections'].items()}
+    slower = []
+    for result in current['results']:
+        for name, section in result['sections'].items():
+            previous = before.get((result['rows'], name))
+            if previous is not None and section['seconds'] - previous > max(tolerance * previous, NOISE_SECONDS):
+                slower.append((result['rows'], name, previous, section['seconds']))
+    return slower
+
+
+def _max_rss():
+    try:
+        import resource
+    except ImportError:
+        return None
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark ElectraPulse on synthetic registration files.')
+    parser.add_argument('--rows', type=int, nargs='+', default=SIZES, help='dataset sizes (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0, help='generator seed (default: %(default)s)')
+    parser.add_argument('--workdir', help='where synthetic files are kept between runs (default: a new temp dir)')
+    parser.add_argument('-o', '--output', help='results JSON path (default: stdout)')
+    parser.add_argument('--baseline', help='earlier results JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown against the baseline, as a fraction (default: %(default)s)')
+    parser.add_argument('--memory', choices=('rss', 'traced', 'none'), default='default',
+                        help='peak memory measure: resident set (Linux), tracemalloc, or none '
+                             '(default: rss where available)')
+    args = parser.parse_args(argv)
+
+    results = run(args.rows, args.workdir, args.seed, None if args.memory == 'none' else args.memory)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(text + '\n')
+    else:
+        print(text)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            slower = regressions(results, json.load(file), args.tolerance)
+        for rows, name, before, after in slower:
+            print(f'{name} at {rows:,} rows: {before:.3f}s -> {after:.3f}s', file=sys.stderr)
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
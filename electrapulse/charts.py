@@ -0,0 +1,146 @@
+"""Figure builders for the dashboard charts.
+
+Each builder takes the aggregate it plots and returns a new figure. Figures
+are created from :class:`matplotlib.figure.Figure` directly rather than
+through ``pyplot``, so they never enter pyplot's global registry and are
+freed as soon as the caller drops them.
+
+seaborn and matplotlib (and scipy, which seaborn imports) are imported by
+the builders on first use rather than with this module: they are most of
+the dashboard's import time, and a server can answer its first request
+before any chart is drawn.
+"""
+import numpy as np
+
+
+def _figure(figsize):
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
+    with sns.axes_style('whitegrid'):
+        fig = Figure(figsize=figsize)
+        ax = fig.subplots()
+    return fig, ax
+
+
+def adoption_by_year(counts):
+    import seaborn as sns
+
+    fig, ax = _figure((12, 6))
+    sns.barplot(x=counts.index, y=counts.values, hue=counts.index, palette="viridis", legend=False, ax=ax)
+    ax.set_title('EV Adoption Over Time')
+    ax.set_xlabel('Model Year')
+    ax.set_ylabel('Number of Vehicles Registered')
+    ax.set_xticks(range(len(counts)), counts.index, rotation=45)
+    return fig
+
+
+def top_cities(cities):
+    import seaborn as sns
+
+    fig, ax = _figure((12, 8))
+    sns.barplot(x='Number of Vehicles', y='City', hue='County', data=cities, palette="magma", legend=False, ax=ax)
+    ax.set_title('Geographical Distribution at County Level')
+    ax.set_xlabel('Number of Vehicles Registered')
+    ax.set_ylabel('City')
+    fig.tight_layout()
+    return fig
+
+
+def type_distribution(counts):
+    import seaborn as sns
+
+    fig, ax = _figure((10, 6))
+    sns.barplot(x=counts.values, y=counts.index, hue=counts.index, palette="rocket", legend=False, ax=ax)
+    ax.set_title('Distribution of Electric Vehicle Types')
+    ax.set_xlabel('Number of Vehicles Registered')
+    ax.set_ylabel('Electric Vehicle Type')
+    fig.tight_layout()
+    return fig
+
+
+def top_makes(counts):
+    import seaborn as sns
+
+    fig, ax = _figure((12, 6))
+    sns.barplot(x=counts.values, y=counts.index, hue=counts.index, palette="cubehelix", legend=False, ax=ax)
+    ax.set_title('Top 10 Popular EV Makes')
+    ax.set_xlabel('Number of Vehicles Registered')
+    ax.set_ylabel('Make')
+    fig.tight_layout()
+    return fig
+
+
+def top_models(models):
+    import seaborn as sns
+
+    fig, ax = _figure((12, 8))
+    sns.barplot(x='Number of Vehicles', y='Model', hue='Make', data=models, palette="viridis", ax=ax)
+    ax.set_title('Top Models in Top 3 Makes by EV Registrations')
+    ax.set_xlabel('Number of Vehicles Registered')
+    ax.set_ylabel('Model')
+    ax.legend(title='Make', loc='center right')
+    fig.tight_layout()
+    return fig
+
+
+def range_distribution(histogram, density, mean_range):
+    """The range histogram and density curve, drawn from precomputed bins rather than rows.
+
+    ``histogram`` is ``(counts, edges)`` and ``density`` is ``(miles, vehicles per mile)``.
+    """
+    import seaborn as sns
+
+    counts, edges = histogram
+    miles, vehicles = density
+    fig, ax = _figure((12, 6))
+    sns.histplot(x=edges[:-1], weights=counts, bins=list(edges), color='royalblue', ax=ax)
+    # Scale the density from vehicles per mile to vehicles per bin, like the bars.
+    ax.plot(miles, vehicles * (edges[1] - edges[0] if len(edges) > 1 else 1), color='royalblue')
+    ax.set_title('Distribution of Electric Vehicle Ranges')
+    ax.set_xlabel('Electric Range (miles)')
+    ax.set_ylabel('Number of Vehicles')
+    ax.axvline(mean_range, color='red', linestyle='--', label=f'Mean Range: {mean_range:.2f} miles')
+    ax.legend()
+    return fig
+
+
+def range_by_year(averages):
+    import seaborn as sns
+
+    fig, ax = _figure((12, 6))
+    sns.lineplot(x='Model Year', y='Electric Range', data=averages, marker='o', color='green', ax=ax)
+    ax.set_title('Average Electric Range by Model Year')
+    ax.set_xlabel('Model Year')
+    ax.set_ylabel('Average Electric Range (miles)')
+    ax.grid(True)
+    return fig
+
+
+def range_by_model(models):
+    import seaborn as sns
+
+    fig, ax = _figure((12, 8))
+    sns.barplot(x='Electric Range', y='Model', hue='Make', data=models, palette="cool", ax=ax)
+    ax.set_title('Top 10 Models by Average Electric Range in Top Makes')
+    ax.set_xlabel('Average Electric Range (miles)')
+    ax.set_ylabel('Model')
+    ax.legend(title='Make', loc='center right')
+    return fig
+
+
+def forecast(actual, forecasted, lower=None, upper=None):
+    """Actual registrations (a year-indexed Series), a ``{year: value}`` forecast and its interval."""
+    fig, ax = _figure((12, 8))
+    ax.plot(actual.index, actual.values, 'bo-', label='Actual Registrations')
+    ax.plot(list(forecasted), np.asarray(list(forecasted.values()), dtype=float), 'ro--',
+            label='Forecasted Registrations')
+    if lower is not None and upper is not None:
+        ax.fill_between(lower.index, lower.values, upper.values, color='red', alpha=0.15,
+                        label='Prediction Interval')
+    ax.set_title('Current & Estimated EV Market')
+    ax.set_xlabel('Year')
+    ax.set_ylabel('Number of EV Registrations')
+    ax.legend()
+    ax.grid(True)
+    return fig
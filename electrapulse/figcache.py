@@ -0,0 +1,104 @@
+"""Process-wide cache of rendered chart images.
+
+Figures are keyed by a fingerprint of the builder, its input aggregates and
+its style arguments, and stored as encoded PNG/SVG bytes in an LRU bounded
+by a byte budget. A hit skips matplotlib entirely; a miss builds the figure,
+encodes it and releases it before returning, so figures never accumulate
+on a long-running server. A figure is rendered once, through
+:data:`~electrapulse.memory.admission`, however many sessions ask for it
+meanwhile, and the cache's bytes count toward the memory budget, which
+evicts images before anything costlier to recompute.
+"""
+import io
+import threading
+from collections import OrderedDict
+
+from electrapulse import settings
+from electrapulse.instrumentation import span
+from electrapulse.memo import fingerprint
+from electrapulse.memory import admission, budget
+
+
+class FigureCache:
+    """LRU of encoded figures, bounded by ``max_bytes``."""
+
+    def __init__(self, max_bytes=settings.FIGURE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._rendering = {}
+        self._lock = threading.Lock()
+
+    def render(self, build, *args, fmt='png', dpi=200, **style):
+        """Return the encoded image of ``build(*args, **style)``."""
+        key = fingerprint(build.__module__, build.__qualname__, fmt, dpi, args, style)
+        image = self._get(key)
+        if image is not None:
+            return image
+        with admission:
+            with self._lock:
+                rendering = self._rendering.setdefault(key, threading.Lock())
+            with rendering:
+                # Another session may have rendered it while we waited.
+                image = self._get(key)
+                if image is not None:
+                    return image
+                try:
+                    with self._lock:
+                        self.misses += 1
+                    with span(f'render.{build.__name__}'):
+                        image = encode(build(*args, **style), fmt=fmt, dpi=dpi)
+                    with self._lock:
+                        if len(image) <= self.max_bytes:
+                            self._entries[key] = image
+                            self.bytes += len(image)
+                            while self.bytes > self.max_bytes:
+                                _, evicted = self._entries.popitem(last=False)
+                                self.bytes -= len(evicted)
+                finally:
+                    with self._lock:
+                        self._rendering.pop(key, None)
+        budget.enforce()
+        return image
+
+    def _get(self, key):
+        with self._lock:
+            image = self._entries.get(key)
+            if image is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return image
+
+    def evict(self):
+        """Drop the least recently used image; returns its bytes, 0 if empty."""
+        with self._lock:
+            if not self._entries:
+                return 0
+            _, image = self._entries.popitem(last=False)
+            self.bytes -= len(image)
+            return len(image)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def encode(fig, fmt='png', dpi=200):
+    """Encode ``fig`` the way ``st.pyplot`` does, then release it."""
+    buffer = io.BytesIO()
+    try:
+        fig.savefig(buffer, format=fmt, dpi=dpi, bbox_inches='tight')
+    finally:
+        fig.clear()
+    return buffer.getvalue()
+
+
+figure_cache = FigureCache()
+budget.register('figures', lambda: figure_cache.bytes, figure_cache.evict, priority=0)
+render_figure = figure_cache.render
@@ -0,0 +1,130 @@
+"""Cross-filtering of the registration data through positional indexes.
+
+A :class:`Selection` is what the sidebar filters hold. Resolving it never
+scans or copies the frame: each selected value contributes the row
+positions stored in its column's :class:`~electrapulse.index.SegmentIndex`.
+The filtered cube is the cells of the full cube whose keys match, found
+through each cell's slot in the column indexes, so its cost follows the
+number of cells rather than rows. Row positions (for the map, the range
+histogram and the table) keep the rows whose cell matches, starting from
+the rows of the narrowest selected column when those are few.
+"""
+from dataclasses import dataclass, fields
+
+import numpy as np
+
+from electrapulse.aggregations import Rollups, cells_for, cube_for, rollups_for
+from electrapulse.index import index_for
+from electrapulse.memo import derived
+
+
+@dataclass(frozen=True)
+class Selection:
+    """Sidebar filter state; empty tuples and ``years=None`` mean no filter."""
+    counties: tuple = ()
+    cities: tuple = ()
+    makes: tuple = ()
+    types: tuple = ()
+    years: tuple = None
+
+    # Filtered column behind each categorical field.
+    COLUMNS = {'counties': 'County', 'cities': 'City', 'makes': 'Make', 'types': 'Electric Vehicle Type'}
+
+    def __bool__(self):
+        return any(getattr(self, field.name) for field in fields(self))
+
+    def apply_to_cube(self, cube):
+        """Filter the rows of an aggregation cube (for when no rows are resident)."""
+        keep = np.ones(len(cube), dtype=bool)
+        for field, column in self.COLUMNS.items():
+            values = getattr(self, field)
+            if values:
+                keep &= cube[column].isin(values).to_numpy()
+        if self.years is not None:
+            keep &= cube['Model Year'].between(*self.years).to_numpy()
+        return cube[keep].reset_index(drop=True)
+
+
+@derived
+def cell_codes(cleaned, column):
+    """Slot of each cube cell's ``column`` value among the keys of its :class:`SegmentIndex`."""
+    return index_for(cleaned, column).keys.get_indexer(cells_for(cleaned).keys[column])
+
+
+@derived(maxsize=64)
+def select_cells(cleaned, selection):
+    """Boolean mask of the cube cells of ``cleaned`` matching ``selection``, or None for all cells."""
+    if not selection:
+        return None
+    keys = cells_for(cleaned).keys
+    keep = np.ones(len(keys), dtype=bool)
+    for field, column in Selection.COLUMNS.items():
+        values = getattr(selection, field)
+        if values:
+            slots = index_for(cleaned, column).keys.get_indexer(list(values))
+            keep &= np.isin(cell_codes(cleaned, column), slots[slots >= 0])
+    if selection.years is not None:
+        years = keys['Model Year'].to_numpy()
+        keep &= (years >= selection.years[0]) & (years <= selection.years[1])
+    return keep
+
+
+@derived(maxsize=64)
+def select_positions(cleaned, selection):
+    """Ascending row positions of ``cleaned`` matching ``selection``, or None for all rows."""
+    keep = select_cells(cleaned, selection)
+    if keep is None:
+        return None
+    cells = cells_for(cleaned)
+    # Rows missing a cube dimension have the id one past the last cell.
+    keep = np.append(keep, False)
+    candidates = _fewest_candidates(cleaned, selection)
+    if candidates is not None and len(candidates) * _CANDIDATE_RATIO < len(cells.ids):
+        # A narrow column (a few makes, one city): check only its rows' cells.
+        return candidates[keep[cells.ids[candidates]]]
+    return np.flatnonzero(keep[cells.ids])
+
+
+# Gathering the cells of a column's candidate rows beats a full pass over
+# the per-row cell ids while the candidates are under 1/_CANDIDATE_RATIO of the rows.
+_CANDIDATE_RATIO = 8
+
+
+def _fewest_candidates(cleaned, selection):
+    """Ascending row positions of the selected column with the fewest rows, or None for all rows."""
+    best = None
+    for field, column in Selection.COLUMNS.items():
+        values = getattr(selection, field)
+        if values:
+            index = index_for(cleaned, column)
+            size = sum(index.count(value) for value in values)
+            if best is None or size < best[0]:
+                best = size, index, values
+    if best is None:
+        return None
+    _, index, values = best
+    sets = [index.positions(value) for value in values]
+    return sets[0] if len(sets) == 1 else np.sort(np.concatenate(sets))
+
+
+@dataclass(frozen=True, eq=False)
+class FilteredView:
+    """The cube and rollups of one selection over a cleaned dataset; rows are in :func:`select_positions`."""
+    selection: Selection
+    cube: object
+    rollups: Rollups
+
+    @property
+    def rows(self):
+        return int(self.cube['count'].sum())
+
+
+@derived(maxsize=64)
+def filtered_view(cleaned, selection):
+    """The :class:`FilteredView` of ``selection``; the unfiltered view is shared."""
+    keep = select_cells(cleaned, selection)
+    if keep is None:
+        return FilteredView(selection, cube_for(cleaned), rollups_for(cleaned))
+    # Every cell of the full cube holds a registration, so its rows line up with the cells.
+    cube = cube_for(cleaned)[keep].reset_index(drop=True)
+    return FilteredView(selection, cube, Rollups.from_cube(cube))
@@ -0,0 +1,328 @@
+"""Registration forecasts with model selection and bootstrap intervals.
+
+Several growth models are fitted to the yearly registration counts with
+data-driven initial parameters and bounds. The one with the lowest error on
+the most recent (held-out) years is refitted on the whole series and used
+for the forecast. Prediction intervals come from a residual bootstrap:
+resampled series are refitted together in array operations and
+re-forecast, and the interval is read off the percentiles. Results are cached by a fingerprint
+of the input series and the forecast settings.
+"""
+import math
+import os
+import sys
+import threading
+import types
+from concurrent.futures import ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+
+from electrapulse import settings
+from electrapulse.memo import LRUCache, fingerprint
+
+
+def exponential(x, a, b):
+    return a * np.exp(b * x)
+
+
+def logistic(x, capacity, rate, midpoint):
+    return capacity / (1 + np.exp(-rate * (x - midpoint)))
+
+
+def bass(x, market, innovation, imitation):
+    """Yearly adoptions of the Bass diffusion model (density times market size)."""
+    total = innovation + imitation
+    decay = np.exp(-total * x)
+    return market * total ** 2 / innovation * decay / (1 + imitation / innovation * decay) ** 2
+
+
+def quadratic(x, a, b, c):
+    return a + b * x + c * x ** 2
+
+
+def _exponential_start(x, y):
+    positive = y > 0
+    slope, intercept = np.polyfit(x[positive], np.log(y[positive]), 1)
+    return [math.exp(intercept), slope], ([0, -1], [np.inf, 2])
+
+
+def _logistic_start(x, y):
+    peak = y.max()
+    return [2 * peak, 0.5, x[-1]], ([peak, 1e-3, x[0] - 50], [100 * peak, 5, x[-1] + 50])
+
+
+def _bass_start(x, y):
+    total = y.sum()
+    return [3 * total, 0.01, 0.4], ([total, 1e-6, 1e-6], [1000 * total, 1, 3])
+
+
+def _quadratic_start(x, y):
+    c, b, a = np.polyfit(x, y, 2)
+    return [a, b, c], (-np.inf, np.inf)
+
+
+# Candidate models: function and a callable giving (p0, bounds) for a series.
+MODELS = {
+    'exponential': (exponential, _exponential_start),
+    'logistic': (logistic, _logistic_start),
+    'bass': (bass, _bass_start),
+    'quadratic': (quadratic, _quadratic_start),
+}
+
+
+@dataclass(frozen=True)
+class ModelFit:
+    name: str
+    params: tuple
+    stderr: tuple
+    holdout_rmse: float
+
+
+@dataclass(frozen=True, eq=False)
+class Forecast:
+    """A forecast of yearly registrations with its prediction interval."""
+    model: str
+    fits: tuple
+    history: pd.Series
+    values: pd.Series
+    lower: pd.Series
+    upper: pd.Series
+    level: float
+    resamples: int
+
+    def as_dict(self):
+        """``{year: forecast}``, the shape the dashboard displays."""
+        return {int(year): float(value) for year, value in self.values.items()}
+
+
+def fit(name, x, y, p0=None):
+    """Fit model ``name``; returns ``(params, covariance)`` or raises RuntimeError.
+
+    Given ``p0`` (a previous fit of a similar series), the fit is a fast
+    unbounded Levenberg-Marquardt refinement from there; otherwise it starts
+    from the model's heuristics within its bounds.
+    """
+    function, start = MODELS[name]
+    from scipy.optimize import curve_fit
+    if p0 is not None:
+        try:
+            return curve_fit(function, x, y, p0=p0, maxfev=400)
+        except (RuntimeError, ValueError) as error:
+            raise RuntimeError(str(error)) from error
+    initial, bounds = start(x, y)
+    # The heuristics may land on or past a bound; start just inside.
+    low, high = np.broadcast_to(bounds[0], len(initial)), np.broadcast_to(bounds[1], len(initial))
+    margin = np.where(np.isfinite(high - low), (high - low) * 1e-6, 0)
+    initial = np.clip(initial, low + margin, high - margin)
+    try:
+        return curve_fit(function, x, y, p0=initial, bounds=bounds, method='trf', max_nfev=5000)
+    except ValueError as error:
+        raise RuntimeError(str(error)) from error
+
+
+def last_complete_year(counts):
+    """The last year whose count is not an obviously partial release.
+
+    The DOL file is published mid-year, so the newest model year usually
+    holds a few months of registrations; it is dropped when it has less than
+    half the previous year's count. Raises RuntimeError when ``counts`` is
+    empty.
+    """
+    if not len(counts):
+        raise RuntimeError('no registrations to forecast')
+    years = counts.index
+    if len(counts) >= 2 and counts.iloc[-1] < 0.5 * counts.iloc[-2]:
+        return years[-2]
+    return years[-1]
+
+
+def forecast_registrations(counts, horizon=6, holdout=3, level=0.95, resamples=settings.BOOTSTRAP_RESAMPLES,
+                           complete_through=None, models=tuple(MODELS)):
+    """Forecast ``horizon`` years after the last complete year of ``counts``.
+
+    ``counts`` is a Series of registrations indexed by model year. Raises
+    RuntimeError when it is empty or holds fewer than ``MIN_HISTORY``
+    complete years.
+    """
+    counts = counts.sort_index()
+    complete_through = last_complete_year(counts) if complete_through is None else complete_through
+    history = counts[counts.index <= complete_through].astype(float)
+    if len(history) < MIN_HISTORY:
+        raise RuntimeError(f'{len(history)} complete years of registrations are too few to forecast')
+    key = fingerprint(history, horizon, holdout, level, resamples, tuple(models))
+    return _forecasts.get_or_compute(key, lambda: _forecast(history, horizon, holdout, level, resamples, models))
+
+
+_forecasts = LRUCache(256, 'forecasts', priority=2)
+
+# Every model has at most three parameters.
+MIN_HISTORY = 4
+
+
+def _forecast(history, horizon, holdout, level, resamples, models):
+    start = int(history.index.min())
+    x = (history.index.to_numpy() - start).astype(float)
+    y = history.to_numpy()
+    future_years = np.arange(int(history.index.max()) + 1, int(history.index.max()) + 1 + horizon)
+    future_x = (future_years - start).astype(float)
+
+    fits, best = select_model(x, y, holdout, models)
+    function = MODELS[best.name][0]
+    fitted = function(x, *best.params)
+    point = function(future_x, *best.params)
+    samples = bootstrap(best.name, x, y, fitted, best.params, future_x, resamples)
+    tail = (1 - level) / 2 * 100
+    lower, upper = (np.nanpercentile(samples, tail, axis=0), np.nanpercentile(samples, 100 - tail, axis=0)) \
+        if len(samples) else (point, point)
+    index = pd.Index(future_years, name=history.index.name)
+    return Forecast(
+        model=best.name,
+        fits=fits,
+        history=history,
+        values=pd.Series(point, index=index, name='Forecast'),
+        lower=pd.Series(lower, index=index, name='Lower'),
+        upper=pd.Series(upper, index=index, name='Upper'),
+        level=level,
+        resamples=len(samples),
+    )
+
+
+def select_model(x, y, holdout=3, models=tuple(MODELS)):
+    """Fit every model in ``models``; return ``(fits, best)`` by holdout error."""
+    fits = []
+    for name in models:
+        rmse = _holdout_rmse(name, x, y, holdout)
+        try:
+            params, covariance = fit(name, x, y)
+        except RuntimeError:
+            continue
+        stderr = tuple(np.sqrt(np.clip(np.diag(covariance), 0, None)))
+        fits.append(ModelFit(name, tuple(params), stderr, rmse))
+    if not fits:
+        raise RuntimeError('no growth model could be fitted to the registration counts')
+    return tuple(fits), min(fits, key=lambda candidate: candidate.holdout_rmse)
+
+
+def _holdout_rmse(name, x, y, holdout):
+    """Error forecasting the last ``holdout`` points from the ones before."""
+    if holdout <= 0 or len(y) - holdout < 4:
+        holdout = 0
+    train = slice(None, len(y) - holdout)
+    try:
+        params, _ = fit(name, x[train], y[train])
+    except RuntimeError:
+        return math.inf
+    test = slice(len(y) - holdout, None) if holdout else slice(None)
+    error = MODELS[name][0](x[test], *params) - y[test]
+    return float(np.sqrt(np.mean(error ** 2)))
+
+
+def bootstrap(name, x, y, fitted, params, future_x, resamples):
+    """``resamples`` bootstrap forecasts of ``future_x``.
+
+    Residuals are scaled by the square root of the fitted level before
+    resampling (Pearson residuals), since registration noise grows with the
+    level but much less than proportionally. The resampled series are
+    refitted together, from ``params``, by :func:`refit_all`.
+    """
+    if resamples <= 0:
+        return np.empty((0, len(future_x)))
+    function = MODELS[name][0]
+    rng = np.random.default_rng(int(fingerprint(y, name)[:8], 16))
+    scale = np.sqrt(np.clip(fitted, 1, None))
+    residuals = (y - fitted) / scale
+    samples = np.clip(fitted + rng.choice(residuals, size=(resamples, len(y))) * scale, 0, None)
+    refits = refit_all(function, x, samples, params)
+    with np.errstate(all='ignore'):
+        points = function(future_x, *refits.T[..., np.newaxis])
+        results = points + rng.choice(residuals, size=points.shape) * np.sqrt(np.clip(points, 1, None))
+    results[~np.isfinite(results).all(axis=1)] = np.nan
+    return results
+
+
+def refit_all(function, x, samples, p0, iterations=100, tolerance=1.5e-8):
+    """Least-squares parameters of ``function`` for each row of ``samples``, all started from ``p0``.
+
+    Levenberg-Marquardt run on the rows at once, with forward-difference
+    Jacobians, so that thousands of small refits cost a few array operations
+    per iteration rather than a ``curve_fit`` call each. Like ``curve_fit``,
+    a row is fitted when an iteration changes its cost or its parameters by
+    less than ``tolerance`` (relative); rows not fitted after ``iterations``
+    are NaN.
+    """
+    rows, count = len(samples), len(p0)
+    params = np.tile(np.asarray(p0, dtype=float), (rows, 1))
+    damping, growth = np.full(rows, 1e-3), np.full(rows, 2.0)
+    with np.errstate(all='ignore'):
+        residuals = samples - function(x, *params.T[..., np.newaxis])
+        cost = (residuals ** 2).sum(axis=1)
+        active = np.isfinite(cost)
+        fitted = np.zeros(rows, dtype=bool)
+        for _ in range(iterations):
+            rows = np.flatnonzero(active)
+            if not len(rows):
+                break
+            p, r, y = params[rows], residuals[rows], samples[rows]
+            steps = np.sqrt(np.finfo(float).eps) * np.where(p != 0, np.abs(p), 1)
+            jacobian = np.stack([(y - r - function(x, *(p + np.eye(count)[k] * steps[:, [k]]).T[..., np.newaxis]))
+                                 / -steps[:, [k]] for k in range(count)], axis=2)
+            normal = jacobian.transpose(0, 2, 1) @ jacobian
+            gradient = (jacobian.transpose(0, 2, 1) @ r[..., np.newaxis])[..., 0]
+            # Marquardt's scaling keeps the damping independent of the parameters' units.
+            ridge = damping[rows, np.newaxis] * np.maximum(np.diagonal(normal, axis1=1, axis2=2), np.finfo(float).tiny)
+            damped = normal + ridge[..., np.newaxis] * np.eye(count)
+            finite = np.isfinite(damped).all(axis=(1, 2)) & np.isfinite(gradient).all(axis=1)
+            step = np.zeros_like(p)
+            step[finite] = np.linalg.solve(damped[finite], gradient[finite][..., np.newaxis])[..., 0]
+            trial = p + step
+            trial_residuals = y - function(x, *trial.T[..., np.newaxis])
+            trial_cost = (trial_residuals ** 2).sum(axis=1)
+            # Nielsen's update: damping follows how well the linear model predicted the reduction.
+            predicted = (step * (ridge * step + gradient)).sum(axis=1)
+            gain = (cost[rows] - trial_cost) / predicted
+            better = finite & (trial_cost < cost[rows])
+            damping[rows] = np.where(better, damping[rows] * np.maximum(1 / 3, 1 - (2 * gain - 1) ** 3),
+                                     damping[rows] * growth[rows])
+            growth[rows] = np.where(better, 2, growth[rows] * 2)
+            small = (predicted <= tolerance * cost[rows]) | (np.abs(step) <= tolerance * np.abs(p)).all(axis=1)
+            params[rows[better]] = trial[better]
+            residuals[rows[better]] = trial_residuals[better]
+            cost[rows[better]] = trial_cost[better]
+            fitted[rows[small & finite]] = True
+            active[rows[small | ~finite]] = False
+    params[~fitted | ~np.isfinite(cost)] = np.nan
+    return params
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def process_pool():
+    """The shared worker pool, started on first use.
+
+    Workers are spawned rather than forked because the Streamlit server that
+    calls this is multi-threaded. A spawned worker re-runs the parent's
+    ``__main__`` script, which under Streamlit is the dashboard itself, so
+    there every worker is started at once with ``__main__`` swapped for an
+    empty module (elsewhere ``__main__`` may define the jobs' functions).
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = settings.WORKERS or os.cpu_count()
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn'))
+            main = sys.modules['__main__']
+            runtime = sys.modules.get('streamlit.runtime')
+            if runtime is not None and runtime.exists():
+                sys.modules['__main__'] = types.ModuleType('__main__')
+            try:
+                # Jobs submitted while no worker is idle each spawn one more.
+                wait([pool.submit(int) for _ in range(workers)])
+            finally:
+                sys.modules['__main__'] = main
+            _pool = pool
+        return _pool
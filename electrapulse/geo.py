@@ -0,0 +1,210 @@
+"""Vehicle locations: vectorized point parsing and hexagonal density bins.
+
+``Vehicle Location`` holds a WKT ``POINT (lon lat)`` per vehicle, but only a
+few thousand distinct points (postal-code centroids). Each distinct string
+is parsed once by a single vectorized regex and every row takes its
+coordinates by code. For the density map, rows are counted per distinct
+location (:class:`Locations`, mergeable like the cube), and only those
+weighted locations are binned into flat-top hexagons at each zoom level.
+The browser receives one column per hexagon, never the points.
+"""
+import math
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from electrapulse.filters import select_positions
+from electrapulse.memo import derived
+
+POINT = r'POINT\s*\(\s*(-?\d+(?:\.\d*)?)\s+(-?\d+(?:\.\d*)?)\s*\)'
+
+# Hexagon size (centre to corner, in metres) of each zoom level, coarse to fine.
+HEX_SIZES = {
+    'State': 25_000,
+    'Region': 10_000,
+    'County': 4_000,
+    'City': 1_500,
+    'Neighbourhood': 500,
+}
+
+# Bins are laid out on an equirectangular projection around this latitude
+# (the middle of Washington), so the grid does not move with the filters.
+REFERENCE_LATITUDE = 47.4
+METRES_PER_DEGREE = 111_320.0
+
+
+def parse_points(values):
+    """``(longitude, latitude)`` float32 arrays of WKT points; NaN where missing or malformed."""
+    codes, uniques = pd.factorize(values)
+    coordinates = pd.Series(np.asarray(uniques, dtype=object), dtype=object).str.extract(POINT)
+    coordinates = coordinates.to_numpy(dtype=np.float32)
+    # Code -1 (missing) picks the trailing NaN row.
+    coordinates = np.vstack([coordinates.reshape(-1, 2), [[np.nan, np.nan]]]).astype(np.float32)
+    return coordinates[codes, 0], coordinates[codes, 1]
+
+
+@dataclass(frozen=True, eq=False)
+class Locations:
+    """Registrations per distinct location; rows without one are left out."""
+    longitude: np.ndarray
+    latitude: np.ndarray
+    counts: np.ndarray
+
+    @classmethod
+    def from_points(cls, longitude, latitude):
+        return LocationCells.build(longitude, latitude).locations()
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    def merge(self, other):
+        longitude = np.concatenate([self.longitude, other.longitude])
+        latitude = np.concatenate([self.latitude, other.latitude])
+        ids, first = _location_ids(longitude, latitude)
+        counts = np.bincount(ids, weights=np.concatenate([self.counts, other.counts]), minlength=len(first))
+        present = counts != 0
+        return Locations(longitude[first][present], latitude[first][present], counts[present].astype(np.int64))
+
+    def negated(self):
+        return Locations(self.longitude, self.latitude, -self.counts)
+
+
+@dataclass(frozen=True, eq=False)
+class LocationCells:
+    """The distinct location of every row, so any subset's :class:`Locations` is a ``bincount``."""
+    ids: np.ndarray
+    longitude: np.ndarray
+    latitude: np.ndarray
+
+    @classmethod
+    def build(cls, longitude, latitude):
+        longitude = np.asarray(longitude, dtype=np.float32)
+        latitude = np.asarray(latitude, dtype=np.float32)
+        located = ~(np.isnan(longitude) | np.isnan(latitude))
+        ids, first = _location_ids(longitude[located], latitude[located])
+        # Rows without a location go to a trailing cell that is never reported.
+        all_ids = np.full(len(longitude), len(first), dtype=np.int32)
+        all_ids[located] = ids
+        return cls(all_ids, longitude[located][first], latitude[located][first])
+
+    def locations(self, positions=None):
+        """The :class:`Locations` of all rows, or of the rows at ``positions``."""
+        ids = self.ids if positions is None else self.ids[positions]
+        counts = np.bincount(ids, minlength=len(self.longitude) + 1)[:len(self.longitude)]
+        present = counts > 0
+        return Locations(self.longitude[present], self.latitude[present], counts[present].astype(np.int64))
+
+
+def _location_ids(longitude, latitude):
+    """Per-point ids of distinct ``(longitude, latitude)`` pairs and each id's first position."""
+    key = (longitude.astype(np.float32).view(np.uint32).astype(np.uint64) << np.uint64(32)) \
+        | latitude.astype(np.float32).view(np.uint32).astype(np.uint64)
+    ids, uniques = pd.factorize(key)
+    first = np.full(len(uniques), len(key), dtype=np.int64)
+    np.minimum.at(first, ids, np.arange(len(key)))
+    return ids.astype(np.int32), first
+
+
+def hex_bins(locations, size):
+    """Hexagons of ``size`` metres holding any of ``locations``, as a frame of centres and counts."""
+    scale = METRES_PER_DEGREE * math.cos(math.radians(REFERENCE_LATITUDE))
+    x = locations.longitude.astype(np.float64) * scale / size
+    y = locations.latitude.astype(np.float64) * METRES_PER_DEGREE / size
+    # Axial coordinates of flat-top hexagons, rounded through cube coordinates.
+    q, r = 2 / 3 * x, -x / 3 + math.sqrt(3) / 3 * y
+    s = -q - r
+    rq, rr, rs = np.rint(q), np.rint(r), np.rint(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    rq = np.where(fix_q, -rr - rs, rq)
+    rr = np.where(fix_r, -rq - rs, rr)
+
+    cells, first = _location_ids(rq.astype(np.float32), rr.astype(np.float32))
+    q, r = rq[first], rr[first]
+    counts = np.bincount(cells, weights=locations.counts, minlength=len(first)).astype(np.int64)
+    return pd.DataFrame({
+        'longitude': 1.5 * q * size / scale,
+        'latitude': math.sqrt(3) * (r + q / 2) * size / METRES_PER_DEGREE,
+        'count': counts,
+    })
+
+
+@derived
+def location_cells_for(cleaned):
+    """The :class:`LocationCells` of a cleaned dataset, built once per data version."""
+    return LocationCells.build(cleaned.frame['Longitude'], cleaned.frame['Latitude'])
+
+
+def density_bins(cleaned, selection, size):
+    """Hexagon counts of ``selection``'s registrations at ``size`` metres."""
+    positions = select_positions(cleaned, selection)
+    return hex_bins(location_cells_for(cleaned).locations(positions), size)
+
+
+# Most hexagons drawn at once; beyond it only the densest are sent.
+MAX_COLUMNS = 20_000
+
+# Colour ramp of the map, from sparse to dense (RGB).
+RAMP = np.array([[65, 182, 196], [127, 205, 187], [199, 233, 180], [254, 217, 118], [253, 141, 60],
+                 [227, 26, 28]])
+
+
+def density_map(bins, size, height=30_000, limit=MAX_COLUMNS):
+    """A pydeck map of hexagonal columns for ``bins``, the tallest ``height`` metres high."""
+    import pydeck as pdk
+
+    bins = bins.nlargest(limit, 'count') if len(bins) > limit else bins.copy()
+    level = np.log1p(bins['count']) / np.log1p(max(int(bins['count'].max()), 1)) if len(bins) else 0
+    stops = np.linspace(0, 1, len(RAMP))
+    for channel, name in enumerate('rgb'):
+        bins[name] = np.interp(level, stops, RAMP[:, channel]).astype(np.uint8)
+    layer = pdk.Layer(
+        'ColumnLayer',
+        data=bins,
+        get_position=['longitude', 'latitude'],
+        get_elevation='count',
+        elevation_scale=height / max(int(bins['count'].max()), 1) if len(bins) else 1,
+        radius=size,
+        disk_resolution=6,
+        extruded=True,
+        get_fill_color=['r', 'g', 'b', 200],
+        pickable=True,
+        auto_highlight=True,
+    )
+    weights = bins['count'] / bins['count'].sum() if len(bins) else None
+    view = pdk.ViewState(
+        longitude=float(np.average(bins['longitude'], weights=weights)) if len(bins) else -120.7,
+        latitude=float(np.average(bins['latitude'], weights=weights)) if len(bins) else REFERENCE_LATITUDE,
+        zoom=6,
+        pitch=40,
+    )
+    return pdk.Deck(layers=[layer], initial_view_state=view, map_style=None,
+                    tooltip={'text': '{count} registrations'})
+
+
+@dataclass(frozen=True, eq=False)
+class DensityMap:
+    """The hexagon counts of a density map, its pydeck map and the map's size as sent, in bytes."""
+    bins: pd.DataFrame
+    deck: object
+    payload_bytes: int
+
+    @classmethod
+    def build(cls, bins, size):
+        deck = density_map(bins, size)
+        return cls(bins, deck, len(deck.to_json()))
+
+
+@derived(maxsize=64)
+def location_map(cleaned, selection, size):
+    """The :class:`DensityMap` of ``selection`` at ``size`` metres, built once for every session."""
+    return DensityMap.build(density_bins(cleaned, selection, size), size)
+
+
+@derived(maxsize=len(HEX_SIZES))
+def streamed_location_map(locations, size):
+    """The :class:`DensityMap` of streamed :class:`Locations`, which no filter applies to."""
+    return DensityMap.build(hex_bins(locations, size), size)
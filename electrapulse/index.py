@@ -0,0 +1,70 @@
+"""Positional indexes over the columns of a cleaned frame.
+
+A :class:`SegmentIndex` stores the row positions of a column grouped by
+value in one array (``order``) with per-value ``offsets`` into it, so the
+count of a value is a subtraction and its rows are a slice, instead of a
+boolean mask and a filtered copy of the whole frame per lookup.
+"""
+import numpy as np
+import pandas as pd
+
+from electrapulse.memo import derived
+
+
+class SegmentIndex:
+    """Row positions of one column grouped by value, values in sorted order."""
+
+    def __init__(self, keys, offsets, order):
+        self.keys = keys
+        self.offsets = offsets
+        self.order = order
+        self._slots = {key: slot for slot, key in enumerate(keys)}
+
+    @classmethod
+    def build(cls, column):
+        codes, uniques = pd.factorize(column, sort=True)
+        # Small code ranges let NumPy's stable sort use radix sort.
+        if len(uniques) < np.iinfo(np.int16).max:
+            codes = codes.astype(np.int16)
+        order = np.argsort(codes, kind='stable')
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        # Missing values (code -1) sort first; leave them out of the index.
+        order = order[len(codes) - counts.sum():]
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        return cls(pd.Index(np.asarray(uniques), name=column.name), offsets, order)
+
+    def __contains__(self, key):
+        return key in self._slots
+
+    def __len__(self):
+        return len(self.keys)
+
+    def count(self, key):
+        slot = self._slots.get(key)
+        return 0 if slot is None else int(self.offsets[slot + 1] - self.offsets[slot])
+
+    def counts(self):
+        return pd.Series(np.diff(self.offsets), index=self.keys, name='count')
+
+    def positions(self, key):
+        """Row positions holding ``key``, ascending; a view, do not modify."""
+        slot = self._slots.get(key)
+        if slot is None:
+            return self.order[:0]
+        return self.order[self.offsets[slot]:self.offsets[slot + 1]]
+
+    def positions_between(self, low, high):
+        """Row positions whose value lies in ``[low, high]``, grouped by value."""
+        start = self.keys.searchsorted(low, side='left')
+        stop = self.keys.searchsorted(high, side='right')
+        return self.order[self.offsets[start]:self.offsets[stop]]
+
+    def take(self, frame, key):
+        """The rows of ``frame`` (the indexed frame) holding ``key``."""
+        return frame.take(self.positions(key))
+
+
+@derived
+def index_for(cleaned, column):
+    """The :class:`SegmentIndex` of ``column``, built once per data version."""
+    return SegmentIndex.build(cleaned.frame[column])
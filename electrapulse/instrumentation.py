@@ -0,0 +1,259 @@
+"""Process-wide timings and counters of the dashboard's hot paths.
+
+Code runs inside named spans (``with span('section.Range'):``). A span
+records its wall time, the CPU time of its thread, the bytes it sent to the
+browser (reported with :func:`sent`) and, with ``ELECTRAPULSE_TRACE_MEMORY``,
+the peak of memory allocated while it ran. Totals per span name are kept for
+the life of the process next to plain counters such as reruns and sessions,
+and gauges such as the bytes held by each shared cache (see
+:mod:`electrapulse.memory`).
+
+A span costs two clock reads and a lock, so the instrumentation stays on in
+production (``ELECTRAPULSE_INSTRUMENT=0`` turns it off). Memory tracing is
+the expensive part: ``tracemalloc`` slows every allocation down, so it is off
+by default, and since its peak is process-wide only one span at a time
+measures it; spans that start while another one is measuring skip it.
+
+The metrics are dumped as JSON or in the Prometheus text format, shown in
+the dashboard's debug panel and, with ``ELECTRAPULSE_METRICS_PATH``, written
+to a file after every rerun for a Prometheus textfile collector.
+"""
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+
+from electrapulse import settings
+
+
+class Metrics:
+    """Per-span totals and counters, safe to update from any thread."""
+
+    def __init__(self):
+        self.started = time.time()
+        self._spans = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, wall, cpu, payload=0, peak=None):
+        with self._lock:
+            stats = self._spans.get(name)
+            if stats is None:
+                stats = self._spans[name] = {'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0,
+                                             'max_wall_seconds': 0.0, 'payload_bytes': 0,
+                                             'memory_samples': 0, 'peak_bytes': 0}
+            stats['calls'] += 1
+            stats['wall_seconds'] += wall
+            stats['cpu_seconds'] += cpu
+            stats['max_wall_seconds'] = max(stats['max_wall_seconds'], wall)
+            stats['payload_bytes'] += payload
+            if peak is not None:
+                stats['memory_samples'] += 1
+                stats['peak_bytes'] = max(stats['peak_bytes'], peak)
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def snapshot(self):
+        """The current metrics as a JSON-serializable dict."""
+        # Imported here: the caches and admission control record through this module.
+        from electrapulse.figcache import figure_cache
+        from electrapulse.memory import admission, budget
+
+        with self._lock:
+            spans = {name: dict(stats) for name, stats in sorted(self._spans.items())}
+            counters = dict(sorted(self._counters.items()))
+        counters.update({
+            'figure_cache_hits': figure_cache.hits,
+            'figure_cache_misses': figure_cache.misses,
+        })
+        caches = budget.usage()
+        return {
+            'uptime_seconds': time.time() - self.started,
+            'counters': counters,
+            'gauges': {
+                'figure_cache_bytes': figure_cache.bytes,
+                'figure_cache_entries': len(figure_cache),
+                'memory_budget_bytes': budget.max_bytes,
+                'memory_used_bytes': sum(caches.values()),
+                'compute_slots': admission.slots,
+                'compute_waiting': admission.waiting,
+            },
+            'caches': caches,
+            'spans': spans,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+            self._counters.clear()
+            self.started = time.time()
+
+
+# The Prometheus metric of each span statistic: name, type and help text.
+SPAN_METRICS = {
+    'calls': ('electrapulse_span_calls_total', 'counter', 'Times each span ran.'),
+    'wall_seconds': ('electrapulse_span_seconds_total', 'counter', 'Wall time spent in each span.'),
+    'cpu_seconds': ('electrapulse_span_cpu_seconds_total', 'counter', 'CPU time of the thread running each span.'),
+    'max_wall_seconds': ('electrapulse_span_max_seconds', 'gauge', 'Longest single run of each span.'),
+    'payload_bytes': ('electrapulse_span_payload_bytes_total', 'counter', 'Bytes each span sent to the browser.'),
+    'memory_samples': ('electrapulse_span_memory_samples_total', 'counter', 'Runs of each span that traced memory.'),
+    'peak_bytes': ('electrapulse_span_peak_bytes', 'gauge', 'Largest memory allocated during one traced run.'),
+}
+
+
+def to_json(snapshot):
+    return json.dumps(snapshot, indent=2)
+
+
+def to_prometheus(snapshot):
+    """``snapshot`` in the Prometheus text exposition format."""
+    lines = ['# HELP electrapulse_uptime_seconds Seconds since the metrics were started or reset.',
+             '# TYPE electrapulse_uptime_seconds gauge',
+             f"electrapulse_uptime_seconds {snapshot['uptime_seconds']:.3f}"]
+    for kind, suffix in (('counters', '_total'), ('gauges', '')):
+        for name, value in snapshot[kind].items():
+            metric = f'electrapulse_{name}{suffix}'
+            lines += [f'# TYPE {metric} {kind[:-1]}', f'{metric} {value}']
+    lines += ['# HELP electrapulse_cache_bytes Estimated bytes held by each shared cache.',
+              '# TYPE electrapulse_cache_bytes gauge']
+    lines += [f'electrapulse_cache_bytes{{cache="{name}"}} {nbytes}' for name, nbytes in snapshot['caches'].items()]
+    for field, (metric, kind, description) in SPAN_METRICS.items():
+        lines += [f'# HELP {metric} {description}', f'# TYPE {metric} {kind}']
+        for name, stats in snapshot['spans'].items():
+            label = name.replace('\\', '\\\\').replace('"', '\\"')
+            lines.append(f'{metric}{{span="{label}"}} {stats[field]}')
+    return '\n'.join(lines) + '\n'
+
+
+def span_table(snapshot):
+    """The spans of ``snapshot`` as a DataFrame, slowest in total first, with mean times in ms."""
+    table = pd.DataFrame.from_dict(snapshot['spans'], orient='index')
+    if table.empty:
+        return table
+    table['mean_wall_ms'] = table['wall_seconds'] / table['calls'] * 1000
+    table['mean_cpu_ms'] = table['cpu_seconds'] / table['calls'] * 1000
+    return table.sort_values('wall_seconds', ascending=False)
+
+
+def cache_table(snapshot):
+    """The shared caches of ``snapshot`` as a DataFrame, largest first, in MiB."""
+    table = pd.Series(snapshot['caches'], name='MiB', dtype=float) / 2 ** 20
+    return table.sort_values(ascending=False).to_frame()
+
+
+def write_metrics(path, snapshot=None):
+    """Write the Prometheus text of the metrics to ``path``, replacing it atomically."""
+    text = to_prometheus(metrics.snapshot() if snapshot is None else snapshot)
+    with open(path + '.partial', 'w') as file:
+        file.write(text)
+    os.replace(path + '.partial', path)
+
+
+class Span:
+    """One timed run of a named piece of code; see :func:`span`."""
+
+    def __init__(self, name, memory=True):
+        self.name = name
+        self.memory = memory
+        self.payload = 0
+        self._tracing = False
+        self._wall = None
+
+    def start(self):
+        self._tracing = self.memory and settings.TRACE_MEMORY and _memory_lock.acquire(blocking=False)
+        if self._tracing:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            self._base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        _stack().append(self)
+        self._cpu = time.thread_time()
+        self._wall = time.perf_counter()
+        return self
+
+    def end(self):
+        """Record the span; later calls do nothing."""
+        if self._wall is None:
+            return
+        wall = time.perf_counter() - self._wall
+        cpu = time.thread_time() - self._cpu
+        self._wall = None
+        stack = _stack()
+        if self in stack:
+            stack.remove(self)
+        peak = None
+        if self._tracing:
+            peak = max(tracemalloc.get_traced_memory()[1] - self._base, 0)
+            self._tracing = False
+            _memory_lock.release()
+        metrics.record(self.name, wall, cpu, self.payload, peak)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.end()
+
+
+class _Disabled:
+    payload = 0
+
+    def start(self):
+        return self
+
+    def end(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+def span(name, memory=True):
+    """A :class:`Span` named ``name``, used as a context manager or with ``start()``/``end()``.
+
+    ``memory=False`` keeps a long span that encloses others from tracing
+    memory, which would leave the spans inside it unable to.
+    """
+    return Span(name, memory) if settings.INSTRUMENT else _Disabled()
+
+
+def timed(name, fn):
+    """``fn`` wrapped to run in a span named ``name``."""
+    def wrapper(*args, **kwargs):
+        with span(name):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def sent(nbytes):
+    """Add ``nbytes`` sent to the browser to the innermost span running on this thread."""
+    stack = _stack()
+    if stack:
+        stack[-1].payload += int(nbytes)
+
+
+def count(name, amount=1):
+    if settings.INSTRUMENT:
+        metrics.count(name, amount)
+
+
+_local = threading.local()
+_memory_lock = threading.Lock()
+
+
+def _stack():
+    stack = getattr(_local, 'spans', None)
+    if stack is None:
+        stack = _local.spans = []
+    return stack
+
+
+metrics = Metrics()
@@ -0,0 +1,105 @@
+"""Schema-typed, process-wide cached loading of the EV population data.
+
+Streamlit re-executes ``main.py`` on every widget interaction and for every
+session, but imported modules stay resident, so the cache below is shared by
+all sessions of a server process. Entries are keyed by the file path, its
+mtime and size (plus the requested columns), so replacing the CSV on disk is
+picked up on the next rerun while an unchanged file is never parsed twice.
+
+When a fresh columnar snapshot (see :mod:`electrapulse.snapshot`) sits next
+to the CSV it is read instead of parsing the CSV. That saves the parse, not
+memory: the frame is converted from the mapped snapshot into process memory.
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+import pandas as pd
+
+from electrapulse import snapshot
+from electrapulse.memory import budget
+from electrapulse.schema import ANALYSIS_COLUMNS, DATA_PATH, SCHEMA, add_derived, narrow_integers, read_csv
+
+__all__ = ['ANALYSIS_COLUMNS', 'DATA_PATH', 'SCHEMA', 'Dataset', 'clear_cache', 'file_version', 'load_dataset']
+
+
+@dataclass(frozen=True, eq=False)
+class Dataset:
+    """A parsed registration frame plus how it was obtained.
+
+    The frame is shared between sessions and must be treated as read-only.
+    """
+    frame: pd.DataFrame
+    path: str
+    version: tuple
+    source: str
+    parse_seconds: float
+    resident_bytes: int
+
+    @property
+    def rows(self):
+        return len(self.frame)
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+# One dataset per file and column set, replaced with its version; never evicted.
+budget.register('datasets', lambda: sum(dataset.resident_bytes for dataset in list(_cache.values())))
+
+
+def file_version(path):
+    """Return the ``(mtime_ns, size)`` pair identifying the data's contents.
+
+    Falls back to the version recorded in the snapshot when only the
+    snapshot was deployed.
+    """
+    if not os.path.exists(path) and os.path.exists(snapshot.snapshot_path(path)):
+        return snapshot.source_version(snapshot.snapshot_path(path))
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def load_dataset(path=DATA_PATH, columns=ANALYSIS_COLUMNS):
+    """Return the cached :class:`Dataset` for ``path``, parsing it if needed.
+
+    ``columns=None`` loads every column present in the file.
+    """
+    path = os.path.abspath(path)
+    columns = None if columns is None else tuple(columns)
+    version = file_version(path)
+    slot = (path, columns)
+    dataset = _cache.get(slot)
+    if dataset is not None and dataset.version == version:
+        return dataset
+    with _cache_lock:
+        # Another session may have finished parsing while we waited.
+        dataset = _cache.get(slot)
+        if dataset is None or dataset.version != version:
+            dataset = _read(path, columns, version)
+            _cache[slot] = dataset
+    return dataset
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+def _read(path, columns, version):
+    started = time.perf_counter()
+    if snapshot.is_fresh(path):
+        source = 'snapshot'
+        frame = snapshot.read_snapshot(snapshot.snapshot_path(path), columns)
+    else:
+        source = 'csv'
+        frame = narrow_integers(add_derived(read_csv(path, columns), columns))
+    parse_seconds = time.perf_counter() - started
+    return Dataset(
+        frame=frame,
+        path=path,
+        version=version,
+        source=source,
+        parse_seconds=parse_seconds,
+        resident_bytes=int(frame.memory_usage(deep=True).sum()),
+    )
@@ -0,0 +1,209 @@
+"""Memoization of values derived from shared, immutable objects."""
+import functools
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from electrapulse.memory import admission, budget, sizeof
+
+
+class OwnedCache:
+    """Values computed from shared owners, kept for as long as their owner is alive.
+
+    The store behind :func:`derived`. Entries are keyed by the owner's
+    identity and a hashable key, so a replaced data version takes its values
+    along. One value per owner is computed at a time, through
+    :data:`~electrapulse.memory.admission`, and concurrent sessions asking for
+    it wait for that computation. NumPy arrays of stored values are made
+    read-only, as they are shared by every session. With ``maxsize``, only
+    that many of the most recently used keys are kept per owner and the
+    memory budget may evict them; without it, values are only accounted.
+    """
+
+    def __init__(self, name, maxsize=None, priority=1):
+        self.maxsize = maxsize
+        self._entries = weakref.WeakKeyDictionary()
+        self._locks = weakref.WeakKeyDictionary()
+        self._guard = threading.Lock()
+        budget.register(name, self.nbytes, None if maxsize is None else self.evict, priority)
+
+    def get_or_compute(self, owner, key, compute):
+        hit, value = self._get(owner, key)
+        if hit:
+            return value
+        with admission:
+            with self._guard:
+                lock = self._locks.setdefault(owner, threading.Lock())
+            with lock:
+                hit, value = self._get(owner, key)
+                if hit:
+                    return value
+                value = compute()
+                _freeze(value)
+                nbytes = sizeof(value)
+                with self._guard:
+                    cached = self._entries.setdefault(owner, OrderedDict())
+                    cached[key] = value, nbytes
+                    while self.maxsize is not None and len(cached) > self.maxsize:
+                        cached.popitem(last=False)
+        budget.enforce()
+        return value
+
+    def _get(self, owner, key):
+        with self._guard:
+            cached = self._entries.get(owner)
+            if cached is None or key not in cached:
+                return False, None
+            cached.move_to_end(key)
+            return True, cached[key][0]
+
+    def nbytes(self):
+        with self._guard:
+            return sum(nbytes for cached in self._entries.values() for _, nbytes in cached.values())
+
+    def evict(self):
+        """Drop the least recently used value of the oldest owner; returns its bytes, 0 if empty."""
+        with self._guard:
+            for cached in self._entries.values():
+                if cached:
+                    return cached.popitem(last=False)[1][1]
+        return 0
+
+    def clear(self):
+        with self._guard:
+            self._entries.clear()
+            self._locks.clear()
+
+
+def derived(fn=None, *, maxsize=None):
+    """Cache ``fn(owner, *args)`` for as long as ``owner`` is alive.
+
+    ``owner`` is a shared object such as a loaded dataset; results are keyed
+    by its identity and the remaining (hashable) arguments and disappear with
+    it (see :class:`OwnedCache`). Concurrent sessions asking for the same
+    value wait for one computation. With ``maxsize``, only that many of the
+    most recently used argument combinations are kept per owner.
+    """
+    if fn is None:
+        return functools.partial(derived, maxsize=maxsize)
+    cache = OwnedCache(f"{fn.__module__.rpartition('.')[2]}.{fn.__name__}", maxsize)
+
+    @functools.wraps(fn)
+    def wrapper(owner, *args):
+        return cache.get_or_compute(owner, args, lambda: fn(owner, *args))
+
+    wrapper.cache = cache
+    wrapper.cache_clear = cache.clear
+    return wrapper
+
+
+def _freeze(value):
+    """Make the NumPy arrays of ``value`` and of its fields or items read-only."""
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+        return
+    items = value if isinstance(value, tuple) else vars(value).values() if hasattr(value, '__dict__') else ()
+    for item in items:
+        if isinstance(item, np.ndarray):
+            item.flags.writeable = False
+
+
+class LRUCache:
+    """Thread-safe LRU of computed values keyed by e.g. :func:`fingerprint`.
+
+    A value is computed once, through :data:`~electrapulse.memory.admission`,
+    however many threads ask for it meanwhile. With a ``name`` the cache is
+    accounted in the memory budget, which evicts from it at ``priority``.
+    """
+
+    def __init__(self, maxsize, name=None, priority=0):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._computing = {}
+        self._lock = threading.Lock()
+        if name is not None:
+            budget.register(name, self.nbytes, self.evict, priority)
+
+    def get_or_compute(self, key, compute):
+        hit, value = self._get(key)
+        if hit:
+            return value
+        with admission:
+            with self._lock:
+                computing = self._computing.setdefault(key, threading.Lock())
+            with computing:
+                hit, value = self._get(key)
+                if hit:
+                    return value
+                try:
+                    value = compute()
+                    nbytes = sizeof(value)
+                    with self._lock:
+                        self._entries[key] = value, nbytes
+                        while len(self._entries) > self.maxsize:
+                            self._entries.popitem(last=False)
+                finally:
+                    with self._lock:
+                        self._computing.pop(key, None)
+        budget.enforce()
+        return value
+
+    def _get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return False, None
+            self._entries.move_to_end(key)
+            return True, self._entries[key][0]
+
+    def nbytes(self):
+        with self._lock:
+            return sum(nbytes for _, nbytes in self._entries.values())
+
+    def evict(self):
+        """Drop the least recently used value; returns its bytes, 0 if empty."""
+        with self._lock:
+            return self._entries.popitem(last=False)[1][1] if self._entries else 0
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def fingerprint(*parts):
+    """A stable hex digest of pandas/NumPy objects, containers and scalars."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        _feed(digest, part)
+    return digest.hexdigest()
+
+
+def _feed(digest, part):
+    digest.update(type(part).__name__.encode() + b'\x00')
+    if isinstance(part, (pd.Series, pd.DataFrame, pd.Index)):
+        if isinstance(part, pd.DataFrame):
+            labels, dtypes = list(part.columns), list(part.dtypes)
+        else:
+            labels, dtypes = [part.name], [part.dtype]
+        digest.update(repr((labels, [str(dtype) for dtype in dtypes])).encode())
+        digest.update(pd.util.hash_pandas_object(part, index=not isinstance(part, pd.Index)).to_numpy().tobytes())
+    elif isinstance(part, np.ndarray):
+        digest.update(repr((part.dtype.str, part.shape)).encode())
+        digest.update(np.ascontiguousarray(part).tobytes())
+    elif isinstance(part, dict):
+        for key in sorted(part, key=repr):
+            _feed(digest, key)
+            _feed(digest, part[key])
+    elif isinstance(part, (list, tuple)):
+        digest.update(str(len(part)).encode())
+        for item in part:
+            _feed(digest, item)
+    else:
+        digest.update(repr(part).encode())
+    digest.update(b'\x01')
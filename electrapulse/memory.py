@@ -0,0 +1,158 @@
+"""Process-wide memory budget of the shared caches, and admission control.
+
+Every session of a server process reads the same loaded dataset and the same
+values derived from it (:func:`electrapulse.memo.derived`, the figure cache,
+the forecast caches), so what a process holds depends on the data and on
+how many distinct filter selections are in use, not on how many people are
+looking. Each cache registers with :data:`budget` and reports the estimated
+bytes of its entries; when their total passes ``ELECTRAPULSE_MEMORY_BUDGET_MB``,
+entries are evicted, least recently used first, from the cheapest caches to
+recompute. Caches holding one value per dataset (the dataset itself, its
+cleaned frame, its indexes) are accounted but never evicted. Sizes are
+estimated once, when a value is stored, and an object shared by values of
+several caches counts in each, which errs toward evicting early.
+
+Computations run through :data:`admission`: at most
+``ELECTRAPULSE_COMPUTE_SLOTS`` of them (one per CPU by default) at a time,
+process-wide. A burst of sessions asking for values nobody has computed yet
+queues for a slot instead of running side by side, and sessions asking for
+the same value wait for one computation and share its result.
+"""
+import os
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+from electrapulse import settings
+from electrapulse.instrumentation import count, span
+
+
+def sizeof(value, depth=3, _seen=None):
+    """Estimated bytes held by ``value``.
+
+    Arrays, frames, Arrow data and bytes are found through containers and
+    object attributes (dataclass fields, cached properties) up to ``depth``
+    levels down; an object reached twice counts once.
+    """
+    seen = set() if _seen is None else _seen
+    if id(value) in seen or value is None or isinstance(value, (bool, int, float, str)):
+        return 0
+    seen.add(id(value))
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if hasattr(value, 'nbytes') and type(value).__module__.startswith('pyarrow'):
+        return int(value.nbytes)
+    if depth <= 0:
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        items = [*value.keys(), *value.values()]
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        items = value
+    elif hasattr(value, '__dict__'):
+        items = vars(value).values()
+    else:
+        return sys.getsizeof(value)
+    return sys.getsizeof(value) + sum(sizeof(item, depth - 1, seen) for item in items)
+
+
+class MemoryBudget:
+    """Byte accounting of registered caches, evicting from them past ``max_bytes`` (0: no limit)."""
+
+    def __init__(self, max_bytes=settings.MEMORY_BUDGET_BYTES):
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._caches = []
+        self._lock = threading.Lock()
+
+    def register(self, name, nbytes, evict=None, priority=0):
+        """Account ``nbytes()`` under ``name``.
+
+        ``evict()`` drops the cache's least recently used entry and returns
+        the bytes it held (0 when it has nothing left to drop); caches without
+        one are never evicted. Lower ``priority`` caches are evicted first.
+        """
+        with self._lock:
+            self._caches.append((priority, len(self._caches), name, nbytes, evict))
+            self._caches.sort()
+
+    def usage(self):
+        """``{cache name: estimated bytes}``; caches registered under one name are summed."""
+        usage = {}
+        for _, _, name, nbytes, _ in list(self._caches):
+            usage[name] = usage.get(name, 0) + nbytes()
+        return usage
+
+    @property
+    def used(self):
+        return sum(self.usage().values())
+
+    def enforce(self):
+        """Evict until the caches fit the budget or nothing evictable is left; returns the bytes freed.
+
+        Called after a cache grows. When another thread is already
+        enforcing, returns at once: that thread sees the new entry too.
+        """
+        if not self.max_bytes or not self._lock.acquire(blocking=False):
+            return 0
+        try:
+            excess = self.used - self.max_bytes
+            freed = 0
+            for *_, evict in self._caches:
+                while evict is not None and freed < excess:
+                    nbytes = evict()
+                    if not nbytes:
+                        break
+                    freed += nbytes
+                    self.evictions += 1
+                    count('memory_evictions')
+            return freed
+        finally:
+            self._lock.release()
+
+
+class Admission:
+    """At most ``slots`` computations at a time across all threads; the rest wait in line.
+
+    Used as a context manager around a computation. Computations nested in
+    one another on a thread (a filtered view building the cells it needs)
+    hold a single slot, so they cannot deadlock waiting for themselves.
+    """
+
+    def __init__(self, slots=settings.COMPUTE_SLOTS):
+        self.slots = slots or os.cpu_count() or 1
+        self.waiting = 0
+        self._waiting_lock = threading.Lock()
+        self._semaphore = threading.Semaphore(self.slots)
+        self._local = threading.local()
+
+    def __enter__(self):
+        depth = getattr(self._local, 'depth', 0)
+        if not depth and not self._semaphore.acquire(blocking=False):
+            count('admission_queued')
+            with self._waiting_lock:
+                self.waiting += 1
+            try:
+                with span('admission.wait', memory=False):
+                    self._semaphore.acquire()
+            finally:
+                with self._waiting_lock:
+                    self.waiting -= 1
+        self._local.depth = depth + 1
+        return self
+
+    def __exit__(self, *exc):
+        self._local.depth -= 1
+        if not self._local.depth:
+            self._semaphore.release()
+
+
+budget = MemoryBudget()
+admission = Admission()
@@ -0,0 +1,142 @@
+"""Multi-core aggregation over row partitions.
+
+Enabled with ``ELECTRAPULSE_PARALLEL=1``; the rows are split into one
+contiguous range per worker of the shared process pool.
+
+In memory, the expensive step behind every section is numbering the cube
+cell of each row (:class:`~electrapulse.aggregations.Cells`). The parent
+packs the dimension codes of each row into one integer key in a shared
+memory block; every worker numbers the distinct keys of its range in order
+of appearance and writes its rows' local ids to a second shared block. The
+parent then numbers all distinct keys in partition order and maps local ids
+to global ones, which gives exactly the cells (and so the cube, rollups and
+filters) of the serial path: cells are numbered by first appearance in both.
+
+Streamed, each worker memory-maps the snapshot and reduces its range to
+:class:`~electrapulse.streaming.Partials`, which the parent merges in
+partition order: counts and sums are added, means and top-k lists are
+derived from the merged cube. Partials merge by first appearance too, so the
+result equals the serial stream.
+
+Both fall back to the serial path with a single worker, and streaming also
+does without a fresh snapshot (a CSV cannot be split without parsing it).
+"""
+import math
+import os
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from electrapulse import settings, snapshot
+from electrapulse.aggregations import DIMENSIONS, Cells
+from electrapulse.forecasting import process_pool
+from electrapulse.schema import DATA_PATH
+from electrapulse.streaming import Partials, reduce_chunks, snapshot_chunks, snapshot_rows, stream_partials
+
+
+def workers():
+    return settings.WORKERS or os.cpu_count() or 1
+
+
+def partitions(rows, parts):
+    """``(start, stop)`` of ``parts`` contiguous row ranges covering ``rows`` rows."""
+    bounds = np.linspace(0, rows, parts + 1).astype(np.int64)
+    return [(int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+
+
+def build_cells(frame, parts=None):
+    """:class:`Cells` of ``frame`` numbered in a process pool; equal to ``Cells.build(frame)``."""
+    parts = parts or workers()
+    codes, labels = [], []
+    for name in DIMENSIONS:
+        column = frame[name]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            codes.append(column.cat.codes.to_numpy())
+            labels.append(column.cat.categories)
+        else:
+            column_codes, uniques = pd.factorize(column)
+            codes.append(column_codes)
+            labels.append(uniques)
+    sizes = [max(len(values), 1) for values in labels]
+    # Missing dimensions and keys that would overflow are left to the serial path.
+    if parts < 2 or len(frame) < parts or math.prod(sizes) >= 2 ** 62 or any((part < 0).any() for part in codes):
+        return Cells.build(frame)
+
+    rows = len(frame)
+    keys_block = shared_memory.SharedMemory(create=True, size=max(rows * 8, 1))
+    ids_block = shared_memory.SharedMemory(create=True, size=max(rows * 4, 1))
+    try:
+        keys = np.ndarray(rows, dtype=np.int64, buffer=keys_block.buf)
+        keys[:] = 0
+        for part, size in zip(codes, sizes):
+            keys *= size
+            keys += part
+        del keys
+        ranges = partitions(rows, parts)
+        local_keys = list(process_pool().map(
+            _number_cells, *zip(*[(keys_block.name, ids_block.name, rows, start, stop) for start, stop in ranges])))
+
+        # Number the distinct keys of all partitions by first appearance.
+        global_ids, cell_keys = pd.factorize(np.concatenate(local_keys))
+        global_ids = global_ids.astype(np.int32)
+        local_ids = np.ndarray(rows, dtype=np.int32, buffer=ids_block.buf)
+        ids = np.empty(rows, dtype=np.int32)
+        offset = 0
+        for (start, stop), part in zip(ranges, local_keys):
+            ids[start:stop] = global_ids[offset:offset + len(part)][local_ids[start:stop]]
+            offset += len(part)
+        del local_ids
+    finally:
+        for block in (keys_block, ids_block):
+            block.close()
+            block.unlink()
+
+    columns = {}
+    for name, values, size in zip(DIMENSIONS[::-1], labels[::-1], sizes[::-1]):
+        cell_keys, code = np.divmod(cell_keys, size)
+        column = pd.Series(values.take(code), name=name)
+        # Plain labels, as Cells.build gives them.
+        columns[name] = column.astype(str) if isinstance(frame[name].dtype, pd.CategoricalDtype) else column
+    keys = pd.DataFrame({name: columns[name] for name in DIMENSIONS})
+    return Cells(ids=ids, keys=keys, ranges=frame['Electric Range'].to_numpy(dtype=np.float64))
+
+
+def _number_cells(keys_name, ids_name, rows, start, stop):
+    """Write local cell ids of rows ``[start, stop)``; returns the distinct keys in order of appearance."""
+    keys_block = shared_memory.SharedMemory(name=keys_name)
+    ids_block = shared_memory.SharedMemory(name=ids_name)
+    try:
+        keys = np.ndarray(rows, dtype=np.int64, buffer=keys_block.buf)
+        ids = np.ndarray(rows, dtype=np.int32, buffer=ids_block.buf)
+        local_ids, distinct = pd.factorize(keys[start:stop])
+        ids[start:stop] = local_ids
+        del keys, ids
+        return np.asarray(distinct)
+    finally:
+        keys_block.close()
+        ids_block.close()
+
+
+def stream_partials_parallel(path=DATA_PATH, chunk_rows=settings.CHUNK_ROWS, parts=None):
+    """:class:`Partials` of the data at ``path`` reduced in a process pool; equal to ``stream_partials``."""
+    parts = parts or workers()
+    path = os.path.abspath(path)
+    if parts < 2 or not snapshot.is_fresh(path):
+        return stream_partials(path, chunk_rows)
+    started = time.perf_counter()
+    source = snapshot.snapshot_path(path)
+    ranges = partitions(snapshot_rows(source), parts)
+    if len(ranges) < 2:
+        return stream_partials(path, chunk_rows)
+    partials = None
+    jobs = [(source, chunk_rows, start, stop) for start, stop in ranges]
+    for current in process_pool().map(_reduce_partition, *zip(*jobs)):
+        partials = current if partials is None else partials.merge(current)
+    return Partials(partials.cube, partials.ranges, partials.locations, partials.stages, partials.chunks,
+                    time.perf_counter() - started)
+
+
+def _reduce_partition(path, chunk_rows, start, stop):
+    return reduce_chunks(snapshot_chunks(path, chunk_rows, start=start, stop=stop))
@@ -0,0 +1,745 @@
+"""Ad hoc group-by, filter and top-k queries over the registration snapshot.
+
+Queries are a small SQL subset over one table of registrations::
+
+    SELECT "Electric Utility", Make, count(*) AS vehicles, mean("Electric Range")
+    WHERE County IN ('King', 'Pierce') AND "Model Year" >= 2018
+    GROUP BY "Electric Utility", Make ORDER BY vehicles DESC LIMIT 20
+
+Columns are those of :data:`~electrapulse.schema.SCHEMA` plus the derived
+coordinates, double-quoted when they are not plain words (plain words match
+case-insensitively). ``WHERE`` takes comparisons, ``[NOT] IN``, ``[NOT]
+BETWEEN``, ``[NOT] LIKE``, ``IS [NOT] NULL``, ``AND``, ``OR`` and ``NOT``;
+the aggregates are ``count``, ``count_distinct``, ``sum``, ``mean`` (or
+``avg``), ``min``, ``max`` and ``stddev``; ``bucket(column, width)`` bands a
+numeric column, e.g. ``bucket("Base MSRP", 10000)``. Without aggregates a
+query lists rows. ``GROUP BY`` may be left out: the non-aggregate columns
+are the groups. Results are capped at :data:`MAX_ROWS` rows.
+
+A query runs as an Arrow Acero plan over the memory-mapped snapshot: only
+the columns it names are read, the predicate is evaluated batch by batch
+before anything is projected or aggregated, and no filtered DataFrame is
+ever built. Results are cached by data version and the normalized query
+text, so the same query written differently is computed once.
+"""
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import acero
+
+from electrapulse import settings, snapshot
+from electrapulse.loader import file_version
+from electrapulse.memo import LRUCache
+from electrapulse.memory import budget
+from electrapulse.schema import DATA_PATH, DERIVED, SCHEMA
+
+COLUMNS = (*SCHEMA, *DERIVED)
+MAX_ROWS = 10_000
+AGGREGATES = {
+    'count': 'count',
+    'count_distinct': 'count_distinct',
+    'sum': 'sum',
+    'mean': 'mean',
+    'avg': 'mean',
+    'min': 'min',
+    'max': 'max',
+    'stddev': 'stddev',
+}
+KEYWORDS = {'SELECT', 'FROM', 'WHERE', 'GROUP', 'BY', 'ORDER', 'LIMIT', 'AS', 'AND', 'OR', 'NOT', 'IN',
+            'BETWEEN', 'IS', 'NULL', 'LIKE', 'ASC', 'DESC'}
+COMPARISONS = {'=': 'equal', '!=': 'not_equal', '<>': 'not_equal', '<': 'less', '<=': 'less_equal',
+               '>': 'greater', '>=': 'greater_equal'}
+# The one table a query can name in its optional FROM clause.
+TABLE = 'registrations'
+
+TOKEN = re.compile(r"""\s*(?:
+    (?P<number>-?\d+(?:\.\d+)?)
+  | (?P<string>'(?:[^']|'')*')
+  | (?P<quoted>"(?:[^"]|"")*")
+  | (?P<word>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<op><=|>=|<>|!=|[=<>(),*])
+)""", re.VERBOSE)
+
+
+class QueryError(ValueError):
+    """A query that does not parse, names unknown columns or compares mismatched types."""
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _literal_text(value):
+    if value is None:
+        return 'NULL'
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return repr(value)
+
+
+# Expressions. Each renders its normalized text and compiles to an Arrow
+# compute expression against the (column-pruned) table being queried.
+
+@dataclass(frozen=True)
+class Column:
+    name: str
+
+    def text(self):
+        return _quote(self.name)
+
+    def columns(self):
+        return {self.name}
+
+    def compile(self, source, strings=False):
+        field = pc.field(self.name)
+        kind = source.schema.field(self.name).type
+        # String functions have no kernels for dictionary-encoded columns.
+        return field.cast(kind.value_type) if strings and pa.types.is_dictionary(kind) else field
+
+    def grouping(self, source):
+        """The column as a group key: hash grouping takes dictionaries with 32-bit indices only."""
+        kind = source.schema.field(self.name).type
+        if pa.types.is_dictionary(kind):
+            return pc.field(self.name).cast(pa.dictionary(pa.int32(), kind.value_type))
+        return pc.field(self.name)
+
+    def kind(self, source):
+        kind = source.schema.field(self.name).type
+        return kind.value_type if pa.types.is_dictionary(kind) else kind
+
+
+@dataclass(frozen=True)
+class Literal:
+    value: object
+
+    def text(self):
+        return _literal_text(self.value)
+
+    def columns(self):
+        return set()
+
+    def compile(self, source, strings=False):
+        return pc.scalar(self.value)
+
+    def kind(self, source):
+        return pa.scalar(self.value).type
+
+
+@dataclass(frozen=True)
+class Bucket:
+    """``bucket(column, width)``: the column rounded down to a multiple of ``width``."""
+    column: Column
+    width: float
+
+    def text(self):
+        return f'bucket({self.column.text()}, {self.width!r})'
+
+    def columns(self):
+        return self.column.columns()
+
+    def compile(self, source, strings=False):
+        if not _numeric(self.column.kind(source)):
+            raise QueryError(f'bucket() needs a numeric column, not {self.column.text()}')
+        value = self.column.compile(source).cast(pa.float64())
+        return pc.multiply(pc.floor(pc.divide(value, self.width)), self.width)
+
+    def kind(self, source):
+        return pa.float64()
+
+
+@dataclass(frozen=True)
+class Aggregate:
+    function: str
+    argument: object = None
+
+    def text(self):
+        return f"{self.function}({'*' if self.argument is None else self.argument.text()})"
+
+    def columns(self):
+        return set() if self.argument is None else self.argument.columns()
+
+
+@dataclass(frozen=True)
+class Compare:
+    op: str
+    left: object
+    right: object
+
+    def text(self):
+        return f'{self.left.text()} {self.op} {self.right.text()}'
+
+    def columns(self):
+        return self.left.columns() | self.right.columns()
+
+    def compile(self, source):
+        _check_comparable(self.left, self.right, source)
+        return getattr(pc, COMPARISONS[self.op])(self.left.compile(source), self.right.compile(source))
+
+
+@dataclass(frozen=True)
+class In:
+    operand: object
+    values: tuple
+    negated: bool = False
+
+    def text(self):
+        values = ', '.join(_literal_text(value) for value in self.values)
+        return f"{self.operand.text()} {'NOT IN' if self.negated else 'IN'} ({values})"
+
+    def columns(self):
+        return self.operand.columns()
+
+    def compile(self, source):
+        for value in self.values:
+            _check_comparable(self.operand, Literal(value), source)
+        expression = self.operand.compile(source).isin(list(self.values))
+        return ~expression if self.negated else expression
+
+
+@dataclass(frozen=True)
+class Between:
+    operand: object
+    low: object
+    high: object
+    negated: bool = False
+
+    def text(self):
+        return (f"{self.operand.text()} {'NOT BETWEEN' if self.negated else 'BETWEEN'} "
+                f"{_literal_text(self.low)} AND {_literal_text(self.high)}")
+
+    def columns(self):
+        return self.operand.columns()
+
+    def compile(self, source):
+        for value in (self.low, self.high):
+            _check_comparable(self.operand, Literal(value), source)
+        operand = self.operand.compile(source)
+        expression = (operand >= pc.scalar(self.low)) & (operand <= pc.scalar(self.high))
+        return ~expression if self.negated else expression
+
+
+@dataclass(frozen=True)
+class Like:
+    operand: object
+    pattern: str
+    negated: bool = False
+
+    def text(self):
+        return f"{self.operand.text()} {'NOT LIKE' if self.negated else 'LIKE'} {_literal_text(self.pattern)}"
+
+    def columns(self):
+        return self.operand.columns()
+
+    def compile(self, source):
+        if not _textual(self.operand.kind(source)):
+            raise QueryError(f'LIKE needs a text column, not {self.operand.text()}')
+        if isinstance(self.operand, Column) and pa.types.is_dictionary(source.schema.field(self.operand.name).type):
+            # Match the distinct labels once instead of decoding every row.
+            labels = pa.chunked_array([chunk.dictionary for chunk in source.column(self.operand.name).chunks],
+                                      self.operand.kind(source)).unique()
+            expression = self.operand.compile(source).isin(labels.filter(pc.match_like(labels, self.pattern)))
+        else:
+            expression = pc.match_like(self.operand.compile(source, strings=True), self.pattern)
+        return ~expression if self.negated else expression
+
+
+@dataclass(frozen=True)
+class IsNull:
+    operand: object
+    negated: bool = False
+
+    def text(self):
+        return f"{self.operand.text()} IS {'NOT NULL' if self.negated else 'NULL'}"
+
+    def columns(self):
+        return self.operand.columns()
+
+    def compile(self, source):
+        operand = self.operand.compile(source)
+        return operand.is_valid() if self.negated else operand.is_null()
+
+
+@dataclass(frozen=True)
+class Logical:
+    """``AND`` or ``OR`` of two or more conditions."""
+    op: str
+    items: tuple
+
+    def text(self):
+        return f' {self.op} '.join(f'({item.text()})' if isinstance(item, Logical) else item.text()
+                                   for item in self.items)
+
+    def columns(self):
+        return set().union(*(item.columns() for item in self.items))
+
+    def compile(self, source):
+        compiled = [item.compile(source) for item in self.items]
+        expression = compiled[0]
+        for item in compiled[1:]:
+            expression = expression & item if self.op == 'AND' else expression | item
+        return expression
+
+
+@dataclass(frozen=True)
+class Not:
+    item: object
+
+    def text(self):
+        return f'NOT ({self.item.text()})'
+
+    def columns(self):
+        return self.item.columns()
+
+    def compile(self, source):
+        return ~self.item.compile(source)
+
+
+def _numeric(kind):
+    return pa.types.is_integer(kind) or pa.types.is_floating(kind)
+
+
+def _textual(kind):
+    return pa.types.is_string(kind) or pa.types.is_large_string(kind)
+
+
+def _check_comparable(left, right, source):
+    kinds = left.kind(source), right.kind(source)
+    if any(pa.types.is_null(kind) for kind in kinds):
+        raise QueryError('compare with NULL using IS NULL or IS NOT NULL')
+    if not (all(map(_numeric, kinds)) or all(map(_textual, kinds))):
+        raise QueryError(f'cannot compare {left.text()} with {right.text()}')
+
+
+@dataclass(frozen=True)
+class SelectItem:
+    expression: object
+    alias: str = None
+
+    @property
+    def name(self):
+        return self.alias or (self.expression.name if isinstance(self.expression, Column)
+                              else self.expression.text())
+
+    def text(self):
+        default = SelectItem(self.expression).name
+        return self.expression.text() + (f' AS {_quote(self.alias)}' if self.alias and self.alias != default else '')
+
+
+@dataclass(frozen=True)
+class Query:
+    """A parsed query; :meth:`text` is its normalized form."""
+    items: tuple
+    where: object = None
+    order_by: tuple = ()
+    limit: int = MAX_ROWS
+
+    @property
+    def keys(self):
+        return tuple(item for item in self.items if not isinstance(item.expression, Aggregate))
+
+    @property
+    def aggregates(self):
+        return tuple(item for item in self.items if isinstance(item.expression, Aggregate))
+
+    def columns(self):
+        columns = set().union(*(item.expression.columns() for item in self.items))
+        return columns | (self.where.columns() if self.where is not None else set())
+
+    def text(self):
+        parts = ['SELECT ' + ', '.join(item.text() for item in self.items)]
+        if self.where is not None:
+            parts.append('WHERE ' + self.where.text())
+        if self.aggregates and self.keys:
+            parts.append('GROUP BY ' + ', '.join(item.expression.text() for item in self.keys))
+        if self.order_by:
+            parts.append('ORDER BY ' + ', '.join(f"{_quote(name)} {'DESC' if descending else 'ASC'}"
+                                                 for name, descending in self.order_by))
+        parts.append(f'LIMIT {self.limit}')
+        return ' '.join(parts)
+
+
+def parse(text):
+    """Parse query ``text`` into a :class:`Query`; raises :class:`QueryError`."""
+    return _Parser(text).query()
+
+
+class _Parser:
+
+    def __init__(self, text):
+        self.tokens = []
+        position, text = 0, text.strip().rstrip(';')
+        while position < len(text):
+            match = TOKEN.match(text, position)
+            if match is None or match.end() == position:
+                raise QueryError(f'unexpected {text[position:position + 20].strip()!r}')
+            kind = match.lastgroup
+            value = match.group(kind)
+            if kind == 'word' and value.upper() in KEYWORDS:
+                kind, value = 'keyword', value.upper()
+            self.tokens.append((kind, value))
+            position = match.end()
+            while position < len(text) and text[position].isspace():
+                position += 1
+        self.position = 0
+
+    def peek(self, kind=None, value=None):
+        if self.position >= len(self.tokens):
+            return None
+        token = self.tokens[self.position]
+        if (kind is None or token[0] == kind) and (value is None or token[1] == value):
+            return token
+        return None
+
+    def accept(self, kind, value=None):
+        token = self.peek(kind, value)
+        if token is not None:
+            self.position += 1
+        return token
+
+    def expect(self, kind, value=None):
+        token = self.accept(kind, value)
+        if token is None:
+            found = self.tokens[self.position][1] if self.position < len(self.tokens) else 'the end'
+            raise QueryError(f'expected {value or kind}, found {found!r}')
+        return token
+
+    def keyword(self, *words):
+        for word in words:
+            self.expect('keyword', word)
+
+    def query(self):
+        self.keyword('SELECT')
+        items = [self.select_item()]
+        while self.accept('op', ','):
+            items.append(self.select_item())
+        if self.accept('keyword', 'FROM'):
+            table = self.name()
+            if table.lower() != TABLE:
+                raise QueryError(f'unknown table {table!r}; the only table is {TABLE!r}')
+        where = None
+        if self.accept('keyword', 'WHERE'):
+            where = self.condition()
+        groups = []
+        if self.accept('keyword', 'GROUP'):
+            self.keyword('BY')
+            groups = [self.operand()]
+            while self.accept('op', ','):
+                groups.append(self.operand())
+        order_by = []
+        if self.accept('keyword', 'ORDER'):
+            self.keyword('BY')
+            order_by = [self.order_item()]
+            while self.accept('op', ','):
+                order_by.append(self.order_item())
+        limit = MAX_ROWS
+        if self.accept('keyword', 'LIMIT'):
+            limit = self.expect('number')[1]
+            if not limit.isdigit():
+                raise QueryError('LIMIT takes a whole number')
+            limit = min(int(limit), MAX_ROWS)
+        if self.position < len(self.tokens):
+            raise QueryError(f'unexpected {self.tokens[self.position][1]!r}')
+        return _resolve(items, where, groups, order_by, limit)
+
+    def name(self):
+        token = self.accept('quoted')
+        if token is not None:
+            return token[1][1:-1].replace('""', '"')
+        return self.expect('word')[1]
+
+    def select_item(self):
+        word = self.peek('word')
+        if word is not None and word[1].lower() in AGGREGATES and self._called():
+            self.position += 1
+            self.expect('op', '(')
+            argument = None if self.accept('op', '*') else self.column()
+            self.expect('op', ')')
+            function = AGGREGATES[word[1].lower()]
+            if argument is None and function != 'count':
+                raise QueryError(f'{word[1]}(*) is not an aggregate; name a column')
+            expression = Aggregate(function, argument)
+        else:
+            expression = self.operand()
+        alias = self.name() if self.accept('keyword', 'AS') else None
+        return SelectItem(expression, alias)
+
+    def order_item(self):
+        """``(name or expression, descending)``: a plain name may be a result column's alias."""
+        if (self.peek('word') or self.peek('quoted')) and not self._called():
+            target = self.name()
+        else:
+            target = self.select_item().expression
+        descending = bool(self.accept('keyword', 'DESC'))
+        if not descending:
+            self.accept('keyword', 'ASC')
+        return target, descending
+
+    def _called(self):
+        following = self.tokens[self.position + 1] if self.position + 1 < len(self.tokens) else None
+        return following == ('op', '(')
+
+    def column(self):
+        return Column(_column(self.name()))
+
+    def operand(self):
+        word = self.peek('word')
+        if word is not None and word[1].lower() == 'bucket' and self._called():
+            self.position += 2
+            column = self.column()
+            self.expect('op', ',')
+            width = float(self.expect('number')[1])
+            self.expect('op', ')')
+            if not width > 0:
+                raise QueryError('bucket() takes a positive width')
+            return Bucket(column, width)
+        if self.peek('number') or self.peek('string') or self.peek('keyword', 'NULL'):
+            return Literal(self.literal())
+        return self.column()
+
+    def literal(self):
+        token = self.accept('number') or self.accept('string') or self.expect('keyword', 'NULL')
+        kind, value = token
+        if kind == 'number':
+            return float(value) if '.' in value else int(value)
+        if kind == 'string':
+            return value[1:-1].replace("''", "'")
+        return None
+
+    def condition(self):
+        items = [self.conjunction()]
+        while self.accept('keyword', 'OR'):
+            items.append(self.conjunction())
+        return items[0] if len(items) == 1 else Logical('OR', tuple(items))
+
+    def conjunction(self):
+        items = [self.negation()]
+        while self.accept('keyword', 'AND'):
+            items.append(self.negation())
+        return items[0] if len(items) == 1 else Logical('AND', tuple(items))
+
+    def negation(self):
+        if self.accept('keyword', 'NOT'):
+            return Not(self.negation())
+        return self.predicate()
+
+    def predicate(self):
+        if self.accept('op', '('):
+            condition = self.condition()
+            self.expect('op', ')')
+            return condition
+        operand = self.operand()
+        if self.accept('keyword', 'IS'):
+            negated = bool(self.accept('keyword', 'NOT'))
+            self.keyword('NULL')
+            return IsNull(operand, negated)
+        negated = bool(self.accept('keyword', 'NOT'))
+        if self.accept('keyword', 'IN'):
+            self.expect('op', '(')
+            values = [self.literal()]
+            while self.accept('op', ','):
+                values.append(self.literal())
+            self.expect('op', ')')
+            return In(operand, tuple(sorted(set(values), key=repr)), negated)
+        if self.accept('keyword', 'BETWEEN'):
+            low = self.literal()
+            self.keyword('AND')
+            return Between(operand, low, self.literal(), negated)
+        if self.accept('keyword', 'LIKE'):
+            return Like(operand, self.expect('string')[1][1:-1].replace("''", "'"), negated)
+        if negated:
+            raise QueryError('NOT must be followed by IN, BETWEEN or LIKE here')
+        token = self.expect('op')
+        if token[1] not in COMPARISONS:
+            raise QueryError(f'expected a comparison, found {token[1]!r}')
+        return Compare('!=' if token[1] == '<>' else token[1], operand, self.operand())
+
+
+def _column(name):
+    if name in COLUMNS:
+        return name
+    matches = [column for column in COLUMNS if column.lower() == name.lower()]
+    if len(matches) != 1:
+        raise QueryError(f'unknown column {name!r}')
+    return matches[0]
+
+
+def _resolve(items, where, groups, order_by, limit):
+    names = [item.name for item in items]
+    if len(set(names)) != len(names):
+        raise QueryError('result columns must have distinct names; use AS')
+    query = Query(tuple(items), where, limit=limit)
+    if groups:
+        if not query.aggregates:
+            raise QueryError('GROUP BY needs an aggregate such as count(*)')
+        keys = {item.expression for item in query.keys}
+        if set(groups) != keys:
+            raise QueryError('GROUP BY must list exactly the selected non-aggregate columns')
+    resolved = []
+    for target, descending in order_by:
+        if isinstance(target, str):
+            if target not in names:
+                target = Column(_column(target))
+            else:
+                resolved.append((target, descending))
+                continue
+        matches = [item.name for item in items if item.expression == target]
+        if not matches:
+            raise QueryError(f'ORDER BY {target.text()} is not a result column')
+        resolved.append((matches[0], descending))
+    return Query(query.items, query.where, tuple(resolved), limit)
+
+
+@dataclass(frozen=True, eq=False)
+class QueryResult:
+    """The rows of one query, as an Arrow table."""
+    query: str
+    table: pa.Table
+    rows_scanned: int
+    seconds: float
+
+    def to_frame(self):
+        return self.table.to_pandas()
+
+
+def execute(query, table):
+    """Run a parsed :class:`Query` against an Arrow ``table``; returns a :class:`QueryResult`."""
+    started = time.perf_counter()
+    columns = query.columns()
+    missing = sorted(columns - set(table.column_names))
+    if missing:
+        raise QueryError(f"the data has no column {', '.join(map(_quote, missing))}")
+    # Column pruning: the plan only ever sees the columns the query names.
+    source = table.select([name for name in table.column_names if name in columns] or table.column_names[:1])
+    nodes = [acero.Declaration('table_source', acero.TableSourceNodeOptions(source))]
+    try:
+        if query.where is not None:
+            nodes.append(acero.Declaration('filter', acero.FilterNodeOptions(query.where.compile(source))))
+        if query.aggregates:
+            result = _aggregate(query, source, nodes)
+        else:
+            result = _rows(query, source, nodes)
+        # Results are small; decoded labels sort, compare and serialize like plain values.
+        result = pa.table([column.cast(column.type.value_type) if pa.types.is_dictionary(column.type) else column
+                           for column in result.columns], names=result.column_names)
+    except (pa.ArrowNotImplementedError, pa.ArrowInvalid, pa.ArrowTypeError) as error:
+        raise QueryError(str(error).splitlines()[0]) from error
+    if query.order_by:
+        result = result.sort_by([(name, 'descending' if descending else 'ascending')
+                                 for name, descending in query.order_by])
+    elif query.aggregates and query.keys:
+        # Groups come out in hash order; sort them so the result is stable.
+        result = result.sort_by([(item.name, 'ascending') for item in query.keys])
+    return QueryResult(query.text(), result.slice(0, query.limit), source.num_rows, time.perf_counter() - started)
+
+
+def _aggregate(query, source, nodes):
+    keys, aggregates = query.keys, query.aggregates
+    projections, names, targets = [], [], []
+    for item in keys:
+        expression = item.expression
+        projections.append(expression.grouping(source) if isinstance(expression, Column)
+                           else expression.compile(source))
+        names.append(item.name)
+    for index, item in enumerate(aggregates):
+        aggregate, argument = item.expression, f'__{index}'
+        if aggregate.argument is None:
+            projections.append(pc.scalar(1))
+        else:
+            kind = aggregate.argument.kind(source)
+            if aggregate.function in ('sum', 'mean', 'stddev') and not _numeric(kind):
+                raise QueryError(f'{aggregate.text()} needs a numeric column')
+            if keys and aggregate.function in ('count', 'count_distinct'):
+                projections.append(aggregate.argument.grouping(source))
+            else:
+                # The other kernels (and ungrouped counts) take no dictionary-encoded columns.
+                projections.append(aggregate.argument.compile(source, strings=True))
+        names.append(argument)
+        function = ('hash_' if keys else '') + aggregate.function
+        options = pc.CountOptions('all' if aggregate.argument is None else 'only_valid') \
+            if aggregate.function in ('count', 'count_distinct') else None
+        targets.append((argument, function, options, item.name))
+    nodes += [
+        acero.Declaration('project', acero.ProjectNodeOptions(projections, names)),
+        acero.Declaration('aggregate', acero.AggregateNodeOptions(targets, keys=[item.name for item in keys])),
+    ]
+    return acero.Declaration.from_sequence(nodes).to_table().select([item.name for item in query.items])
+
+
+def _rows(query, source, nodes):
+    nodes.append(acero.Declaration('project', acero.ProjectNodeOptions(
+        [item.expression.compile(source) for item in query.items], [item.name for item in query.items])))
+    plan = acero.Declaration.from_sequence(nodes)
+    if query.order_by:
+        return plan.to_table()
+    # Unordered rows: stop reading once the limit is reached.
+    reader, batches, rows = plan.to_reader(), [], 0
+    try:
+        while rows < query.limit:
+            try:
+                batch = reader.read_next_batch()
+            except StopIteration:
+                break
+            batches.append(batch)
+            rows += batch.num_rows
+    finally:
+        reader.close()
+    return pa.Table.from_batches(batches, reader.schema)
+
+
+_sources = {}
+_sources_lock = threading.Lock()
+_results = LRUCache(256, 'query_results')
+
+
+def source_table(path=DATA_PATH):
+    """``(version, table)``: the memory-mapped snapshot queries run against for the data at ``path``.
+
+    A missing or stale snapshot is compiled first, once per data version,
+    so no copy of the data stays resident. Streaming mode never parses the
+    whole file, so there the snapshot must have been compiled beforehand.
+    """
+    version = file_version(path)
+    entry = _sources.get(path)
+    if entry is not None and entry[0] == version:
+        return entry
+    with _sources_lock:
+        entry = _sources.get(path)
+        if entry is None or entry[0] != version:
+            if not snapshot.is_fresh(path):
+                if settings.STREAMING:
+                    raise QueryError('queries in streaming mode need a compiled snapshot of the data '
+                                     '(python -m electrapulse.snapshot)')
+                try:
+                    snapshot.compile_snapshot(path)
+                except OSError as error:
+                    raise QueryError(f'cannot compile the snapshot queries run against: {error}')
+            entry = _sources[path] = (version, snapshot.read_table(snapshot.snapshot_path(path)))
+    return entry
+
+
+def _evict_source():
+    """Unmap the oldest source table; mapped pages are the OS's to reclaim, so no bytes are counted."""
+    if not _sources_lock.acquire(blocking=False):
+        return 0
+    try:
+        if _sources:
+            del _sources[next(iter(_sources))]
+        return 0
+    finally:
+        _sources_lock.release()
+
+
+budget.register('query_sources', lambda: 0, _evict_source)
+
+
+def run_query(text, path=DATA_PATH):
+    """The :class:`QueryResult` of query ``text`` over the data at ``path``, cached per data version."""
+    query = parse(text)
+    path = os.path.abspath(path)
+    version, table = source_table(path)
+    return _results.get_or_compute((path, version, query.text()), lambda: execute(query, table))
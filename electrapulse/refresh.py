@@ -0,0 +1,131 @@
+"""Incremental refresh from a new release of the population file.
+
+The state republishes the file monthly and most rows carry over unchanged.
+A release is matched to the current snapshot on ``DOL Vehicle ID``: ids only
+in the release were inserted, ids only in the snapshot were removed, and ids
+in both whose analysis columns hash differently were changed. The maintained
+aggregates, the persisted partials of :mod:`electrapulse.streaming` (the cube
+every rollup and forecast input derives from, plus range and location
+counts), are then updated by the partials of the inserted and changed rows
+minus those of the removed rows and of the changed rows' old values. Their
+cost follows the churn, not the size of the file; the release itself is
+still parsed once, which also compiles its snapshot.
+
+Run as::
+
+    python -m electrapulse.refresh new_release.csv [--data Electric_Vehicle_Population_Data.csv]
+"""
+import argparse
+import os
+import shutil
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from electrapulse import snapshot
+from electrapulse.loader import file_version
+from electrapulse.schema import ANALYSIS_COLUMNS, DATA_PATH, add_derived, narrow_integers, read_csv
+from electrapulse.streaming import Partials, read_partials, save_partials, stream_partials
+
+KEY = 'DOL Vehicle ID'
+
+
+@dataclass(frozen=True, eq=False)
+class Delta:
+    """The rows a release inserted, removed and changed, by position.
+
+    ``inserted`` and ``changed`` index the release; ``removed`` and
+    ``previous`` (the changed rows' old values) index the previous data.
+    """
+    inserted: np.ndarray
+    removed: np.ndarray
+    changed: np.ndarray
+    previous: np.ndarray
+
+    @property
+    def churn(self):
+        return len(self.inserted) + len(self.removed) + len(self.changed)
+
+
+def diff(previous, release, columns=ANALYSIS_COLUMNS):
+    """The :class:`Delta` from the ``previous`` frame to the ``release`` frame."""
+    matches = pd.Index(_ids(previous)).get_indexer(_ids(release))
+    found = np.flatnonzero(matches >= 0)
+    kept = np.zeros(len(previous), dtype=bool)
+    kept[matches[found]] = True
+    differs = _row_hashes(previous, columns)[matches[found]] != _row_hashes(release, columns)[found]
+    return Delta(
+        inserted=np.flatnonzero(matches < 0),
+        removed=np.flatnonzero(~kept),
+        changed=found[differs],
+        previous=matches[found][differs],
+    )
+
+
+def apply_delta(partials, previous, release, delta):
+    """``partials`` of the previous data, updated to those of the release."""
+    added = Partials.from_frame(release.take(np.concatenate([delta.inserted, delta.changed])))
+    taken = Partials.from_frame(previous.take(np.concatenate([delta.removed, delta.previous])))
+    return partials.merge(added).merge(taken.negated())
+
+
+def read_release(path):
+    """Parse a release CSV with the declared schema (every column, derived ones included)."""
+    return narrow_integers(add_derived(read_csv(path)))
+
+
+def refresh(release, path=DATA_PATH):
+    """Replace the data at ``path`` by the ``release`` CSV; returns ``(delta, partials)``.
+
+    The snapshot and persisted partials of ``path`` are brought up to date.
+    The first refresh streams the current data once if it has no partials.
+    """
+    path = os.path.abspath(path)
+    if not snapshot.is_fresh(path):
+        snapshot.compile_snapshot(path)
+    partials = read_partials(path, file_version(path)) or stream_partials(path)
+    previous = snapshot.read_snapshot(snapshot.snapshot_path(path), (KEY, *ANALYSIS_COLUMNS))
+    frame = read_release(release)
+    delta = diff(previous, frame)
+    partials = apply_delta(partials, previous, frame, delta)
+
+    # Stage the CSV first: its mtime and size are the version everything is keyed on.
+    staged = path + '.partial'
+    shutil.copy2(release, staged)
+    stat = os.stat(staged)
+    version = stat.st_mtime_ns, stat.st_size
+    snapshot.write_snapshot(frame, snapshot.snapshot_path(path), version)
+    save_partials(partials, path, version)
+    os.replace(staged, path)
+    return delta, partials
+
+
+def _ids(frame):
+    ids = frame[KEY]
+    if ids.hasnans or not ids.is_unique:
+        raise ValueError(f'{KEY} must be present and unique on every row to refresh incrementally')
+    return ids.to_numpy(dtype=np.int64)
+
+
+def _row_hashes(frame, columns):
+    # Hashes follow the values, not the encoding: categoricals hash like their
+    # labels and every integer width alike, so CSV and snapshot frames compare.
+    return pd.util.hash_pandas_object(frame[[name for name in columns if name in frame.columns]],
+                                      index=False).to_numpy()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Refresh the EV population data from a new release.')
+    parser.add_argument('release', help='the new release CSV')
+    parser.add_argument('--data', default=DATA_PATH, help='data to replace (default: %(default)s)')
+    args = parser.parse_args(argv)
+    started = time.perf_counter()
+    delta, partials = refresh(args.release, args.data)
+    print(f'{len(delta.inserted):,} inserted, {len(delta.removed):,} removed, {len(delta.changed):,} changed; '
+          f'{partials.rows_read:,} registrations in {time.perf_counter() - started:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
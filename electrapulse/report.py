@@ -0,0 +1,107 @@
+"""Headless batch report: every chart and metric of the dashboard, to disk.
+
+Run as ``python -m electrapulse.report OUTPUT_DIR``, e.g. nightly from cron.
+The analysis runs once in this process; the figures are rendered in the
+shared process pool (matplotlib holds the GIL while drawing), one job per
+chart and format, with each worker writing its own file. The metrics and
+chart aggregates go to ``metrics.json`` and the file list to
+``report.json``.
+"""
+import argparse
+import json
+import os
+import time
+
+from electrapulse import settings
+from electrapulse.analysis import analyze, analyze_partials
+from electrapulse.figcache import encode
+from electrapulse.forecasting import process_pool
+from electrapulse.schema import DATA_PATH
+
+FORMATS = ('png', 'svg')
+
+
+def generate_report(output, path=DATA_PATH, formats=FORMATS, dpi=200, streaming=settings.STREAMING):
+    """Write the report for the data at ``path`` to the ``output`` directory; returns its manifest."""
+    started = time.perf_counter()
+    analysis = _analysis(path, streaming)
+    try:
+        forecast = analysis.forecast()
+    except RuntimeError:
+        forecast = None
+    analyzed = time.perf_counter()
+
+    os.makedirs(output, exist_ok=True)
+    _write_json(os.path.join(output, 'metrics.json'), analysis.metrics(forecast))
+    jobs = [(name, fmt, build, args)
+            for name, (build, *args) in analysis.figures(forecast).items() for fmt in formats]
+    files = render_figures(jobs, output, dpi)
+    manifest = {
+        'source': os.path.abspath(path),
+        'generated': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'registrations': analysis.rollups.total,
+        'metrics': 'metrics.json',
+        'figures': files,
+        'analysis_seconds': round(analyzed - started, 3),
+        'render_seconds': round(time.perf_counter() - analyzed, 3),
+    }
+    _write_json(os.path.join(output, 'report.json'), manifest)
+    return manifest
+
+
+def render_figures(jobs, output, dpi=200):
+    """Render ``(name, fmt, build, args)`` jobs into ``output``; returns ``{name: [file, ...]}``."""
+    paths = [os.path.join(output, f'{name}.{fmt}') for name, fmt, _, _ in jobs]
+    renders = [(build, args, path, fmt, dpi) for (_, fmt, build, args), path in zip(jobs, paths)]
+    workers = settings.WORKERS or os.cpu_count() or 1
+    if workers == 1 or len(renders) < 2:
+        for render in renders:
+            _render(*render)
+    else:
+        list(process_pool().map(_render, *zip(*renders)))
+    files = {}
+    for (name, _, _, _), path in zip(jobs, paths):
+        files.setdefault(name, []).append(os.path.basename(path))
+    return files
+
+
+def _render(build, args, path, fmt, dpi):
+    image = encode(build(*args), fmt=fmt, dpi=dpi)
+    partial = path + '.partial'
+    with open(partial, 'wb') as file:
+        file.write(image)
+    os.replace(partial, path)
+
+
+def _analysis(path, streaming):
+    if streaming:
+        from electrapulse.streaming import load_partials
+        return analyze_partials(load_partials(path))
+    from electrapulse.cleaning import clean_dataset
+    from electrapulse.loader import load_dataset
+    return analyze(clean_dataset(load_dataset(path)))
+
+
+def _write_json(path, value):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(value, file, indent=2, default=str, allow_nan=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write every dashboard chart and metric to a directory.')
+    parser.add_argument('output', help='report directory (created if missing)')
+    parser.add_argument('--csv', default=DATA_PATH, help='source CSV (default: %(default)s)')
+    parser.add_argument('--format', dest='formats', action='append', choices=FORMATS,
+                        help='image format, repeatable (default: png and svg)')
+    parser.add_argument('--dpi', type=int, default=200, help='PNG resolution (default: %(default)s)')
+    parser.add_argument('--streaming', action='store_true', default=settings.STREAMING,
+                        help='aggregate the data out of core, as ELECTRAPULSE_STREAMING does')
+    args = parser.parse_args(argv)
+    manifest = generate_report(args.output, args.csv, tuple(args.formats or FORMATS), args.dpi, args.streaming)
+    images = sum(len(files) for files in manifest['figures'].values())
+    print(f"Wrote {images} images and metrics for {manifest['registrations']:,} registrations to {args.output} "
+          f"(analysis {manifest['analysis_seconds']:.1f}s, rendering {manifest['render_seconds']:.1f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Column schema of the Washington DOL electric vehicle population file."""
+import pandas as pd
+
+from electrapulse.geo import parse_points
+
+DATA_PATH = 'Electric_Vehicle_Population_Data.csv'
+
+# Declared dtypes for every column of the population file. Integer columns
+# are parsed as nullable and narrowed to plain NumPy integers when they turn
+# out to have no missing values (see ``narrow_integers``).
+SCHEMA = {
+    'VIN (1-10)': 'category',
+    'County': 'category',
+    'City': 'category',
+    'State': 'category',
+    'Postal Code': 'Int32',
+    'Model Year': 'Int16',
+    'Make': 'category',
+    'Model': 'category',
+    'Electric Vehicle Type': 'category',
+    'Clean Alternative Fuel Vehicle (CAFV) Eligibility': 'category',
+    'Electric Range': 'Int32',
+    'Base MSRP': 'Int32',
+    'Legislative District': 'Int8',
+    'DOL Vehicle ID': 'Int64',
+    'Vehicle Location': 'category',
+    'Electric Utility': 'category',
+    '2020 Census Tract': 'Int64',
+}
+
+# Columns computed from a source column when the file is read, with their
+# dtypes. Snapshots store them, so they are parsed once per CSV version.
+DERIVED = {
+    'Longitude': ('Vehicle Location', 'float32'),
+    'Latitude': ('Vehicle Location', 'float32'),
+}
+
+# Columns read by the dashboard sections.
+ANALYSIS_COLUMNS = (
+    'Model Year',
+    'County',
+    'City',
+    'Make',
+    'Model',
+    'Electric Vehicle Type',
+    'Electric Range',
+    'Longitude',
+    'Latitude',
+)
+
+
+def dtypes_for(columns=None):
+    """Return the ``read_csv`` dtype mapping restricted to ``columns``."""
+    return {name: kind for name, kind in SCHEMA.items() if columns is None or name in columns}
+
+
+def source_columns(columns):
+    """``columns`` with each derived column replaced by the file column it is computed from."""
+    if columns is None:
+        return None
+    sources = []
+    for name in columns:
+        name = DERIVED[name][0] if name in DERIVED else name
+        if name not in sources:
+            sources.append(name)
+    return sources
+
+
+def add_derived(frame, columns=None):
+    """Compute the derived ``columns`` (all that can be) of ``frame`` in place.
+
+    Source columns that were only read to derive others are dropped.
+    """
+    wanted = [name for name, (source, _) in DERIVED.items()
+              if source in frame.columns and (columns is None or name in columns)]
+    if 'Longitude' in wanted or 'Latitude' in wanted:
+        longitude, latitude = parse_points(frame['Vehicle Location'])
+        for name, values in (('Longitude', longitude), ('Latitude', latitude)):
+            if name in wanted:
+                frame[name] = values
+    if columns is not None:
+        frame.drop(columns=[source for source, _ in DERIVED.values()
+                            if source in frame.columns and source not in columns], inplace=True)
+    return frame
+
+
+def read_csv(path, columns=None, **kwargs):
+    """Parse ``path`` with the declared schema; extra kwargs go to ``read_csv``.
+
+    Derived columns are not computed here (see ``add_derived``), but reading
+    them reads their source column.
+    """
+    usecols = source_columns(columns)
+    return pd.read_csv(path, usecols=usecols, dtype=dtypes_for(usecols), **kwargs)
+
+
+def narrow_integers(frame):
+    """Convert gap-free nullable integer columns to NumPy integers in place."""
+    for name in frame.columns:
+        dtype = frame[name].dtype
+        if isinstance(dtype, pd.api.extensions.ExtensionDtype) and dtype.kind in 'iu':
+            if not frame[name].hasnans:
+                frame[name] = frame[name].to_numpy(dtype=dtype.numpy_dtype)
+    return frame
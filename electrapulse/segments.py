@@ -0,0 +1,160 @@
+"""Batched registration forecasts for every county, city, make and EV type.
+
+One groupby of the aggregation cube gives a segments x years count matrix.
+Every row is fitted at once with a weighted log-linear least-squares
+(exponential growth) in closed form, using NumPy over the whole matrix. Only
+series that fit poorly on the log scale go through the nonlinear model
+selection of :mod:`electrapulse.forecasting`, in its process pool. Series
+with too little history get a naive forecast, the mean of their last
+complete years.
+"""
+import os
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from electrapulse import forecasting, settings
+from electrapulse.memo import LRUCache, fingerprint
+
+SEGMENT_DIMENSIONS = ('County', 'City', 'Make', 'Electric Vehicle Type')
+
+# Fewer registered years than this and a series gets the naive forecast.
+MIN_POINTS = 3
+# Series whose log-linear R² falls below this are refitted with the nonlinear
+# models, provided they have enough history for a holdout and enough volume
+# for the misfit to be more than Poisson noise.
+NONLINEAR_BELOW_R2 = 0.8
+NONLINEAR_MIN_POINTS = 7
+NONLINEAR_MIN_COUNT = 100
+
+LOG_LINEAR = 'log-linear'
+NONLINEAR = 'nonlinear'
+NAIVE = 'naive'
+
+
+@dataclass(frozen=True, eq=False)
+class SegmentForecast:
+    """Forecasts of every segment of one dimension, with fit diagnostics."""
+    by: str
+    forecasts: pd.DataFrame
+    diagnostics: pd.DataFrame
+
+    def table(self):
+        """Segments x forecast years, joined with their diagnostics."""
+        wide = self.forecasts.pivot(index=self.by, columns='Model Year', values='Forecast')
+        return self.diagnostics.join(wide)
+
+
+def year_matrix(cube, by):
+    """Registrations per ``by`` segment (rows) and model year (columns)."""
+    counts = cube.groupby([by, 'Model Year'])['count'].sum().unstack(fill_value=0)
+    years = np.arange(counts.columns.min(), counts.columns.max() + 1)
+    return counts.reindex(columns=years, fill_value=0)
+
+
+def fit_log_linear(x, counts):
+    """Fit ``log(y) = intercept + rate * x`` to every row of ``counts`` at once.
+
+    Years with no registrations carry no weight, and the others are weighted
+    by their count (the inverse variance of a log count). Returns
+    ``(intercept, rate, points, r2)`` arrays, with NaN where a row has fewer
+    than two registered years.
+    """
+    weights = counts.astype(float)
+    logs = np.log(np.where(counts > 0, counts, 1))
+    total = weights.sum(axis=1)
+    sum_x = weights @ x
+    sum_xx = weights @ x ** 2
+    sum_y = (weights * logs).sum(axis=1)
+    sum_xy = (weights * logs) @ x
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = (total * sum_xy - sum_x * sum_y) / (total * sum_xx - sum_x ** 2)
+        intercept = (sum_y - rate * sum_x) / total
+        mean = sum_y / total
+        residual = (weights * (logs - intercept[:, None] - rate[:, None] * x) ** 2).sum(axis=1)
+        spread = (weights * (logs - mean[:, None]) ** 2).sum(axis=1)
+        r2 = 1 - residual / spread
+    points = (counts > 0).sum(axis=1)
+    unfit = points < 2
+    rate[unfit] = intercept[unfit] = r2[unfit] = np.nan
+    return intercept, rate, points, r2
+
+
+def forecast_segments(cube, by, horizon=6, complete_through=None):
+    """Forecast ``horizon`` years of registrations for every ``by`` segment."""
+    key = fingerprint(cube, by, horizon, complete_through)
+    return _segment_forecasts.get_or_compute(key, lambda: _forecast_segments(cube, by, horizon, complete_through))
+
+
+_segment_forecasts = LRUCache(32, 'segment_forecasts', priority=2)
+
+
+def _forecast_segments(cube, by, horizon, complete_through):
+    matrix = year_matrix(cube, by)
+    if complete_through is None:
+        complete_through = forecasting.last_complete_year(matrix.sum(axis=0))
+    matrix = matrix.loc[:, matrix.columns <= complete_through]
+    counts = matrix.to_numpy(dtype=float)
+    x = (matrix.columns.to_numpy() - matrix.columns[0]).astype(float)
+    future_years = np.arange(complete_through + 1, complete_through + 1 + horizon)
+    future_x = (future_years - matrix.columns[0]).astype(float)
+
+    intercept, rate, points, r2 = fit_log_linear(x, counts)
+    values = np.exp(intercept[:, None] + rate[:, None] * future_x)
+    fitted = np.exp(intercept[:, None] + rate[:, None] * x)
+    rmse = np.sqrt(np.mean((fitted - counts) ** 2, axis=1))
+    method = np.full(len(matrix), LOG_LINEAR, dtype=object)
+    model = np.full(len(matrix), 'exponential', dtype=object)
+
+    naive = points < MIN_POINTS
+    values[naive] = counts[naive, -3:].mean(axis=1)[:, None]
+    rmse[naive] = np.nan
+    method[naive] = NAIVE
+    model[naive] = None
+
+    refit = np.flatnonzero(~naive & (points >= NONLINEAR_MIN_POINTS) & (counts.max(axis=1) >= NONLINEAR_MIN_COUNT)
+                           & ~(r2 >= NONLINEAR_BELOW_R2))
+    for row, result in zip(refit, _fit_nonlinear(x, counts[refit], future_x)):
+        if result is not None:
+            model[row], values[row], rmse[row] = result
+            method[row] = NONLINEAR
+
+    segments = matrix.index
+    diagnostics = pd.DataFrame({
+        'Method': method,
+        'Model': model,
+        'Years': points,
+        'Growth Rate': np.expm1(rate),
+        'R²': r2,
+        'RMSE': rmse,
+        'Last Year Count': counts[:, -1].astype(int),
+    }, index=segments)
+    forecasts = pd.DataFrame({
+        by: np.repeat(segments.to_numpy(), horizon),
+        'Model Year': np.tile(future_years, len(segments)),
+        'Forecast': np.clip(values, 0, None).ravel(),
+    })
+    return SegmentForecast(by=by, forecasts=forecasts, diagnostics=diagnostics)
+
+
+def _fit_nonlinear(x, series, future_x):
+    """Nonlinear model selection for each row of ``series``, in parallel."""
+    if not len(series):
+        return []
+    jobs = [(x, y, future_x) for y in series]
+    workers = settings.WORKERS or os.cpu_count() or 1
+    if workers == 1 or len(jobs) < 4:
+        return [_fit_series(*job) for job in jobs]
+    chunksize = max(1, len(jobs) // (4 * workers))
+    return list(forecasting.process_pool().map(_fit_series, *zip(*jobs), chunksize=chunksize))
+
+
+def _fit_series(x, y, future_x):
+    try:
+        _, best = forecasting.select_model(x, y)
+    except RuntimeError:
+        return None
+    function = forecasting.MODELS[best.name][0]
+    rmse = float(np.sqrt(np.mean((function(x, *best.params) - y) ** 2)))
+    return best.name, function(future_x, *best.params), rmse
@@ -0,0 +1,59 @@
+"""Runtime settings, read once from ``ELECTRAPULSE_*`` environment variables."""
+import os
+
+
+def _number(name, default, kind=int):
+    value = os.environ.get(name)
+    return default if value in (None, '') else kind(value)
+
+
+# Byte budget of the rendered-figure cache shared by all sessions.
+FIGURE_CACHE_BYTES = _number('ELECTRAPULSE_FIGURE_CACHE_MB', 64) * 2 ** 20
+
+# Stream the data in bounded chunks into mergeable partial aggregates instead
+# of holding the whole frame; peak memory then follows the chunk size.
+STREAMING = _number('ELECTRAPULSE_STREAMING', 0) != 0
+CHUNK_ROWS = _number('ELECTRAPULSE_CHUNK_ROWS', 250_000)
+
+# Worker processes for parallel work (0: one per CPU) and the number of
+# bootstrap resamples behind forecast prediction intervals.
+WORKERS = _number('ELECTRAPULSE_WORKERS', 0)
+BOOTSTRAP_RESAMPLES = _number('ELECTRAPULSE_BOOTSTRAP_RESAMPLES', 2000)
+
+# Aggregate the rows in partitions across the worker processes (see
+# ``electrapulse.parallel``) instead of on one core.
+PARALLEL = _number('ELECTRAPULSE_PARALLEL', 0) != 0
+
+# Render the charts of unopened dashboard sections in the background, so that
+# opening them later is instant. Off by default: it spends CPU on every filter
+# change for sections that may never be opened.
+PREFETCH = _number('ELECTRAPULSE_PREFETCH', 0) != 0
+
+# Import the chart and forecasting libraries on a background thread as soon
+# as the app starts, instead of when the first chart is drawn.
+PRELOAD = _number('ELECTRAPULSE_PRELOAD', 1) != 0
+
+# Time the dashboard's sections, loads, renders and fits, and count reruns and
+# sessions (see ``electrapulse.instrumentation``). Tracing memory as well
+# slows every allocation, so it is off unless asked for. With a metrics path,
+# the metrics are written there in the Prometheus text format after every
+# rerun; with debug, the dashboard shows them in a sidebar panel (as does
+# adding ``?debug=1`` to its URL).
+INSTRUMENT = _number('ELECTRAPULSE_INSTRUMENT', 1) != 0
+TRACE_MEMORY = _number('ELECTRAPULSE_TRACE_MEMORY', 0) != 0
+METRICS_PATH = os.environ.get('ELECTRAPULSE_METRICS_PATH') or None
+DEBUG = _number('ELECTRAPULSE_DEBUG', 0) != 0
+
+# The JSON API (``electrapulse.api``): threads computing aggregates, how many
+# computations may be queued or running before requests are turned away, and
+# how often the data file is checked for a new version.
+API_WORKERS = _number('ELECTRAPULSE_API_WORKERS', 2)
+API_MAX_PENDING = _number('ELECTRAPULSE_API_MAX_PENDING', 32)
+API_CHECK_SECONDS = _number('ELECTRAPULSE_API_CHECK_SECONDS', 1.0, float)
+
+# Estimated bytes the shared caches may hold before their least recently used
+# entries are evicted (0: no limit), and how many expensive computations may
+# run at once across all sessions (0: one per CPU); see
+# ``electrapulse.memory``.
+MEMORY_BUDGET_BYTES = _number('ELECTRAPULSE_MEMORY_BUDGET_MB', 1024) * 2 ** 20
+COMPUTE_SLOTS = _number('ELECTRAPULSE_COMPUTE_SLOTS', 0)
@@ -0,0 +1,136 @@
+"""Columnar snapshot of the population CSV, compiled once and memory-mapped.
+
+The snapshot is an uncompressed Arrow IPC file with dictionary-encoded
+strings. Opening it maps the file instead of parsing it, so only the pages
+behind the requested columns are read, and Arrow consumers (queries, the
+streamed and parallel aggregations) work on the mapped pages, which server
+processes reading the same snapshot share through the OS page cache. The
+DataFrame of :func:`read_snapshot` is a private copy, though: only integer
+and float columns without nulls convert without copying, while categorical
+codes and nullable columns are rebuilt in process memory, so a loaded
+dataset costs each process about what parsing the CSV would. Keeping it on
+the mapped pages would take Arrow-backed dtypes, which the cleaning, the
+cubes and the indexes (built on categorical codes and NumPy arrays) do not
+take.
+The source CSV's mtime and size are recorded in the schema metadata, which
+is how a stale snapshot is detected. Derived columns (the coordinates parsed
+from ``Vehicle Location``) are stored too, so they are computed once per CSV
+version; snapshots from before a derived column existed count as stale.
+
+Compile it with::
+
+    python -m electrapulse.snapshot [Electric_Vehicle_Population_Data.csv]
+"""
+import argparse
+import os
+import time
+
+import pyarrow as pa
+
+from electrapulse.schema import DATA_PATH, SCHEMA, add_derived, narrow_integers, read_csv
+
+SNAPSHOT_SUFFIX = '.arrow'
+# Bumped whenever snapshots gain columns, so older ones are recompiled.
+FORMAT = b'2'
+
+
+def snapshot_path(csv_path):
+    return os.path.splitext(csv_path)[0] + SNAPSHOT_SUFFIX
+
+
+def source_version(path):
+    """Return the ``(mtime_ns, size)`` of the CSV a snapshot was compiled from.
+
+    None if it was written by an older snapshot format.
+    """
+    with pa.memory_map(path) as source:
+        metadata = pa.ipc.open_file(source).schema.metadata or {}
+    if metadata.get(b'format') != FORMAT:
+        return None
+    try:
+        return int(metadata[b'source_mtime_ns']), int(metadata[b'source_size'])
+    except KeyError:
+        return None
+
+
+def is_fresh(csv_path, path=None):
+    """Whether a snapshot exists and was compiled from the current CSV."""
+    path = path or snapshot_path(csv_path)
+    if not os.path.exists(path):
+        return False
+    if not os.path.exists(csv_path):
+        # A snapshot deployed without its CSV is the only copy of the data.
+        return True
+    stat = os.stat(csv_path)
+    return source_version(path) == (stat.st_mtime_ns, stat.st_size)
+
+
+def compile_snapshot(csv_path=DATA_PATH, path=None):
+    """Parse ``csv_path`` with the declared schema and write its snapshot."""
+    stat = os.stat(csv_path)
+    frame = narrow_integers(add_derived(read_csv(csv_path)))
+    return write_snapshot(frame, path or snapshot_path(csv_path), (stat.st_mtime_ns, stat.st_size))
+
+
+def write_snapshot(frame, path, version):
+    """Write ``frame`` (every column, derived ones included) as the snapshot of the CSV at ``version``."""
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        b'source_mtime_ns': str(version[0]).encode(),
+        b'source_size': str(version[1]).encode(),
+        b'format': FORMAT,
+    })
+    # Write next to the target and rename, so readers never see a partial file.
+    partial = path + '.partial'
+    with pa.OSFile(partial, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(partial, path)
+    return path
+
+
+def read_table(path, columns=None):
+    """Memory-map the snapshot and return it as an Arrow table.
+
+    The mapping is kept alive by the returned table's buffers.
+    """
+    table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    if columns is not None:
+        # Keep file order so snapshot and CSV reads yield identical frames.
+        table = table.select([name for name in table.column_names if name in columns])
+    return table
+
+
+def read_snapshot(path, columns=None):
+    """Read ``columns`` of the snapshot into a DataFrame typed like ``SCHEMA``; most columns are copied."""
+    return to_frame(read_table(path, columns))
+
+
+def to_frame(table):
+    """Convert an Arrow table or record batch to a DataFrame typed like ``SCHEMA``.
+
+    Columns that pandas can wrap (numbers without nulls) keep pointing into
+    the table's buffers; the rest are copied.
+    """
+    # Arrow integer columns with nulls come back as floats; restore the
+    # nullable dtype the CSV path would have produced.
+    nullable = {
+        name: SCHEMA[name] for name in table.schema.names
+        if table.column(name).null_count and SCHEMA.get(name, 'category') != 'category'
+    }
+    frame = table.to_pandas(split_blocks=True)
+    return frame.astype(nullable) if nullable else frame
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compile the EV population CSV into an Arrow snapshot.')
+    parser.add_argument('csv', nargs='?', default=DATA_PATH, help='source CSV (default: %(default)s)')
+    parser.add_argument('-o', '--output', help='snapshot path (default: CSV path with %s)' % SNAPSHOT_SUFFIX)
+    args = parser.parse_args(argv)
+    started = time.perf_counter()
+    path = compile_snapshot(args.csv, args.output)
+    print(f'Wrote {path} ({os.path.getsize(path) / 2 ** 20:.1f} MiB) in {time.perf_counter() - started:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""Start-up import cost of the dashboard, and preloading of deferred imports.
+
+matplotlib, seaborn and scipy are imported by the code that draws charts and
+fits forecasts (:mod:`electrapulse.charts`, :func:`electrapulse.forecasting.fit`),
+and pydeck by the density map, not when the app starts: a fresh server
+process or a script reload renders its first page without paying for them.
+:func:`preload` imports them on a background thread once the data load is
+under way (``ELECTRAPULSE_PRELOAD``), so the first chart does not wait for
+them either.
+
+Run ``python -m electrapulse.startup`` to measure the cost. The top-level
+imports of ``main.py`` run in a fresh interpreter under ``-X importtime``,
+and the slowest modules and packages are listed. Given ``--budget`` (in
+seconds), the exit status is 1 when the imports take longer or pull in a
+deferred module, so the check can gate a CI job.
+"""
+import argparse
+import ast
+import importlib
+import json
+import os
+import subprocess
+import sys
+from dataclasses import dataclass
+
+MAIN_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'main.py')
+
+# Packages that must not be imported at start-up, and the modules preload() imports.
+DEFERRED = ('matplotlib', 'seaborn', 'scipy', 'pydeck')
+PRELOAD = ('matplotlib.figure', 'seaborn', 'scipy.optimize', 'pydeck')
+
+
+def preload():
+    """Import the deferred modules; returns the names imported. Safe to call from any thread."""
+    loaded = []
+    for name in PRELOAD:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            continue
+        loaded.append(name)
+    return loaded
+
+
+@dataclass(frozen=True, eq=False)
+class ImportTime:
+    """One line of ``-X importtime``: a module's own and cumulative import time, in microseconds."""
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+    @property
+    def package(self):
+        return self.module.partition('.')[0]
+
+
+def startup_imports(script=MAIN_SCRIPT):
+    """The top-level import statements of ``script``, as source lines."""
+    with open(script, encoding='utf-8') as file:
+        tree = ast.parse(file.read(), script)
+    return [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def measure(statements, cwd=None):
+    """:class:`ImportTime` of every module the ``statements`` import in a fresh interpreter."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', '\n'.join(statements)],
+                            cwd=cwd, capture_output=True, text=True)
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        if not self_us.strip().isdigit():
+            continue  # the header
+        module = name.lstrip()
+        timings.append(ImportTime(module, int(self_us), int(cumulative_us), (len(name) - len(module) - 1) // 2))
+    if result.returncode:
+        raise RuntimeError(f'importing the start-up modules failed:\n{result.stderr[-2000:]}')
+    return timings
+
+
+def summarize(timings, top=15):
+    """The report of a measurement as a JSON-serializable dict."""
+    packages = {}
+    for timing in timings:
+        packages[timing.package] = packages.get(timing.package, 0) + timing.self_us
+    slowest = sorted(timings, key=lambda timing: timing.self_us, reverse=True)[:top]
+    return {
+        'seconds': sum(timing.self_us for timing in timings) / 1e6,
+        'modules': len(timings),
+        'slowest_modules': [
+            {'module': timing.module, 'self_ms': timing.self_us / 1e3, 'cumulative_ms': timing.cumulative_us / 1e3}
+            for timing in slowest
+        ],
+        'packages': {name: us / 1e3 for name, us in sorted(packages.items(), key=lambda item: -item[1])[:top]},
+        'deferred_imported': sorted({timing.package for timing in timings if timing.package in DEFERRED}),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the import time of the dashboard's start-up.")
+    parser.add_argument('--script', default=MAIN_SCRIPT, help='app script whose imports to measure')
+    parser.add_argument('--budget', type=float, help='fail if the imports take longer, in seconds')
+    parser.add_argument('--repeat', type=int, default=3, help='measurements; the fastest is reported')
+    parser.add_argument('--top', type=int, default=15, help='modules and packages to list')
+    parser.add_argument('--json', dest='json_path', help='also write the report to this file')
+    args = parser.parse_args(argv)
+
+    statements = startup_imports(args.script)
+    cwd = os.path.dirname(os.path.abspath(args.script))
+    # The first run also warms the bytecode and file system caches.
+    report = min((summarize(measure(statements, cwd), args.top) for _ in range(max(args.repeat, 1))),
+                 key=lambda summary: summary['seconds'])
+    report['budget'] = args.budget
+    if args.json_path:
+        with open(args.json_path, 'w') as file:
+            json.dump(report, file, indent=2)
+
+    print(f"{report['modules']} modules imported in {report['seconds']:.2f}s")
+    print(f"{'module':<48}{'self ms':>10}{'cumul. ms':>11}")
+    for row in report['slowest_modules']:
+        print(f"{row['module']:<48}{row['self_ms']:>10.1f}{row['cumulative_ms']:>11.1f}")
+    print(f"{'package':<48}{'ms':>10}")
+    for name, ms in report['packages'].items():
+        print(f'{name:<48}{ms:>10.1f}')
+
+    failures = []
+    if report['deferred_imported']:
+        failures.append(f"deferred packages imported at start-up: {', '.join(report['deferred_imported'])}")
+    if args.budget is not None and report['seconds'] > args.budget:
+        failures.append(f"imports took {report['seconds']:.2f}s, over the {args.budget:.2f}s budget")
+    for failure in failures:
+        print(failure)
+    if failures and args.budget is not None:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+"""Out-of-core aggregation for registration extracts larger than memory.
+
+The CSV (or its columnar snapshot) is read in chunks of a bounded number of
+rows. Each chunk is cleaned and reduced to mergeable partial aggregates,
+the cube of :mod:`electrapulse.aggregations` plus the ``Electric Range``
+distribution and per-location counts for the density map, and then
+discarded. Peak memory is therefore set by the chunk size, not the dataset
+size, and every dashboard section renders from the merged partials.
+
+The merged partials are persisted next to the data (``.partials``, keyed by
+the data version), so a restart does not stream the file again and
+:mod:`electrapulse.refresh` can update them by the delta of a new release.
+"""
+import os
+import pickle
+import threading
+import time
+from dataclasses import dataclass, replace
+
+import pyarrow as pa
+
+from electrapulse import settings, snapshot
+from electrapulse.aggregations import Rollups, build_cube, merge_cubes
+from electrapulse.cleaning import StageReport, clean
+from electrapulse.distribution import RangeDistribution
+from electrapulse.loader import file_version
+from electrapulse.memory import budget, sizeof
+from electrapulse.geo import Locations
+from electrapulse.schema import ANALYSIS_COLUMNS, DATA_PATH, add_derived, read_csv
+
+
+@dataclass(frozen=True, eq=False)
+class Partials:
+    """Mergeable aggregates of some subset of the registration rows."""
+    cube: object
+    ranges: RangeDistribution
+    locations: Locations
+    stages: tuple
+    chunks: int = 1
+    seconds: float = 0.0
+    source: str = 'stream'
+
+    @classmethod
+    def from_frame(cls, frame):
+        cleaned = clean(frame)
+        return cls(
+            cube=build_cube(cleaned.frame),
+            ranges=RangeDistribution.from_ranges(cleaned.frame['Electric Range']),
+            locations=Locations.from_points(cleaned.frame['Longitude'], cleaned.frame['Latitude']),
+            stages=cleaned.stages,
+        )
+
+    @property
+    def rows_read(self):
+        return self.stages[0].rows_in
+
+    @property
+    def rows_dropped(self):
+        return self.stages[0].rows_in - self.stages[-1].rows_out
+
+    def merge(self, other):
+        return Partials(
+            cube=merge_cubes([self.cube, other.cube]),
+            ranges=self.ranges.merge(other.ranges),
+            locations=self.locations.merge(other.locations),
+            stages=tuple(
+                StageReport(mine.name, mine.rows_in + theirs.rows_in, mine.rows_out + theirs.rows_out,
+                            mine.seconds + theirs.seconds)
+                for mine, theirs in zip(self.stages, other.stages)
+            ),
+            chunks=self.chunks + other.chunks,
+            seconds=self.seconds + other.seconds,
+        )
+
+    def negated(self):
+        """These partials with every count negated: merging them takes their rows out again."""
+        return Partials(
+            cube=self.cube.assign(count=-self.cube['count'], range_sum=-self.cube['range_sum']),
+            ranges=self.ranges.negated(),
+            locations=self.locations.negated(),
+            stages=tuple(StageReport(stage.name, -stage.rows_in, -stage.rows_out, 0.0) for stage in self.stages),
+            chunks=0,
+        )
+
+    def rollups(self):
+        return Rollups.from_cube(self.cube)
+
+
+def iter_chunks(path=DATA_PATH, chunk_rows=settings.CHUNK_ROWS, columns=ANALYSIS_COLUMNS):
+    """Yield DataFrames of at most ``chunk_rows`` rows of ``columns``.
+
+    A fresh snapshot is sliced batch by batch from its memory map; otherwise
+    the CSV is parsed incrementally.
+    """
+    if snapshot.is_fresh(path):
+        yield from snapshot_chunks(snapshot.snapshot_path(path), chunk_rows, columns)
+    else:
+        with read_csv(path, columns, chunksize=chunk_rows) as reader:
+            for chunk in reader:
+                yield add_derived(chunk, columns)
+
+
+def snapshot_chunks(path, chunk_rows=settings.CHUNK_ROWS, columns=ANALYSIS_COLUMNS, start=0, stop=None):
+    """Yield DataFrames of at most ``chunk_rows`` of rows ``[start, stop)`` of the snapshot at ``path``."""
+    reader = pa.ipc.open_file(pa.memory_map(path))
+    offset = 0
+    for index in range(reader.num_record_batches):
+        batch = reader.get_batch(index)
+        end = offset + batch.num_rows
+        first, last = max(start, offset), end if stop is None else min(stop, end)
+        if first < last:
+            batch = batch.select([name for name in batch.schema.names if name in columns])
+            for row in range(first - offset, last - offset, chunk_rows):
+                yield snapshot.to_frame(batch.slice(row, min(chunk_rows, last - offset - row)))
+        offset = end
+
+
+def snapshot_rows(path):
+    """Number of rows in the snapshot at ``path``, read from its footer."""
+    reader = pa.ipc.open_file(pa.memory_map(path))
+    return sum(reader.get_batch(index).num_rows for index in range(reader.num_record_batches))
+
+
+def reduce_chunks(chunks):
+    """Merge the :class:`Partials` of every chunk frame, in order; None if there are none."""
+    partials = None
+    for chunk in chunks:
+        current = Partials.from_frame(chunk)
+        partials = current if partials is None else partials.merge(current)
+    return partials
+
+
+def stream_partials(path=DATA_PATH, chunk_rows=settings.CHUNK_ROWS):
+    """Reduce the data at ``path`` to :class:`Partials`, one chunk at a time."""
+    started = time.perf_counter()
+    partials = reduce_chunks(iter_chunks(path, chunk_rows))
+    if partials is None:
+        partials = Partials.from_frame(add_derived(read_csv(path, ANALYSIS_COLUMNS, nrows=0), ANALYSIS_COLUMNS))
+    return Partials(partials.cube, partials.ranges, partials.locations, partials.stages, partials.chunks,
+                    time.perf_counter() - started)
+
+
+PARTIALS_SUFFIX = '.partials'
+# Bumped whenever :class:`Partials` changes shape, so older files are ignored.
+PARTIALS_FORMAT = 2
+
+
+def partials_path(csv_path):
+    return os.path.splitext(csv_path)[0] + PARTIALS_SUFFIX
+
+
+def save_partials(partials, csv_path, version):
+    """Persist the partials of the data at ``csv_path`` as of ``version``."""
+    path = partials_path(csv_path)
+    # Write next to the target and rename, so readers never see a partial file.
+    with open(path + '.partial', 'wb') as file:
+        pickle.dump((PARTIALS_FORMAT, version, partials), file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(path + '.partial', path)
+
+
+def read_partials(csv_path, version):
+    """The persisted partials of the data at ``csv_path`` if they are of ``version``, else None.
+
+    The file is only ever written by :func:`save_partials`, so it is trusted.
+    """
+    try:
+        with open(partials_path(csv_path), 'rb') as file:
+            saved_format, saved_version, partials = pickle.load(file)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, TypeError, ValueError):
+        return None
+    return partials if (saved_format, saved_version) == (PARTIALS_FORMAT, version) else None
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+budget.register('partials', lambda: sum(sizeof(partials) for _, partials in list(_cache.values())))
+
+
+def load_partials(path=DATA_PATH, chunk_rows=settings.CHUNK_ROWS):
+    """Return the cached :class:`Partials` for ``path``, streaming it if needed.
+
+    Freshly streamed partials are persisted when the data's directory is writable.
+    """
+    path = os.path.abspath(path)
+    version = file_version(path)
+    entry = _cache.get(path)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    with _cache_lock:
+        entry = _cache.get(path)
+        if entry is None or entry[0] != version:
+            started = time.perf_counter()
+            partials = read_partials(path, version)
+            if partials is not None:
+                partials = replace(partials, seconds=time.perf_counter() - started, source='persisted')
+            else:
+                if settings.PARALLEL:
+                    # Imported here: the parallel module builds on this one.
+                    from electrapulse.parallel import stream_partials_parallel
+                    partials = stream_partials_parallel(path, chunk_rows)
+                else:
+                    partials = stream_partials(path, chunk_rows)
+                try:
+                    save_partials(partials, path, version)
+                except OSError:
+                    pass
+            entry = (version, partials)
+            _cache[path] = entry
+    return entry[1]
@@ -0,0 +1,197 @@
+"""Synthetic EV registrations shaped like the Washington DOL population file.
+
+The generator reproduces what the dashboard's cost depends on: the analysis
+columns with their real cardinalities (39 counties, several hundred cities,
+a few dozen makes and over a hundred models), Zipf-like skew within each, cities that
+belong to one county, models that belong to one make and have one EV type,
+registrations growing exponentially over the model years with a partial
+final year, ranges that depend on the model and are unresearched (0) for
+most recent vehicles, vehicle locations drawn from a few postal-code points
+around each city, and a sprinkling of missing values.
+
+Rows are produced in independently seeded chunks, so any number of rows can
+be written to a CSV in bounded memory and the same ``(rows, seed)`` always
+gives the same file. :func:`write_release` derives the next monthly release
+of a file, with some rows removed, changed and added.
+"""
+import numpy as np
+import pandas as pd
+
+from electrapulse.schema import read_csv
+
+COUNTIES = (
+    'King', 'Snohomish', 'Pierce', 'Clark', 'Thurston', 'Kitsap', 'Spokane', 'Whatcom', 'Benton', 'Skagit',
+    'Island', 'Chelan', 'Clallam', 'Yakima', 'Jefferson', 'San Juan', 'Mason', 'Cowlitz', 'Lewis', 'Kittitas',
+    'Grant', 'Franklin', 'Walla Walla', 'Douglas', 'Whitman', 'Grays Harbor', 'Stevens', 'Okanogan', 'Klickitat',
+    'Pacific', 'Skamania', 'Asotin', 'Adams', 'Wahkiakum', 'Pend Oreille', 'Lincoln', 'Ferry', 'Columbia',
+    'Garfield',
+)
+CITIES = 700
+FIRST_YEAR, LAST_YEAR = 1997, 2024
+# Washington's bounding box (longitude, latitude) and postal points per city.
+BOUNDS = ((-124.6, 45.6), (-117.1, 49.0))
+POINTS_PER_CITY = (1, 8)
+# DOL vehicle ids are nine digits; rows are numbered from here.
+FIRST_ID = 100_000_000
+
+# Makes by market share rank, with their best-known models first.
+MAKES = {
+    'TESLA': ('MODEL Y', 'MODEL 3', 'MODEL S', 'MODEL X', 'CYBERTRUCK', 'ROADSTER'),
+    'CHEVROLET': ('BOLT EV', 'VOLT', 'BOLT EUV', 'SPARK', 'BLAZER EV', 'S-10 PICKUP'),
+    'NISSAN': ('LEAF', 'ARIYA'),
+    'FORD': ('MUSTANG MACH-E', 'F-150', 'ESCAPE', 'FUSION', 'C-MAX', 'FOCUS', 'TRANSIT'),
+    'KIA': ('NIRO', 'EV6', 'SORENTO', 'SPORTAGE', 'SOUL', 'EV9', 'OPTIMA'),
+    'BMW': ('X5', 'I3', 'I4', 'IX', '330E', 'I7', '530E', 'X3', 'I8'),
+    'TOYOTA': ('RAV4 PRIME', 'PRIUS PRIME', 'BZ4X', 'PRIUS PLUG-IN'),
+    'HYUNDAI': ('IONIQ 5', 'KONA ELECTRIC', 'IONIQ', 'IONIQ 6', 'TUCSON', 'SANTA FE'),
+    'VOLKSWAGEN': ('ID.4', 'E-GOLF'),
+    'JEEP': ('WRANGLER', 'GRAND CHEROKEE'),
+    'RIVIAN': ('R1S', 'R1T', 'EDV'),
+    'VOLVO': ('XC90', 'XC60', 'C40', 'XC40', 'S60', 'V60'),
+    'AUDI': ('Q5 E', 'E-TRON', 'Q4', 'E-TRON GT', 'A3', 'Q8'),
+    'CHRYSLER': ('PACIFICA',),
+    'MERCEDES-BENZ': ('EQB-CLASS', 'EQS-CLASS SEDAN', 'EQE-CLASS SEDAN', 'GLC-CLASS', 'C-CLASS', 'B-CLASS'),
+    'PORSCHE': ('TAYCAN', 'CAYENNE', 'PANAMERA'),
+    'POLESTAR': ('PS2',),
+    'MITSUBISHI': ('OUTLANDER', 'I-MIEV'),
+    'MINI': ('HARDTOP', 'COUNTRYMAN'),
+    'SUBARU': ('SOLTERRA', 'CROSSTREK'),
+    'LEXUS': ('RZ', 'NX', 'RX'),
+    'HONDA': ('PROLOGUE', 'CLARITY', 'ACCORD'),
+    'CADILLAC': ('LYRIQ', 'ELR', 'CT6'),
+    'FIAT': ('500',), 'JAGUAR': ('I-PACE',), 'LINCOLN': ('AVIATOR', 'CORSAIR'), 'GENESIS': ('GV60', 'GV70'),
+    'LUCID': ('AIR',), 'SMART': ('FORTWO',), 'MAZDA': ('CX-90', 'MX-30'), 'LAND ROVER': ('RANGE ROVER',),
+    'ALFA ROMEO': ('TONALE',), 'DODGE': ('HORNET',), 'GMC': ('HUMMER EV',), 'FISKER': ('OCEAN', 'KARMA'),
+    'BENTLEY': ('BENTAYGA',), 'AZURE DYNAMICS': ('TRANSIT CONNECT ELECTRIC',), 'TH!NK': ('CITY',),
+}
+BEV = 'Battery Electric Vehicle (BEV)'
+PHEV = 'Plug-in Hybrid Electric Vehicle (PHEV)'
+
+# Share of rows missing each value in the real file.
+MISSING = {'County': 0.0001, 'City': 0.0001, 'Electric Range': 0.0001, 'Vehicle Location': 0.0001}
+
+
+class Catalog:
+    """The fixed dimension tables rows are drawn from."""
+
+    def __init__(self, seed=0):
+        rng = np.random.default_rng(seed)
+        self.cities = np.array(
+            ['SEATTLE', 'BELLEVUE', 'REDMOND', 'VANCOUVER', 'KIRKLAND', 'BOTHELL', 'SAMMAMISH', 'RENTON', 'OLYMPIA',
+             'TACOMA', 'EVERETT', 'SPOKANE'] + [f'CITY {number:03d}' for number in range(12, CITIES)], dtype=object)
+        self.counties = np.array(COUNTIES, dtype=object)
+        # Each city sits in one county; popular counties own most cities.
+        self.city_county = np.r_[[0, 0, 0, 3, 0, 0, 0, 0, 4, 2, 1, 6],
+                                 rng.choice(len(COUNTIES), CITIES - 12, p=_zipf(len(COUNTIES), 1.2))]
+        self.city_weights = _zipf(CITIES, 1.1)
+        # Each city has a few postal-code points scattered around its centre.
+        (west, south), (east, north) = BOUNDS
+        centres = rng.uniform((west, south), (east, north), (CITIES, 2))
+        points = rng.integers(*POINTS_PER_CITY, CITIES, endpoint=True)
+        self.city_first_point = np.r_[0, np.cumsum(points)[:-1]]
+        self.city_points = points
+        offsets = rng.normal(0, 0.03, (points.sum(), 2))
+        self.points = np.array([f'POINT ({lon:.5f} {lat:.5f})'
+                                for lon, lat in np.repeat(centres, points, axis=0) + offsets], dtype=object)
+
+        makes, models = [], []
+        for make, known in MAKES.items():
+            makes.extend([make] * len(known))
+            models.extend(known)
+        self.makes = np.array(list(MAKES), dtype=object)
+        self.models = np.array(models, dtype=object)
+        self.model_make = pd.Index(self.makes).get_indexer(makes)
+        make_weights = _zipf(len(MAKES), 1.6)
+        rank_in_make = np.concatenate([np.arange(len(known)) for known in MAKES.values()])
+        self.model_weights = make_weights[self.model_make] * _normalized(1 / (rank_in_make + 1) ** 1.3,
+                                                                         self.model_make)
+        self.model_type = np.where(rng.random(len(models)) < 0.7, 0, 1)
+        self.types = np.array([BEV, PHEV], dtype=object)
+        self.model_range = np.where(self.model_type == 0, rng.integers(80, 340, len(models)),
+                                    rng.integers(12, 45, len(models)))
+
+        years = np.arange(FIRST_YEAR, LAST_YEAR + 1)
+        growth = np.exp(0.3 * np.clip(years - 2010, 0, None)) * np.where(years < 2010, 0.05, 1)
+        growth[-1] *= 0.25  # The newest model year is published part-way through.
+        self.years = years
+        self.year_weights = growth / growth.sum()
+
+
+def generate(rows, seed=0, catalog=None, first_id=0):
+    """A DataFrame of ``rows`` synthetic registrations (the columns the analysis reads, plus ids).
+
+    Rows get the vehicle ids from ``FIRST_ID + first_id`` on.
+    """
+    catalog = catalog or Catalog(seed)
+    rng = np.random.default_rng([seed, rows])
+    city = rng.choice(len(catalog.cities), rows, p=catalog.city_weights)
+    model = rng.choice(len(catalog.models), rows, p=catalog.model_weights)
+    point = catalog.city_first_point[city] + (rng.random(rows) * catalog.city_points[city]).astype(np.int64)
+    year = rng.choice(catalog.years, rows, p=catalog.year_weights)
+    # Ranges of recent vehicles mostly have not been researched (0).
+    unresearched = (year >= 2020) & (rng.random(rows) < np.clip((year - 2019) * 0.25, 0, 0.95))
+    electric_range = np.where(unresearched, 0, catalog.model_range[model] + rng.integers(-5, 6, rows))
+
+    frame = pd.DataFrame({
+        'County': pd.Categorical.from_codes(catalog.city_county[city], catalog.counties),
+        'City': pd.Categorical.from_codes(city, catalog.cities),
+        'Model Year': year.astype('int16'),
+        'Make': pd.Categorical.from_codes(catalog.model_make[model], catalog.makes),
+        'Model': pd.Categorical.from_codes(model, catalog.models),
+        'Electric Vehicle Type': pd.Categorical.from_codes(catalog.model_type[model], catalog.types),
+        'Electric Range': pd.array(electric_range, dtype='Int32'),
+        'DOL Vehicle ID': np.arange(FIRST_ID + first_id, FIRST_ID + first_id + rows, dtype=np.int64),
+        'Vehicle Location': pd.Categorical.from_codes(point, catalog.points),
+    })
+    for column, share in MISSING.items():
+        frame.loc[rng.random(rows) < share, column] = None
+    return frame
+
+
+def write_csv(path, rows, seed=0, chunk_rows=1_000_000):
+    """Write ``rows`` synthetic registrations to ``path`` in bounded memory."""
+    catalog = Catalog(seed)
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        for start in range(0, rows, chunk_rows):
+            chunk = generate(min(chunk_rows, rows - start), seed=seed + start, catalog=catalog, first_id=start)
+            chunk.to_csv(file, index=False, header=start == 0)
+    return path
+
+
+def write_release(path, previous, churn=0.01, seed=0, chunk_rows=1_000_000):
+    """Write the release following the synthetic file at ``previous`` to ``path``.
+
+    A ``churn`` share of the rows is removed, as many are changed (moved to
+    another city, with a new range) and as many new registrations are added.
+    ``seed`` must be the one ``previous`` was written with.
+    """
+    catalog = Catalog(seed)
+    rng = np.random.default_rng([seed, 1])
+    rows, next_id = 0, 0
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        with read_csv(previous, chunksize=chunk_rows) as reader:
+            for chunk in reader:
+                draw = rng.random(len(chunk))
+                kept = chunk[draw >= churn].reset_index(drop=True)
+                changed = (draw[draw >= churn] < 2 * churn).nonzero()[0]
+                moved = generate(len(changed), seed=seed + rows + 1, catalog=catalog)
+                for column in ('County', 'City', 'Electric Range', 'Vehicle Location'):
+                    values = kept[column].astype(object) if column != 'Electric Range' else kept[column]
+                    values.iloc[changed] = moved[column].to_numpy()
+                    kept[column] = values
+                kept.to_csv(file, index=False, header=rows == 0)
+                rows += len(chunk)
+                next_id = max(next_id, int(chunk['DOL Vehicle ID'].max()) - FIRST_ID + 1)
+        added = generate(int(rows * churn), seed=seed + rows, catalog=catalog, first_id=next_id)
+        added.to_csv(file, index=False, header=rows == 0)
+    return path
+
+
+def _zipf(size, exponent):
+    return _normalized(1 / np.arange(1, size + 1) ** exponent)
+
+
+def _normalized(weights, groups=None):
+    if groups is None:
+        return weights / weights.sum()
+    return weights / np.bincount(groups, weights)[groups]
@@ -0,0 +1,69 @@
+"""Server-side paging of the registration table.
+
+Only the visible window of rows is sent to the browser. Sorting by a column
+uses a permutation of the rows built once per dataset, column and direction
+(the few most recently used are kept); a filter selection keeps the permuted
+positions that match it, once per selection. A page is then a slice of that permutation and a ``take`` of its
+rows, so its cost does not depend on the size of the table.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from electrapulse.filters import Selection, select_positions
+from electrapulse.memo import derived
+
+PAGE_SIZES = (25, 50, 100, 250)
+
+
+@dataclass(frozen=True, eq=False)
+class TableView:
+    """The rows of a frame in a given order (all of them, in file order, if ``order`` is None)."""
+    frame: pd.DataFrame
+    order: np.ndarray = None
+
+    @property
+    def total(self):
+        return len(self.frame) if self.order is None else len(self.order)
+
+    def pages(self, size):
+        return max(1, -(-self.total // size))
+
+    def page(self, number, size=PAGE_SIZES[1]):
+        """Rows of page ``number`` (from 0) of ``size`` rows."""
+        window = slice(number * size, (number + 1) * size)
+        return self.frame.iloc[window] if self.order is None else self.frame.take(self.order[window])
+
+
+# Each order is a row-sized array; keep a few, and let the memory budget evict them.
+@derived(maxsize=4)
+def sort_order(cleaned, column, ascending=True):
+    """Row positions of ``cleaned`` sorted by ``column``, missing values last, ties in row order."""
+    codes, uniques = pd.factorize(cleaned.frame[column], sort=True)
+    if not ascending:
+        codes = np.where(codes >= 0, len(uniques) - 1 - codes, codes)
+    codes[codes < 0] = len(uniques)
+    # Small code ranges let NumPy's stable sort use radix sort.
+    if len(uniques) < np.iinfo(np.int16).max:
+        codes = codes.astype(np.int16)
+    return np.argsort(codes, kind='stable')
+
+
+@derived(maxsize=16)
+def view_order(cleaned, selection, column=None, ascending=True):
+    """Row positions of ``selection``, sorted by ``column`` (row order if None); None means all rows."""
+    positions = select_positions(cleaned, selection)
+    if column is None:
+        return positions
+    order = sort_order(cleaned, column, ascending)
+    if positions is None:
+        return order
+    selected = np.zeros(len(cleaned.frame), dtype=bool)
+    selected[positions] = True
+    return order[selected[order]]
+
+
+def table_view(cleaned, selection=Selection(), column=None, ascending=True):
+    """The :class:`TableView` of ``selection`` sorted by ``column``."""
+    return TableView(cleaned.frame, view_order(cleaned, selection, column, ascending))
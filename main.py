@@ -1,63 +1,56 @@
-import time
-import matplotlib.pyplot as plt
-import numpy as np
-import pandas as pd
-import seaborn as sns
 import streamlit as st
-from scipy.optimize import curve_fit
+
+from electrapulse import background, instrumentation, settings
+from electrapulse.aggregations import cube_for
+from electrapulse.analysis import FIGURES, analyze, analyze_partials
+from electrapulse.cleaning import clean_dataset
+from electrapulse.figcache import render_figure
+from electrapulse.filters import Selection
+from electrapulse.geo import HEX_SIZES, MAX_COLUMNS, location_map, streamed_location_map
+from electrapulse.index import index_for
+from electrapulse.instrumentation import count, sent, span, timed
+from electrapulse.loader import file_version, load_dataset
+from electrapulse.query import QueryError, run_query
+from electrapulse.schema import DATA_PATH
+from electrapulse.segments import SEGMENT_DIMENSIONS, forecast_segments
+from electrapulse.startup import preload
+from electrapulse.streaming import load_partials
+from electrapulse.table import PAGE_SIZES, table_view
 
 st.set_page_config(
     page_title="ElectraPulse",
     page_icon="🚗",
 )
-# Header
-st.title('ElectraPulse 🚗')
-st.markdown("---")
-st.write("""
-Market size analysis for electric vehicles involves a multi-step process that includes defining the market scope, collecting and preparing data, analytical modelling, and communicating findings through visualization and reporting. Below is the process you can follow for the task of electric vehicles market size analysis:
 
-- Define whether the analysis is global, regional, or focused on specific countries.
-- Gather information from industry associations, market research firms (e.g., BloombergNEF, IEA), and government publications relevant to the EV market.
-- Use historical data to identify trends in EV sales, production, and market.
-- Analyze the market size and growth rates for different EV segments.
-- Based on the market size analysis, provide strategic recommendations for businesses looking to enter or expand in the EV market.
 
-So, we need an appropriate dataset for the task of market size analysis of electric vehicles. I found an ideal dataset for this task. You can download the dataset from https://statso.io/market-size-of-evs-case-study/.""")
-ev_data = pd.read_csv('Electric_Vehicle_Population_Data.csv')
-
-with st.status("Data Cleaning...", expanded=True) as status:
-    st.write("Getting Information about the Data...")
-    time.sleep(1)
-    st.write("Calculating the sum of NaN values in each column...")
-    time.sleep(1)
-    st.write("Dropping rows with NaN values...")
-    time.sleep(1)
-    status.update(label="Data Cleaned", expanded=False)
-
-st.write(ev_data)
-ev_data.isnull().sum()
-ev_data.isnull().any(axis=1)
-ev_data = ev_data.dropna()
-
-st.subheader('Analyzing the distribution of electric vehicle Types')
-st.write("""From the below bar chart, it’s clear that EV adoption has been increasing over time, especially 
+# The helpers and sections below read the page state (analysis, cleaned, selection, ...) set by the script run
+def show_chart(name, forecast=None):
+    image = render_figure(*analysis.figure(name, forecast))
+    sent(len(image))
+    st.image(image, use_column_width=True)
+
+
+def prefetch_forecast():
+    try:
+        render_figure(*analysis.figure('forecast', analysis.forecast()))
+    except RuntimeError:
+        pass
+
+
+# Each section computes and renders only when it is opened.
+def adoption_section():
+    st.subheader('Analyzing the distribution of electric vehicle Types')
+    st.write("""From the below bar chart, it’s clear that EV adoption has been increasing over time, especially 
 noting a significant upward trend starting around 2016. The number of vehicles registered grows modestly up until 
 that point and then begins to rise more rapidly from 2017 onwards. The year 2023 shows a particularly sharp 
 increase in the number of registered EVs, with the bar for 2023 being the highest on the graph, indicating a peak 
 in EV adoption. """)
-sns.set_style("whitegrid")
-ev_adoption_by_year = ev_data['Model Year'].value_counts().sort_index()
-fig, ax = plt.subplots(figsize=(12, 6))
-sns.barplot(x=ev_adoption_by_year.index, y=ev_adoption_by_year.values, hue=ev_adoption_by_year.index,
-            palette="viridis", legend=False, ax=ax)
-ax.set_title('EV Adoption Over Time')
-ax.set_xlabel('Model Year')
-ax.set_ylabel('Number of Vehicles Registered')
-ax.set_xticklabels(ev_adoption_by_year.index, rotation=45)
-st.pyplot(fig)
-
-st.subheader('Geographical Distribution')
-st.write("""The above graph compares the number of electric vehicles registered in various cities within three 
+    show_chart('adoption_by_year')
+
+
+def geography_section():
+    st.subheader('Geographical Distribution')
+    st.write("""The above graph compares the number of electric vehicles registered in various cities within three 
 counties: King, Snohomish, and Pierce. The horizontal bars represent cities, and their length corresponds to the 
 number of vehicles registered, colour-coded by county. Here are the key findings from the above graph:
 
@@ -70,59 +63,49 @@ King County, which seems to dominate EV registrations among the three counties.
 
 Overall, the graph indicates that EV adoption is not uniform across the cities and is more concentrated in certain 
 areas, particularly in King County.""")
-ev_county_distribution = ev_data['County'].value_counts()
-top_counties = ev_county_distribution.head(3).index
-top_counties_data = ev_data[ev_data['County'].isin(top_counties)]
-ev_city_distribution_top_counties = top_counties_data.groupby(['County', 'City']).size().sort_values(
-    ascending=False).reset_index(name='Number of Vehicles')
-top_cities = ev_city_distribution_top_counties.head(10)
-fig, ax = plt.subplots(figsize=(12, 8))
-sns.barplot(x='Number of Vehicles', y='City', hue='County', data=top_cities, palette="magma", legend=False,
-            ax=ax)
-ax.set_title('Geographical Distribution at County Level')
-ax.set_xlabel('Number of Vehicles Registered')
-ax.set_ylabel('City')
-plt.tight_layout()
-st.pyplot(fig)
-
-st.subheader('Distribution of Electric Vehicle Types')
-st.write("""Let’s explore the types of electric vehicles represented in this dataset. Understanding the breakdown 
+    show_chart('top_cities')
+
+    st.write("""The map below counts the registrations by their vehicle location in hexagons; taller and redder 
+columns hold more vehicles. Pick a smaller hexagon size to look closer.""")
+    level = st.select_slider("Hexagon size", options=list(HEX_SIZES), value='County')
+    if settings.STREAMING:
+        density = streamed_location_map(partials.locations, HEX_SIZES[level])
+    else:
+        density = location_map(cleaned, selection, HEX_SIZES[level])
+    bins = density.bins
+    sent(density.payload_bytes)
+    st.pydeck_chart(density.deck)
+    shown = f"the densest {MAX_COLUMNS:,} of " if len(bins) > MAX_COLUMNS else ""
+    st.caption(f"Showing {shown}{len(bins):,} hexagons of {HEX_SIZES[level]:,} m holding {bins['count'].sum():,} "
+               f"located registrations.")
+
+
+def types_section():
+    st.subheader('Distribution of Electric Vehicle Types')
+    st.write("""Let’s explore the types of electric vehicles represented in this dataset. Understanding the breakdown 
     between different EV types, such as Battery Electric Vehicles (BEV) and Plug-in Hybrid Electric Vehicles (PHEV), 
     can provide insights into consumer preferences and the adoption patterns of purely electric vs. hybrid electric 
     solutions. So, let’s visualize the distribution of electric vehicle types to see which categories are most 
     popular among the registered vehicles.
     The below graph shows that BEVs are more popular or preferred over PHEVs 
     among the electric vehicles registered in the United States.""")
-ev_type_distribution = ev_data['Electric Vehicle Type'].value_counts()
-fig, ax = plt.subplots(figsize=(10, 6))
-sns.barplot(x=ev_type_distribution.values, y=ev_type_distribution.index, hue=ev_type_distribution.index,
-            palette="rocket", legend=False, ax=ax)
-ax.set_title('Distribution of Electric Vehicle Types')
-ax.set_xlabel('Number of Vehicles Registered')
-ax.set_ylabel('Electric Vehicle Type')
-plt.tight_layout()
-st.pyplot(fig)
-
-st.subheader('Top 10 Popular EV Makes')
-st.write("""
+    show_chart('type_distribution')
+
+
+def makes_section():
+    st.subheader('Top 10 Popular EV Makes')
+    st.write("""
 The chart shows that:
 
 - TESLA leads by a substantial margin with the highest number of vehicles registered. - NISSAN is the second most 
 popular manufacturer, followed by CHEVROLET, though both have significantly fewer registrations than TESLA. - FORD, 
 BMW, KIA, TOYOTA, VOLKSWAGEN, JEEP, and HYUNDAI follow in decreasing order of the number of registered vehicles.""")
-ev_make_distribution = ev_data['Make'].value_counts().head(10)  # Limiting to top 10 for clarity
-
-fig, ax = plt.subplots(figsize=(12, 6))  # Use plt.subplots() instead of plt.figure()
-sns.barplot(x=ev_make_distribution.values, y=ev_make_distribution.index, palette="cubehelix",
-            ax=ax)  # Add ax=ax parameter
-plt.title('Top 10 Popular EV Makes')
-plt.xlabel('Number of Vehicles Registered')
-plt.ylabel('Make')
-plt.tight_layout()
-st.pyplot(fig)
-
-st.subheader('Top Models in Top 3 Makes by EV Registrations')
-st.write("""The graph shows the distribution of electric vehicle registrations among different models from the top 
+    show_chart('top_makes')
+
+
+def models_section():
+    st.subheader('Top Models in Top 3 Makes by EV Registrations')
+    st.write("""The graph shows the distribution of electric vehicle registrations among different models from the top 
 three manufacturers: TESLA, NISSAN, and CHEVROLET. Here are the findings:
 
 - TESLA’s MODEL Y and MODEL 3 are the most registered vehicles, with MODEL Y having the highest number of registrations.
@@ -130,32 +113,13 @@ three manufacturers: TESLA, NISSAN, and CHEVROLET. Here are the findings:
 - TESLA’s MODEL S and MODEL X also have a significant number of registrations.
 - CHEVROLET’s BOLT EV and VOLT are the next in the ranking with considerable registrations, followed by BOLT EUV.
 - NISSAN’s ARIYA and CHEVROLET’s SPARK have the least number of registrations among the models shown""")
-# Selecting the top 3 manufacturers based on the number of vehicles registered
-top_3_makes = ev_make_distribution.head(3).index
-
-# Filtering the dataset for these top manufacturers
-top_makes_data = ev_data[ev_data['Make'].isin(top_3_makes)]
-
-# Analyzing the popularity of EV models within these top manufacturers
-ev_model_distribution_top_makes = top_makes_data.groupby(['Make', 'Model']).size().sort_values(
-    ascending=False).reset_index(name='Number of Vehicles')
+    # The top 10 models within the top 3 manufacturers by the number of vehicles registered
+    show_chart('top_models')
 
-# Visualizing the top 10 models across these manufacturers for clarity
-top_models = ev_model_distribution_top_makes.head(10)
 
-fig, ax = plt.subplots(figsize=(12, 8))
-sns.barplot(x='Number of Vehicles', y='Model', hue='Make', data=top_models, palette="viridis", ax=ax)
-plt.title('Top Models in Top 3 Makes by EV Registrations')
-plt.xlabel('Number of Vehicles Registered')
-plt.ylabel('Model')
-plt.legend(title='Make', loc='center right')
-plt.tight_layout()
-
-# Display the plot within Streamlit
-st.pyplot(fig)
-
-st.subheader("Distribution of Electric Vehicle Ranges")
-st.write("""
+def range_section():
+    st.subheader("Distribution of Electric Vehicle Ranges")
+    st.write("""
 The graph shows the mean electric range. Key observations from the graph include:
 
 - There is a high frequency of vehicles with a low electric range, with a significant peak occurring just before 50 
@@ -164,22 +128,15 @@ number of vehicles with higher ranges is much less frequent. - The mean electric
 marked at approximately 58.84 miles, which is relatively low compared to the highest ranges shown in the graph. - 
 Despite the presence of electric vehicles with ranges that extend up to around 350 miles, the majority of the 
 vehicles have a range below the mean.""")
-plt.figure(figsize=(12, 6))
-sns.histplot(ev_data['Electric Range'], bins=30, kde=True, color='royalblue')
-plt.title('Distribution of Electric Vehicle Ranges')
-plt.xlabel('Electric Range (miles)')
-plt.ylabel('Number of Vehicles')
-
-# Adding a vertical line for the mean electric range
-mean_range = ev_data['Electric Range'].mean()
-plt.axvline(mean_range, color='red', linestyle='--', label=f'Mean Range: {mean_range:.2f} miles')
-# Displaying the legend
-plt.legend()
-# Displaying the plot within Streamlit
-st.pyplot(plt)
-
-st.subheader('Average Electric Range by Model Year')
-st.write("""The graph shows the progression of the average electric range of vehicles from around the year 2000 to 
+    show_chart('range_distribution')
+    quartiles = analysis.ranges.quantile([0.25, 0.5, 0.75])
+    st.caption(f"Median range {quartiles[1]:.0f} miles; the middle half of the vehicles have between "
+               f"{quartiles[0]:.0f} and {quartiles[2]:.0f} miles.")
+
+
+def range_by_year_section():
+    st.subheader('Average Electric Range by Model Year')
+    st.write("""The graph shows the progression of the average electric range of vehicles from around the year 2000 to 
 2024. Key findings from the graph:
 
 - There is a general upward trend in the average electric range of EVs over the years, indicating improvements in 
@@ -191,63 +148,39 @@ sharp decline, there is a slight recovery in the average range in the most recen
 The data suggest that while there have been fluctuations, the overall trend over the last two decades has been toward 
 increasing the electric range of EVs.""")
 
-# Calculating the average electric range by model year
-average_range_by_year = ev_data.groupby('Model Year')['Electric Range'].mean().reset_index()
-# Plotting the average electric range by model year
-plt.figure(figsize=(12, 6))
-sns.lineplot(x='Model Year', y='Electric Range', data=average_range_by_year, marker='o', color='green')
-plt.title('Average Electric Range by Model Year')
-plt.xlabel('Model Year')
-plt.ylabel('Average Electric Range (miles)')
-plt.grid(True)
-
-# Displaying the plot within Streamlit
-st.pyplot(plt)
-
-st.subheader('Top 10 Models by Average Electric Range in Top Makes')
-st.write("""The TESLA ROADSTER has the highest average electric range among the models listed. TESLA’s models (
+    # Average electric range by model year
+    show_chart('range_by_year')
+
+
+def range_by_model_section():
+    st.subheader('Top 10 Models by Average Electric Range in Top Makes')
+    st.write("""The TESLA ROADSTER has the highest average electric range among the models listed. TESLA’s models (
 ROADSTER, MODEL S, MODEL X, and MODEL 3) occupy the majority of the top positions, indicating that on average, 
 TESLA’s vehicles have higher electric ranges. The CHEVROLET BOLT EV is an outlier among the CHEVROLET models, 
 having a substantially higher range than the VOLT and S-10 PICKUP from the same maker. NISSAN’s LEAF and CHEVROLET’s 
 SPARK are in the lower half of the chart, suggesting more modest average ranges.""")
-# Calculating the average electric range by model within the top manufacturers
-average_range_by_model = top_makes_data.groupby(['Make', 'Model'])['Electric Range'].mean().sort_values(
-    ascending=False).reset_index()
-
-# Selecting the top 10 models with the highest average electric range
-top_range_models = average_range_by_model.head(10)
-
-# Plotting the top 10 models by average electric range within the top manufacturers
-plt.figure(figsize=(12, 8))
-bar = sns.barplot(x='Electric Range', y='Model', hue='Make', data=top_range_models, palette="cool")
-plt.title('Top 10 Models by Average Electric Range in Top Makes')
-plt.xlabel('Average Electric Range (miles)')
-plt.ylabel('Model')
-plt.legend(title='Make', loc='center right')
-
-# Displaying the plot within Streamlit
-st.pyplot(plt)
-
-# Subheader
-st.subheader("Estimated Market Size Analysis of Electric Vehicles in the United States")
-# Calculate the number of EVs registered each year
-ev_registration_counts = ev_data['Model Year'].value_counts().sort_index()
-# Get unique years in the dataset
-unique_years = sorted(ev_data['Model Year'].unique())
-
-# Split the list of years into chunks of 4
-chunks = [unique_years[i:i + 5] for i in range(0, len(unique_years), 5)]
-
-# Create metrics for each chunk
-for chunk in chunks:
-    row = st.columns(5)
-    for year in chunk:
-        filtered_data = ev_data[ev_data['Model Year'] == year]
-        ev_count = len(filtered_data)
-        # Ensure the index doesn't exceed the length of the row
-        if len(row) > 0:
-            row.pop(0).metric(label=f"EVs registered in {year}", value=ev_count)
-st.write("""The dataset provides the number of electric vehicles registered each year from 1997 through 2024. 
+    # The top 10 models with the highest average electric range within the top manufacturers
+    show_chart('range_by_model')
+
+
+def market_size_section():
+    # Subheader
+    st.subheader("Estimated Market Size Analysis of Electric Vehicles in the United States")
+    # Number of EVs registered each year
+    unique_years = list(year_counts.index)
+
+    # Split the list of years into chunks of 4
+    chunks = [unique_years[i:i + 5] for i in range(0, len(unique_years), 5)]
+
+    # Create metrics for each chunk
+    for chunk in chunks:
+        row = st.columns(5)
+        for year in chunk:
+            ev_count = int(year_counts[year])
+            # Ensure the index doesn't exceed the length of the row
+            if len(row) > 0:
+                row.pop(0).metric(label=f"EVs registered in {year}", value=ev_count)
+    st.write("""The dataset provides the number of electric vehicles registered each year from 1997 through 2024. 
 However, the data for 2024 is incomplete as it only contains the data till March. Here’s a summary of EV 
 registrations for recent years:
 
@@ -256,76 +189,228 @@ registrations for recent years:
 - In 2023, a significant jump to 57,519 EVs was observed.
 - For 2024, currently, 7,072 EVs are registered, which suggests partial data.""")
 
-st.subheader("Forecasting Electric Vehicle Registrations")
-
-# Filter the dataset to include years with complete data, assuming 2023 is the last complete year
-filtered_years = ev_registration_counts[ev_registration_counts.index <= 2023]
-
-
-# Define a function for exponential growth to fit the data
-def exp_growth(x, a, b):
-    return a * np.exp(b * x)
-
-
-# Prepare the data for curve fitting
-x_data = filtered_years.index - filtered_years.index.min()
-y_data = filtered_years.values
-
-# Fit the data to the exponential growth function
-params, covariance = curve_fit(exp_growth, x_data, y_data)
-
-# Use the fitted function to forecast the number of EVs for 2024 and the next five years
-forecast_years = np.arange(2024, 2024 + 6) - filtered_years.index.min()
-forecasted_values = exp_growth(forecast_years, *params)
-
-# Create a dictionary to display the forecasted values for easier interpretation
-forecasted_evs = dict(zip(forecast_years + filtered_years.index.min(), forecasted_values))
-print(forecasted_evs)
-# Prepare data for plotting
-years = np.arange(filtered_years.index.min(), 2029 + 1)
-actual_years = filtered_years.index
-forecast_years_full = np.arange(2024, 2029 + 1)
-
-# Actual and forecasted values
-actual_values = filtered_years.values
-forecasted_values_full = [forecasted_evs.get(year, np.nan) for year in forecast_years_full]
-
-# Plotting
-plt.figure(figsize=(12, 8))
-plt.plot(actual_years, actual_values, 'bo-', label='Actual Registrations')
-plt.plot(forecast_years_full, forecasted_values_full, 'ro--', label='Forecasted Registrations')
-
-plt.title('Current & Estimated EV Market')
-plt.xlabel('Year')
-plt.ylabel('Number of EV Registrations')
-plt.legend()
-plt.grid(True)
-
-# Display the plot within Streamlit
-st.pyplot(plt)
-# Determine the number of items to display in each column
-num_items = len(forecasted_evs) // 3
-
-# Split the forecasted_evs dictionary into three parts
-chunks = [list(forecasted_evs.items())[i:i + num_items] for i in range(0, len(forecasted_evs), num_items)]
 
-# Create three columns
-c1, c2, c3 = st.columns(3)
+def forecast_section():
+    st.subheader("Forecasting Electric Vehicle Registrations")
+
+    # Fit the candidate growth models to the complete years, keep the best on held-out years,
+    # and bootstrap its prediction interval
+    try:
+        with span('forecast.fit'):
+            forecast = analysis.forecast()
+    except RuntimeError as error:
+        st.warning(f"No forecast for the selected registrations: {error}.")
+    else:
+        forecasted_evs = forecast.as_dict()
+        show_chart('forecast', forecast)
+        st.caption(f"{forecast.model.capitalize()} growth model, selected by error on the last held-out years; "
+                   f"shaded: {forecast.level:.0%} bootstrap prediction interval from {forecast.resamples:,} "
+                   "resamples.")
+        # Determine the number of items to display in each column
+        num_items = len(forecasted_evs) // 3
+
+        # Split the forecasted_evs dictionary into three parts
+        chunks = [list(forecasted_evs.items())[i:i + num_items] for i in range(0, len(forecasted_evs), num_items)]
+
+        # Create three columns
+        c1, c2, c3 = st.columns(3)
+
+        # Iterate over each chunk and display the metrics in each column
+        for chunk, column in zip(chunks, [c1, c2, c3]):
+            for year, value in chunk:
+                column.metric(label=f"EVs registered in {year}", value=int(value))
 
-# Iterate over each chunk and display the metrics in each column
-for chunk, column in zip(chunks, [c1, c2, c3]):
-    for year, value in chunk:
-        column.metric(label=f"EVs registered in {year}", value=int(value))
-
-st.write("""
+    st.write("""
 From the above graph, we can see:
 
 - The number of actual EV registrations remained relatively low and stable until around 2010, after which there was a consistent and steep upward trend, suggesting a significant increase in EV adoption.
 - The forecasted EV registrations predict an even more dramatic increase in the near future, with the number of registrations expected to rise sharply in the coming years.
 """)
 
-with st.expander("# ***Overview of electric vehicles (EVs)***"):
+
+def segments_section():
+    st.subheader("Forecasts by Segment")
+    st.write("""The statewide curve hides very different trajectories. Below, registrations are forecast for every 
+county, city, make or vehicle type at once: each series gets an exponential fit on the log scale, series that fit 
+poorly are refitted with the nonlinear growth models, and those with too little history get a naive forecast.""")
+    segment_dimension = st.selectbox("Forecast each", SEGMENT_DIMENSIONS)
+    with span('forecast.segments'):
+        segment_forecast = forecast_segments(cube, segment_dimension)
+    segment_table = segment_forecast.table().sort_values('Last Year Count', ascending=False)
+    segment_table['Growth Rate'] *= 100
+    segment_table.columns = segment_table.columns.map(str)
+    st.dataframe(segment_table.round(2),
+                 column_config={'Growth Rate': st.column_config.NumberColumn('Growth / Year', format="%.1f%%")})
+
+
+EXAMPLE_QUERY = """SELECT "Electric Utility", Make, count(*) AS vehicles, mean("Electric Range") AS mean_range
+WHERE County IN ('King', 'Pierce') AND "Model Year" >= 2018
+ORDER BY vehicles DESC LIMIT 20"""
+
+
+def query_section():
+    st.subheader("Ad Hoc Queries")
+    st.write("""Cut the registrations any way you need with a small SQL dialect: select columns and aggregates 
+(`count`, `count_distinct`, `sum`, `mean`, `min`, `max`, `stddev`), filter with `WHERE`, and rank with `ORDER BY` and 
+`LIMIT`. Quote column names that contain spaces, and band numbers with `bucket("Base MSRP", 10000)`. Queries run over 
+the whole dataset; the sidebar filters do not apply.""")
+    text = st.text_area("Query", EXAMPLE_QUERY, height=120)
+    try:
+        with span('query'):
+            result = run_query(text)
+    except QueryError as error:
+        st.error(f"Query error: {error}")
+        return
+    table = result.to_frame()
+    sent(table.memory_usage(deep=True).sum())
+    st.dataframe(table, use_container_width=True)
+    st.caption(f"{len(table):,} rows from {result.rows_scanned:,} registrations in {result.seconds * 1000:.0f} ms")
+
+
+def data_section():
+    if settings.STREAMING:
+        st.info("The raw registration table is not available in streaming mode.")
+        return
+    # Paged on the server: only the visible rows are sent to the browser
+    sort_column, direction, page_size = st.columns(3)
+    sort_by = sort_column.selectbox("Sort by", ["File order", *cleaned.frame.columns])
+    ascending = direction.radio("Order", ["Ascending", "Descending"], horizontal=True) == "Ascending"
+    size = page_size.selectbox("Rows per page", PAGE_SIZES, index=1)
+    view = table_view(cleaned, selection, None if sort_by == "File order" else sort_by, ascending)
+    number = st.number_input("Page", min_value=1, max_value=view.pages(size), value=1)
+    page = view.page(number - 1, size)
+    sent(page.memory_usage(deep=True).sum())
+    st.dataframe(page, use_container_width=True)
+    first = (number - 1) * size
+    st.caption(f"Rows {min(first + 1, view.total):,}–{min(first + size, view.total):,} of {view.total:,} cleaned "
+               f"registrations (page {number:,} of {view.pages(size):,})")
+
+
+SECTIONS = {
+    "Adoption": adoption_section,
+    "Geography": geography_section,
+    "EV Types": types_section,
+    "Makes": makes_section,
+    "Models": models_section,
+    "Range": range_section,
+    "Range by Year": range_by_year_section,
+    "Range by Model": range_by_model_section,
+    "Market Size": market_size_section,
+    "Forecast": forecast_section,
+    "Segment Forecasts": segments_section,
+    "Query": query_section,
+    "Raw Data": data_section,
+}
+
+
+# Time the whole script run, and count reruns and new sessions
+script_run = span('script', memory=False).start()
+try:
+    count('reruns')
+    if 'instrumented' not in st.session_state:
+        st.session_state['instrumented'] = True
+        count('sessions')
+    # Start reading the data before anything is drawn, so it loads while the header renders
+    loading = background.submit('load', timed('load', load_partials if settings.STREAMING else load_dataset),
+                                urgent=True)
+    # The chart libraries are imported on first use; warm them up while the data loads
+    if settings.PRELOAD:
+        background.submit('preload', preload)
+    # Header
+    st.title('ElectraPulse 🚗')
+    st.markdown("---")
     st.write("""
+Market size analysis for electric vehicles involves a multi-step process that includes defining the market scope, collecting and preparing data, analytical modelling, and communicating findings through visualization and reporting. Below is the process you can follow for the task of electric vehicles market size analysis:
+
+- Define whether the analysis is global, regional, or focused on specific countries.
+- Gather information from industry associations, market research firms (e.g., BloombergNEF, IEA), and government publications relevant to the EV market.
+- Use historical data to identify trends in EV sales, production, and market.
+- Analyze the market size and growth rates for different EV segments.
+- Based on the market size analysis, provide strategic recommendations for businesses looking to enter or expand in the EV market.
+
+So, we need an appropriate dataset for the task of market size analysis of electric vehicles. I found an ideal dataset for this task. You can download the dataset from https://statso.io/market-size-of-evs-case-study/.""")
+
+    with st.spinner("Loading registrations..."), span('load.wait'):
+        loaded = loading.result()
+    if settings.STREAMING:
+        # Out-of-core mode: only mergeable partial aggregates are ever resident
+        partials = loaded
+        if partials.source == 'persisted':
+            st.caption(f"Read the persisted aggregates of {partials.rows_read:,} registrations in "
+                       f"{partials.seconds:.2f}s")
+        else:
+            st.caption(f"Streamed {partials.rows_read:,} registrations in {partials.chunks:,} chunks of up to "
+                       f"{settings.CHUNK_ROWS:,} rows in {partials.seconds:.2f}s")
+        cleaning_stages, rows_dropped, missing = partials.stages, partials.rows_dropped, None
+        data_version = file_version(DATA_PATH)
+    else:
+        dataset = loaded
+        st.caption(f"Loaded {dataset.rows:,} registrations from {dataset.source} in {dataset.parse_seconds:.2f}s "
+                   f"({dataset.resident_bytes / 2 ** 20:.1f} MiB resident)")
+        with span('clean'):
+            cleaned = clean_dataset(dataset)
+        cleaning_stages, rows_dropped = cleaned.stages, cleaned.rows_dropped
+        data_version = dataset.version
+        missing = cleaned.null_counts[cleaned.null_counts > 0]
+
+    with st.status("Data Cleaning...", expanded=True) as status:
+        for stage in cleaning_stages:
+            st.write(f"{stage.name}: {stage.rows_in:,} → {stage.rows_out:,} rows in {stage.seconds * 1000:.1f} ms")
+        if missing is not None and len(missing):
+            st.write("Missing values per column:", missing.rename('Missing values'))
+        status.update(label=f"Data Cleaned ({rows_dropped:,} rows dropped)", expanded=False)
+
+    if settings.STREAMING:
+        cube = partials.cube
+        filter_options = {column: sorted(cube[column].unique()) for column in Selection.COLUMNS.values()}
+        years = cube['Model Year']
+    else:
+        cube = cube_for(cleaned)
+        filter_options = {column: index_for(cleaned, column).keys for column in Selection.COLUMNS.values()}
+        years = index_for(cleaned, 'Model Year').keys
+
+    # Cross-filters: every chart, metric and forecast below follows the selection
+    st.sidebar.header("Filters")
+    first_year, last_year = int(years.min()), int(years.max())
+    year_range = st.sidebar.slider("Model Year", first_year, last_year, (first_year, last_year))
+    selection = Selection(
+        counties=tuple(st.sidebar.multiselect("County", filter_options['County'])),
+        cities=tuple(st.sidebar.multiselect("City", filter_options['City'])),
+        makes=tuple(st.sidebar.multiselect("Make", filter_options['Make'])),
+        types=tuple(st.sidebar.multiselect("Electric Vehicle Type", filter_options['Electric Vehicle Type'])),
+        years=None if year_range == (first_year, last_year) else year_range,
+    )
+
+    with span('analyze'):
+        analysis = analyze_partials(partials, selection) if settings.STREAMING else analyze(cleaned, selection)
+    if settings.STREAMING and not analysis.range_filtered:
+        st.sidebar.caption("Streaming mode keeps no rows, so the range histogram and the density map are not "
+                           "filtered.")
+    cube, rollups, year_counts = analysis.cube, analysis.rollups, analysis.year_counts
+    if selection:
+        st.sidebar.caption(f"{rollups.total:,} registrations match the filters.")
+        if not rollups.total:
+            st.warning("No registrations match the selected filters.")
+            st.stop()
+
+    # What the sections show depends only on the data version and the filters. Sessions keep
+    # nothing but their selections: images and maps live in caches shared by the process.
+    view_key = (data_version, selection)
+
+    section = st.radio("Section", list(SECTIONS), horizontal=True, label_visibility="collapsed")
+    with span(f'section.{section}'):
+        SECTIONS[section]()
+
+    if settings.PREFETCH:
+        # Render the other sections' charts into the shared figure cache while the user reads this one.
+        # The forecast's bootstrap is only worth running ahead for the unfiltered page everyone opens.
+        for name in FIGURES:
+            background.prefetch(('figure', name, view_key), lambda name=name: render_figure(*analysis.figure(name)))
+        if not selection:
+            background.prefetch(('forecast', view_key), prefetch_forecast)
+
+    with st.expander("# ***Overview of electric vehicles (EVs)***"):
+        st.write("""
 ---
 
 ### 1. Introduction to Electric Vehicles
@@ -590,3 +675,24 @@ Electric vehicles represent a promising solution to the environmental, economic,
 ---
 
 """)
+finally:
+    script_run.end()
+    if settings.METRICS_PATH:
+        instrumentation.write_metrics(settings.METRICS_PATH)
+if settings.DEBUG or st.query_params.get("debug") == "1":
+    # Where this process has spent its time, for finding slow page loads
+    with st.sidebar.expander("Instrumentation"):
+        snapshot = instrumentation.metrics.snapshot()
+        st.write(f"{snapshot['counters'].get('reruns', 0):,} reruns in "
+                 f"{snapshot['counters'].get('sessions', 0):,} sessions over {snapshot['uptime_seconds']:.0f}s")
+        st.dataframe(instrumentation.span_table(snapshot), use_container_width=True)
+        gauges = snapshot['gauges']
+        limit = gauges['memory_budget_bytes']
+        st.write(f"Shared caches hold {gauges['memory_used_bytes'] / 2 ** 20:,.1f} MiB"
+                 f"{f' of a {limit / 2 ** 20:,.0f} MiB budget' if limit else ''}; "
+                 f"{gauges['compute_waiting']:,} computations wait for one of {gauges['compute_slots']:,} slots")
+        st.dataframe(instrumentation.cache_table(snapshot), use_container_width=True)
+        st.download_button("Metrics (JSON)", instrumentation.to_json(snapshot), "electrapulse-metrics.json",
+                           "application/json")
+        st.download_button("Metrics (Prometheus)", instrumentation.to_prometheus(snapshot),
+                           "electrapulse-metrics.prom", "text/plain")
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import sorted_cube
+from electrapulse.aggregations import DIMENSIONS, Rollups, build_cube, cube_for, merge_cubes, rollups_for
+
+
+def direct_cube(frame):
+    grouped = frame.groupby(list(DIMENSIONS), observed=True)['Electric Range']
+    cube = pd.DataFrame({'count': grouped.size(), 'range_sum': grouped.sum().astype(np.int64)}).reset_index()
+    for name in DIMENSIONS[1:]:
+        cube[name] = cube[name].astype(str)
+    return sorted_cube(cube)
+
+
+def test_cube_matches_groupby(cleaned):
+    pd.testing.assert_frame_equal(sorted_cube(cube_for(cleaned)), direct_cube(cleaned.frame), check_dtype=False)
+
+
+def test_merged_partial_cubes_match_whole(cleaned):
+    frame = cleaned.frame
+    parts = [build_cube(frame.iloc[start:start + 1000]) for start in range(0, len(frame), 1000)]
+    pd.testing.assert_frame_equal(sorted_cube(merge_cubes(parts)), sorted_cube(cube_for(cleaned)))
+
+
+def test_rollups_match_pandas(cleaned):
+    frame, rollups = cleaned.frame, rollups_for(cleaned)
+    assert rollups.total == len(frame)
+    assert rollups.mean_range == pytest.approx(frame['Electric Range'].mean())
+    for aggregate, column in (('adoption_by_year', 'Model Year'), ('county_counts', 'County'),
+                              ('make_counts', 'Make'), ('type_counts', 'Electric Vehicle Type')):
+        expected = frame[column].value_counts().loc[lambda counts: counts > 0]
+        actual = getattr(rollups, aggregate)
+        assert actual.to_dict() == {key: value for key, value in expected.items()}, aggregate
+    ranges = frame.groupby('Model Year')['Electric Range'].mean()
+    np.testing.assert_allclose(rollups.range_by_year.set_index('Model Year')['Electric Range'], ranges)
+    top_counties = rollups.county_counts.index[:3]
+    cities = frame[frame['County'].isin(top_counties)].groupby(['County', 'City'], observed=True).size()
+    assert rollups.top_cities['Number of Vehicles'].tolist() == cities.nlargest(10).tolist()
+    top_makes = rollups.make_counts.index[:3]
+    models = frame[frame['Make'].isin(top_makes)].groupby(['Make', 'Model'], observed=True)['Electric Range']
+    np.testing.assert_allclose(rollups.range_by_model['Electric Range'], models.mean().nlargest(10))
+
+
+def test_rollups_rank_ties_by_label(cleaned):
+    cube = cube_for(cleaned)
+    shuffled = cube.sample(frac=1, random_state=1).reset_index(drop=True)
+    first, second = Rollups.from_cube(cube), Rollups.from_cube(shuffled)
+    assert first.county_counts.index.tolist() == second.county_counts.index.tolist()
+    pd.testing.assert_frame_equal(first.top_models, second.top_models)
@@ -0,0 +1,87 @@
+import json
+from urllib.parse import urlencode
+
+import pytest
+from tornado.testing import AsyncHTTPTestCase
+
+from electrapulse.api import Aggregates, make_app, parse_selection
+from electrapulse.filters import Selection
+
+
+def test_parse_selection_normalizes_order():
+    selection = parse_selection({'make': [b'TESLA', b'BMW', b'TESLA'], 'years': [b'2015-2020']})
+    assert selection == Selection(makes=('BMW', 'TESLA'), years=(2015, 2020))
+    assert parse_selection({'years': [b'2019']}).years == (2019, 2019)
+    with pytest.raises(ValueError):
+        parse_selection({'years': [b'soon']})
+
+
+@pytest.fixture(scope='class')
+def data_path(request, registrations_csv):
+    request.cls.path = registrations_csv
+
+
+@pytest.mark.usefixtures('data_path')
+class AggregatesApiTest(AsyncHTTPTestCase):
+
+    def get_app(self):
+        return make_app(Aggregates(self.path, streaming=False))
+
+    def fetch(self, path, **kwargs):
+        # The first request of a selection fits its forecast, which can outlast tornado's 5 s default.
+        return self.io_loop.run_sync(
+            lambda: self.http_client.fetch(self.get_url(path), raise_error=False, **kwargs), timeout=60)
+
+    def fetch_json(self, url, **kwargs):
+        response = self.fetch(url, **kwargs)
+        self.assertEqual(response.code, 200, response.reason)
+        return response, json.loads(response.body)
+
+    def test_unfiltered_aggregates(self):
+        response, body = self.fetch_json('/api/aggregates')
+        self.assertGreater(body['registrations'], 0)
+        self.assertEqual(sum(body['registrations_by_year'].values()), body['registrations'])
+        self.assertIn('forecast', body)
+        self.assertIn('X-Data-Version', response.headers)
+        _, total = self.fetch_json('/api/aggregates/registrations')
+        self.assertEqual(total, body['registrations'])
+
+    def test_filtered_aggregates(self):
+        _, body = self.fetch_json('/api/aggregates?county=King&years=2015-2020')
+        _, county_counts = self.fetch_json('/api/aggregates/county_counts')
+        self.assertEqual(body['county_counts'].keys(), {'King'})
+        self.assertLess(body['registrations'], county_counts['King'])
+
+    def test_empty_selection_is_not_an_error(self):
+        _, body = self.fetch_json('/api/aggregates?county=Nowhere')
+        self.assertEqual(body['registrations'], 0)
+        self.assertIsNone(body['mean_range'])
+        self.assertNotIn('forecast', body)
+        _, mean_range = self.fetch_json('/api/aggregates/mean_range?county=Nowhere')
+        self.assertIsNone(mean_range)
+
+    def test_etag_revalidation(self):
+        response, _ = self.fetch_json('/api/aggregates/make_counts?make=TESLA')
+        revalidated = self.fetch('/api/aggregates/make_counts?make=TESLA',
+                                 headers={'If-None-Match': response.headers['Etag']})
+        self.assertEqual(revalidated.code, 304)
+        other = self.fetch('/api/aggregates/make_counts?make=BMW', headers={'If-None-Match': response.headers['Etag']})
+        self.assertEqual(other.code, 200)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.fetch('/api/aggregates?years=soon').code, 400)
+        self.assertEqual(self.fetch('/api/aggregates/no_such_aggregate').code, 404)
+        self.assertEqual(self.fetch('/api/query?q=SELECT').code, 400)
+        self.assertEqual(self.fetch('/api/query?q=SELECT+sum(Make)').code, 400)
+
+    def test_query(self):
+        _, body = self.fetch_json('/api/query?' + urlencode({'q': "SELECT count(*) AS n WHERE County = 'King'"}))
+        _, county_counts = self.fetch_json('/api/aggregates/county_counts')
+        self.assertEqual(body['columns'], ['n'])
+        self.assertGreaterEqual(body['rows'][0]['n'], county_counts['King'])
+
+    def test_prometheus_metrics(self):
+        self.fetch_json('/api/aggregates/registrations')
+        response = self.fetch('/metrics')
+        self.assertEqual(response.code, 200)
+        self.assertIn(b'electrapulse_api_requests_total', response.body)
@@ -0,0 +1,57 @@
+import threading
+
+from electrapulse import background
+
+
+def test_pending_keys_share_one_future():
+    release = threading.Event()
+    calls = []
+
+    def job(value):
+        calls.append(value)
+        release.wait(5)
+        return value
+
+    first = background.submit(('test', 'dedup'), job, 1)
+    second = background.submit(('test', 'dedup'), job, 2)
+    assert second is first
+    release.set()
+    assert first.result(5) == 1 and calls == [1]
+    # Once done, the key runs again.
+    assert background.submit(('test', 'dedup'), job, 3).result(5) == 3
+
+
+def test_urgent_jobs_do_not_queue_behind_prefetching():
+    release = threading.Event()
+    blocked = background.submit(('test', 'slow'), release.wait, 5)
+    try:
+        assert background.submit(('test', 'urgent'), lambda: 'done', urgent=True).result(5) == 'done'
+        assert not blocked.done()
+    finally:
+        release.set()
+    assert blocked.result(5)
+
+
+def test_prefetch_queue_is_bounded():
+    release = threading.Event()
+    blocker = background.submit(('test', 'blocker'), release.wait, 5)
+    ran = []
+    try:
+        futures = [background.prefetch(('test', 'prefetch', index), ran.append, index)
+                   for index in range(background.MAX_PREFETCH + 4)]
+        assert background.prefetch(('test', 'prefetch', 5), ran.append, 5) is futures[5]
+    finally:
+        release.set()
+    assert blocker.result(5)
+    for future in futures[4:]:
+        future.result(5)
+    # The oldest jobs were dropped to make room for the newest.
+    assert [future.cancelled() for future in futures[:4]] == [True] * 4
+    assert ran == list(range(4, background.MAX_PREFETCH + 4))
+
+
+def test_prefetch_yields_to_queued_computations(monkeypatch):
+    monkeypatch.setattr(background.admission, 'waiting', 1)
+    ran = []
+    assert background.prefetch(('test', 'contended'), ran.append, 1).result(5) is None
+    assert ran == []
@@ -0,0 +1,43 @@
+import pandas as pd
+
+from electrapulse import loader
+from electrapulse.cleaning import DROP, NULL_RULES, clean, clean_dataset
+
+
+def test_drops_only_rows_missing_required_columns(registrations_csv):
+    frame = loader.load_dataset(registrations_csv, columns=None).frame
+    cleaned = clean(frame)
+    required = [name for name, rule in NULL_RULES.items() if rule == DROP]
+    expected = frame.dropna(subset=required).reset_index(drop=True)
+    assert cleaned.rows_dropped == len(frame) - len(expected) > 0
+    # Missing Vehicle Locations are not a reason to drop a row.
+    assert cleaned.frame['Vehicle Location'].isna().any()
+    pd.testing.assert_frame_equal(cleaned.frame.drop(columns='Electric Range'),
+                                  expected.drop(columns='Electric Range'))
+    # With its gaps gone, the range column is narrowed to a NumPy integer.
+    assert cleaned.frame['Electric Range'].dtype == 'int32'
+    assert (cleaned.frame['Electric Range'] == expected['Electric Range']).all()
+
+
+def test_reports_stages_and_null_counts(registrations_csv):
+    frame = loader.load_dataset(registrations_csv).frame
+    cleaned = clean(frame)
+    assert cleaned.null_counts.equals(frame.isnull().sum())
+    assert cleaned.stages[0].rows_in == len(frame)
+    assert cleaned.stages[-1].rows_out == len(cleaned.frame)
+    for before, after in zip(cleaned.stages, cleaned.stages[1:]):
+        assert before.rows_out == after.rows_in
+
+
+def test_input_frame_untouched(registrations_csv):
+    frame = loader.load_dataset(registrations_csv).frame
+    dtypes = frame.dtypes.copy()
+    clean(frame, {'Electric Range': DROP})
+    assert frame.dtypes.equals(dtypes)
+
+
+def test_cached_per_dataset(registrations_csv):
+    dataset = loader.load_dataset(registrations_csv)
+    first = clean_dataset(dataset)
+    assert clean_dataset(dataset) is first
+    assert clean_dataset(dataset, {'County': DROP}) is not first
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from scipy.stats import gaussian_kde
+
+from electrapulse.distribution import RangeDistribution, distribution_for, filtered_distribution
+from electrapulse.filters import Selection, select_positions
+
+
+@pytest.fixture(scope='module')
+def ranges(cleaned):
+    return cleaned.frame['Electric Range'].to_numpy()
+
+
+def test_statistics_match_numpy(cleaned, ranges):
+    distribution = distribution_for(cleaned)
+    assert distribution.total == len(ranges)
+    assert distribution.mean == pytest.approx(ranges.mean())
+    assert distribution.std == pytest.approx(ranges.std())
+    quantiles = [0.01, 0.25, 0.5, 0.75, 0.99]
+    expected = np.quantile(ranges, quantiles, method='inverted_cdf')
+    np.testing.assert_array_equal(distribution.quantile(quantiles), expected)
+    assert distribution.quantile(0.5) == np.median(ranges)
+
+
+def test_histogram_matches_numpy(cleaned, ranges):
+    counts, edges = distribution_for(cleaned).histogram(bins=30)
+    expected_counts, expected_edges = np.histogram(ranges, bins=30)
+    np.testing.assert_allclose(edges, expected_edges)
+    np.testing.assert_array_equal(counts, expected_counts)
+
+
+def test_kde_approximates_scipy(cleaned, ranges):
+    miles, density = distribution_for(cleaned).kde()
+    expected = gaussian_kde(ranges)(miles) * len(ranges)
+    assert miles[0] == ranges.min() and miles[-1] == ranges.max()
+    dense = expected > expected.max() / 100
+    np.testing.assert_allclose(density[dense], expected[dense], rtol=0.1)
+
+
+def test_merge_and_negate():
+    left, right = RangeDistribution.from_ranges([0, 2, 2]), RangeDistribution.from_ranges([2, 5, 5])
+    both = left.merge(right)
+    np.testing.assert_array_equal(both.counts, [1, 0, 3, 0, 0, 2])
+    np.testing.assert_array_equal(both.merge(right.negated()).counts, left.counts)
+
+
+def test_empty_distribution():
+    empty = RangeDistribution.from_ranges([])
+    assert empty.total == 0 and np.isnan(empty.mean) and np.isnan(empty.quantile(0.5))
+    assert np.isnan(empty.quantile([0.25, 0.75])).all()
+    assert len(empty.histogram()[0]) == 0 and len(empty.kde()[0]) == 0
+
+
+def test_filtered_distribution(cleaned, ranges):
+    selection = Selection(makes=('TESLA',))
+    expected = ranges[select_positions(cleaned, selection)]
+    distribution = filtered_distribution(cleaned, selection)
+    assert distribution.total == len(expected) and distribution.mean == pytest.approx(expected.mean())
+    assert filtered_distribution(cleaned, Selection()) is distribution_for(cleaned)
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+
+from electrapulse import charts
+from electrapulse.aggregations import rollups_for
+from electrapulse.figcache import FigureCache, fingerprint
+
+builds = []
+
+
+def line(values, color='C0'):
+    builds.append(values)
+    fig = Figure(figsize=(2, 1))
+    fig.subplots().plot(values, color=color)
+    return fig
+
+
+def test_fingerprint_follows_content():
+    series = pd.Series([3, 1, 2], index=['a', 'b', 'c'], name='count')
+    assert fingerprint(series) == fingerprint(series.copy())
+    assert fingerprint(series) != fingerprint(series.rename('other'))
+    assert fingerprint(series) != fingerprint(series.astype('int32'))
+    assert fingerprint(series) != fingerprint(series.replace(3, 4))
+    assert fingerprint({'b': 1, 'a': np.arange(3)}) == fingerprint({'a': np.arange(3), 'b': 1})
+    assert fingerprint((1, 2)) != fingerprint((12,))
+
+
+def test_hit_skips_build():
+    cache = FigureCache(max_bytes=2 ** 20)
+    builds.clear()
+    first = cache.render(line, [1, 2, 3], dpi=50)
+    assert first.startswith(b'\x89PNG')
+    assert cache.render(line, [1, 2, 3], dpi=50) is first
+    assert (cache.hits, cache.misses, len(builds)) == (1, 1, 1)
+    # Other data or style is another image.
+    cache.render(line, [1, 2, 4], dpi=50)
+    cache.render(line, [1, 2, 3], dpi=50, color='C1')
+    assert (cache.misses, len(cache)) == (3, 3)
+
+
+def test_evicts_least_recently_used():
+    images = [FigureCache().render(line, [0, step], dpi=50) for step in range(3)]
+    cache = FigureCache(max_bytes=max(map(len, images)) * 2)
+    cache.render(line, [0, 0], dpi=50)
+    cache.render(line, [0, 1], dpi=50)
+    cache.render(line, [0, 0], dpi=50)
+    cache.render(line, [0, 2], dpi=50)
+    assert len(cache) == 2 and cache.bytes <= cache.max_bytes
+    builds.clear()
+    cache.render(line, [0, 0], dpi=50)
+    assert builds == []
+    cache.render(line, [0, 1], dpi=50)
+    assert builds == [[0, 1]]
+
+
+def test_images_larger_than_budget_are_not_kept():
+    cache = FigureCache(max_bytes=10)
+    cache.render(line, [1, 2], dpi=50)
+    assert len(cache) == 0 and cache.bytes == 0
+
+
+def test_chart_builders_render(cleaned):
+    cache = FigureCache()
+    image = cache.render(charts.adoption_by_year, rollups_for(cleaned).adoption_by_year, dpi=50)
+    assert image.startswith(b'\x89PNG')
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import sorted_cube
+from electrapulse.aggregations import build_cube, cube_for, rollups_for
+from electrapulse.filters import Selection, filtered_view, select_positions
+from electrapulse.index import index_for
+
+SELECTIONS = [
+    Selection(counties=('King',)),
+    Selection(years=(2015, 2020)),
+    Selection(makes=('TESLA', 'NISSAN'), years=(2018, 2023)),
+    Selection(counties=('King', 'Pierce'), types=('Battery Electric Vehicle (BEV)',)),
+    Selection(cities=('SEATTLE',), makes=('NO SUCH MAKE',)),
+]
+
+
+def expected_mask(frame, selection):
+    mask = np.ones(len(frame), dtype=bool)
+    for field, column in Selection.COLUMNS.items():
+        if getattr(selection, field):
+            mask &= frame[column].isin(getattr(selection, field)).to_numpy()
+    if selection.years is not None:
+        mask &= frame['Model Year'].between(*selection.years).to_numpy()
+    return mask
+
+
+@pytest.mark.parametrize('selection', SELECTIONS)
+def test_filtered_view_matches_mask(cleaned, selection):
+    frame = cleaned.frame
+    mask = expected_mask(frame, selection)
+    np.testing.assert_array_equal(select_positions(cleaned, selection), np.flatnonzero(mask))
+    view = filtered_view(cleaned, selection)
+    assert view.rows == mask.sum()
+    if mask.any():
+        pd.testing.assert_frame_equal(sorted_cube(view.cube), sorted_cube(build_cube(frame[mask])))
+        assert view.rollups.total == mask.sum()
+
+
+@pytest.mark.parametrize('selection', SELECTIONS)
+def test_cube_filter_matches_row_filter(cleaned, selection):
+    view = filtered_view(cleaned, selection)
+    pd.testing.assert_frame_equal(sorted_cube(selection.apply_to_cube(cube_for(cleaned))), sorted_cube(view.cube))
+
+
+def test_empty_selection_is_the_shared_view(cleaned):
+    assert not Selection() and Selection(years=(2010, 2011))
+    assert select_positions(cleaned, Selection()) is None
+    view = filtered_view(cleaned, Selection())
+    assert view.rollups is rollups_for(cleaned) and view.rows == len(cleaned.frame)
+    king = Selection(counties=('King',))
+    assert filtered_view(cleaned, king) is filtered_view(cleaned, king)
+
+
+def test_uses_the_column_indexes(cleaned):
+    positions = select_positions(cleaned, Selection(counties=('Clark',)))
+    np.testing.assert_array_equal(positions, index_for(cleaned, 'County').positions('Clark'))
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from electrapulse.forecasting import MIN_HISTORY, MODELS, fit, forecast_registrations, last_complete_year, refit_all
+
+YEARS = range(2010, 2024)
+
+
+def growing(rate=0.3, start=100):
+    return pd.Series([round(start * np.exp(rate * x)) for x in range(len(YEARS))], index=pd.Index(YEARS))
+
+
+def test_last_complete_year_drops_a_partial_release():
+    counts = growing()
+    assert last_complete_year(counts) == 2023
+    counts.iloc[-1] = counts.iloc[-2] // 3
+    assert last_complete_year(counts) == 2022
+
+
+@pytest.mark.parametrize('counts', [pd.Series(dtype=np.int64), growing().head(MIN_HISTORY - 1)])
+def test_too_little_history_raises(counts):
+    with pytest.raises(RuntimeError):
+        forecast_registrations(counts, resamples=0)
+
+
+@pytest.mark.parametrize('name', list(MODELS))
+def test_models_fit_their_own_curves(name):
+    x = np.arange(len(YEARS), dtype=float)
+    truth = {'exponential': (100, 0.3), 'logistic': (50_000, 0.6, 10), 'bass': (80_000, 0.01, 0.5),
+             'quadratic': (100, 20, 15)}[name]
+    y = MODELS[name][0](x, *truth)
+    params, _ = fit(name, x, y)
+    np.testing.assert_allclose(MODELS[name][0](x, *params), y, rtol=1e-3, atol=1)
+
+
+def test_forecast_follows_exponential_growth():
+    counts = growing()
+    counts.loc[2024] = counts.iloc[-1] // 4
+    forecast = forecast_registrations(counts, horizon=3, resamples=100)
+    # The partial 2024 release is left out of the history.
+    assert list(forecast.values.index) == [2024, 2025, 2026]
+    np.testing.assert_allclose(forecast.values, growing().iloc[-1] * np.exp(0.3 * np.arange(1, 4)), rtol=0.05)
+    assert (forecast.lower <= forecast.values).all() and (forecast.values <= forecast.upper).all()
+    assert forecast.resamples == 100
+    assert forecast_registrations(counts, horizon=3, resamples=100) is forecast
+
+
+def test_refit_all_matches_curve_fit():
+    x = np.arange(len(YEARS), dtype=float)
+    y = growing().to_numpy(dtype=float)
+    params, _ = fit('exponential', x, y)
+    rng = np.random.default_rng(0)
+    samples = np.clip(y + rng.normal(scale=np.sqrt(y) * 5, size=(50, len(y))), 0, None)
+    refits = refit_all(MODELS['exponential'][0], x, samples, params)
+    for sample, refit in zip(samples, refits):
+        expected, _ = fit('exponential', x, sample, p0=params)
+        np.testing.assert_allclose(refit, expected, rtol=1e-4)
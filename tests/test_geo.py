@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from electrapulse.filters import Selection, select_positions
+from electrapulse.geo import HEX_SIZES, Locations, density_bins, hex_bins, location_cells_for, parse_points
+
+
+def test_parse_points():
+    values = pd.Series(['POINT (-122.3 47.6)', None, 'POINT(-117 47.65)', 'not a point', 'POINT (-122.3 47.6)'],
+                       dtype='category')
+    longitude, latitude = parse_points(values)
+    np.testing.assert_array_equal(longitude, np.array([-122.3, np.nan, -117, np.nan, -122.3], dtype=np.float32))
+    np.testing.assert_array_equal(latitude, np.array([47.6, np.nan, 47.65, np.nan, 47.6], dtype=np.float32))
+
+
+def test_locations_count_rows_per_point(cleaned):
+    frame = cleaned.frame
+    locations = location_cells_for(cleaned).locations()
+    expected = frame.groupby(['Longitude', 'Latitude']).size()
+    assert locations.total == frame['Longitude'].notna().sum() == expected.sum()
+    actual = pd.Series(locations.counts, index=pd.MultiIndex.from_arrays([locations.longitude, locations.latitude]))
+    assert actual.sort_index().to_dict() == expected.to_dict()
+
+
+def test_merged_locations_match_whole(cleaned):
+    frame = cleaned.frame
+    whole = Locations.from_points(frame['Longitude'], frame['Latitude'])
+    half = len(frame) // 2
+    merged = Locations.from_points(frame['Longitude'][:half], frame['Latitude'][:half]).merge(
+        Locations.from_points(frame['Longitude'][half:], frame['Latitude'][half:]))
+    assert merged.total == whole.total
+    order = np.lexsort((whole.latitude, whole.longitude))
+    merged_order = np.lexsort((merged.latitude, merged.longitude))
+    np.testing.assert_array_equal(merged.counts[merged_order], whole.counts[order])
+
+
+@pytest.mark.parametrize('size', list(HEX_SIZES.values()))
+def test_hex_bins_keep_every_registration(cleaned, size):
+    locations = location_cells_for(cleaned).locations()
+    bins = hex_bins(locations, size)
+    assert bins['count'].sum() == locations.total
+    assert not bins[['longitude', 'latitude']].duplicated().any()
+    # Every hexagon centre lies near Washington.
+    assert bins['longitude'].between(-125, -116).all() and bins['latitude'].between(45, 50).all()
+
+
+def test_point_falls_in_nearest_hexagon():
+    bins = hex_bins(Locations(np.array([-122.3], np.float32), np.array([47.6], np.float32), np.array([3])), 4_000)
+    assert bins['count'].tolist() == [3]
+    assert abs(bins['longitude'][0] + 122.3) < 0.07 and abs(bins['latitude'][0] - 47.6) < 0.04
+
+
+def test_filtered_density(cleaned):
+    selection = Selection(counties=('King',))
+    bins = density_bins(cleaned, selection, HEX_SIZES['County'])
+    assert bins['count'].sum() == cleaned.frame['Longitude'][select_positions(cleaned, selection)].notna().sum()
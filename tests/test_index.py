@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from electrapulse.index import SegmentIndex, index_for
+
+
+@pytest.mark.parametrize('column', ['Model Year', 'County', 'Make', 'Electric Vehicle Type'])
+def test_matches_pandas_groups(cleaned, column):
+    series = cleaned.frame[column]
+    index = index_for(cleaned, column)
+    expected = series.value_counts().loc[lambda counts: counts > 0].sort_index()
+    assert list(index.keys) == list(expected.index)
+    assert index.counts().tolist() == expected.tolist()
+    for key in expected.index:
+        positions = np.flatnonzero((series == key).to_numpy())
+        np.testing.assert_array_equal(index.positions(key), positions)
+        assert index.count(key) == len(positions)
+    pd.testing.assert_frame_equal(index.take(cleaned.frame, expected.index[0]),
+                                  cleaned.frame[series == expected.index[0]])
+
+
+def test_range_lookup(cleaned):
+    years = cleaned.frame['Model Year'].to_numpy()
+    index = index_for(cleaned, 'Model Year')
+    positions = index.positions_between(2015, 2020)
+    np.testing.assert_array_equal(np.sort(positions), np.flatnonzero((years >= 2015) & (years <= 2020)))
+    assert len(index.positions_between(1900, 1950)) == 0
+
+
+def test_missing_values_and_unknown_keys():
+    index = SegmentIndex.build(pd.Series(['b', None, 'a', 'b', None, 'c'], name='letter'))
+    assert list(index.keys) == ['a', 'b', 'c']
+    assert index.offsets.tolist() == [0, 1, 3, 4]
+    np.testing.assert_array_equal(index.positions('b'), [0, 3])
+    assert 'z' not in index and index.count('z') == 0
+    assert len(index.positions('z')) == 0
+
+
+def test_built_once_per_dataset(cleaned):
+    assert index_for(cleaned, 'County') is index_for(cleaned, 'County')
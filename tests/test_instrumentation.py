@@ -0,0 +1,93 @@
+import re
+import time
+import tracemalloc
+
+import pytest
+
+from electrapulse import instrumentation, settings
+from electrapulse.instrumentation import SPAN_METRICS, count, metrics, sent, span, span_table, timed, to_prometheus
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_spans_record_time_and_payload():
+    with span('outer', memory=False):
+        with span('inner'):
+            sent(100)
+            time.sleep(0.01)
+        sent(5)
+    run = span('outer', memory=False).start()
+    run.end()
+    run.end()
+    spans = metrics.snapshot()['spans']
+    assert spans['outer']['calls'] == 2 and spans['inner']['calls'] == 1
+    assert spans['inner']['payload_bytes'] == 100 and spans['outer']['payload_bytes'] == 5
+    assert spans['outer']['wall_seconds'] >= spans['inner']['wall_seconds'] >= 0.01
+    assert spans['outer']['max_wall_seconds'] >= 0.01
+    assert spans['inner']['memory_samples'] == 0
+
+
+def test_spans_trace_memory_one_at_a_time(monkeypatch):
+    monkeypatch.setattr(settings, 'TRACE_MEMORY', True)
+    try:
+        with span('allocating'):
+            with span('nested'):
+                block = bytearray(2 ** 20)
+            del block
+    finally:
+        tracemalloc.stop()
+    spans = metrics.snapshot()['spans']
+    assert spans['allocating']['memory_samples'] == 1 and spans['allocating']['peak_bytes'] >= 2 ** 20
+    assert spans['nested']['memory_samples'] == 0
+
+
+def test_timed_and_counters(monkeypatch):
+    assert timed('double', lambda value: 2 * value)(4) == 8
+    count('reruns')
+    count('reruns', 2)
+    snapshot = metrics.snapshot()
+    assert snapshot['spans']['double']['calls'] == 1
+    assert snapshot['counters']['reruns'] == 3
+    assert 'figure_cache_hits' in snapshot['counters'] and 'figure_cache_bytes' in snapshot['gauges']
+    monkeypatch.setattr(settings, 'INSTRUMENT', False)
+    with span('off'):
+        count('reruns')
+    assert 'off' not in metrics.snapshot()['spans'] and metrics.snapshot()['counters']['reruns'] == 3
+
+
+def test_prometheus_text():
+    with span('section "Range"'):
+        pass
+    count('sessions')
+    text = to_prometheus(metrics.snapshot())
+    assert text.endswith('\n')
+    samples = {}
+    for line in text.splitlines():
+        if line.startswith('#'):
+            assert re.fullmatch(r'# (HELP|TYPE) electrapulse_\w+ .+', line)
+            continue
+        name, value = line.rsplit(' ', 1)
+        samples[name] = float(value)
+    assert samples['electrapulse_sessions_total'] == 1
+    assert samples['electrapulse_span_calls_total{span="section \\"Range\\""}'] == 1
+    for metric, kind, _ in SPAN_METRICS.values():
+        assert f'# TYPE {metric} {kind}' in text
+
+
+def test_span_table_and_metrics_file(tmp_path):
+    assert span_table(metrics.snapshot()).empty
+    for name in ('fast', 'slow', 'slow'):
+        with span(name):
+            time.sleep(0.01 if name == 'slow' else 0)
+    table = span_table(metrics.snapshot())
+    assert list(table.index) == ['slow', 'fast']
+    assert table.loc['slow', 'mean_wall_ms'] == pytest.approx(table.loc['slow', 'wall_seconds'] / 2 * 1000)
+    path = str(tmp_path / 'metrics.prom')
+    instrumentation.write_metrics(path)
+    with open(path) as file:
+        assert 'electrapulse_span_calls_total{span="slow"} 2' in file.read()
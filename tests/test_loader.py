@@ -0,0 +1,75 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from electrapulse import loader
+from electrapulse.schema import DERIVED
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    loader.clear_cache()
+    yield
+    loader.clear_cache()
+
+
+def values(column):
+    return [None if pd.isna(value) else value for value in column.astype(object)]
+
+
+def test_dtypes_follow_schema(registrations_csv):
+    frame = loader.load_dataset(registrations_csv, columns=None).frame
+    assert list(frame.columns) == list(loader.SCHEMA) + list(DERIVED)
+    for name, kind in loader.SCHEMA.items():
+        if kind == 'category':
+            assert isinstance(frame[name].dtype, pd.CategoricalDtype), name
+    # Integer columns without missing values are narrowed to NumPy integers.
+    assert frame['Model Year'].dtype == 'int16'
+    assert frame['DOL Vehicle ID'].dtype == 'int64'
+    assert frame['Electric Range'].dtype == 'Int32'
+    assert frame['Electric Range'].isna().any()
+
+
+def test_values_match_plain_read(registrations_csv):
+    frame = loader.load_dataset(registrations_csv).frame
+    columns = [name for name in loader.ANALYSIS_COLUMNS if name not in DERIVED]
+    expected = pd.read_csv(registrations_csv, usecols=columns)
+    assert list(frame.columns) == list(expected.columns) + list(DERIVED)
+    for name in expected.columns:
+        assert values(frame[name]) == values(expected[name]), name
+
+
+def test_parses_vehicle_locations(registrations_csv):
+    frame = loader.load_dataset(registrations_csv, columns=['Vehicle Location', 'Longitude', 'Latitude']).frame
+    located = frame['Vehicle Location'].notna()
+    assert (frame['Longitude'].isna() == ~located).all()
+    points = frame.loc[located, 'Vehicle Location'].astype(str)
+    expected = points.str.extract(r'POINT \((\S+) (\S+)\)').astype('float32')
+    np.testing.assert_array_equal(frame.loc[located, 'Longitude'], expected[0])
+    np.testing.assert_array_equal(frame.loc[located, 'Latitude'], expected[1])
+    # Derived columns alone do not keep their source column.
+    assert list(loader.load_dataset(registrations_csv, columns=['Longitude']).frame.columns) == ['Longitude']
+
+
+def test_cached_per_path_and_columns(registrations_csv):
+    first = loader.load_dataset(registrations_csv)
+    assert loader.load_dataset(os.path.relpath(registrations_csv)) is first
+    subset = loader.load_dataset(registrations_csv, columns=['County', 'Model Year'])
+    assert subset is not first
+    assert list(subset.frame.columns) == ['County', 'Model Year']
+    assert first.rows == subset.rows
+
+
+def test_reparses_changed_file(registrations_csv, tmp_path):
+    path = tmp_path / 'copy.csv'
+    shutil.copy(registrations_csv, path)
+    first = loader.load_dataset(path)
+    frame = pd.read_csv(path)
+    frame.iloc[:100].to_csv(path, index=False)
+    second = loader.load_dataset(path)
+    assert second is not first
+    assert second.version == loader.file_version(path)
+    assert second.rows == 100
@@ -0,0 +1,104 @@
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from electrapulse.memo import LRUCache, OwnedCache, derived
+from electrapulse.memory import Admission, MemoryBudget, sizeof
+
+
+@dataclass(eq=False)
+class Owner:
+    name: str
+
+
+def test_sizeof_finds_arrays_and_frames():
+    array = np.zeros(1000)
+    frame = pd.DataFrame({'a': np.arange(100, dtype=np.int64)})
+    assert sizeof(array) == 8000
+    assert sizeof(frame) == frame.memory_usage(index=True, deep=True).sum()
+    assert sizeof(b'abc') == 3 and sizeof(None) == 0 and sizeof(7) == 0
+    # An array reached twice counts once.
+    assert 16000 <= sizeof({'x': array, 'y': array, 'z': np.zeros(1000)}) < 17000
+    assert sizeof(Owner('x')) < 1000
+
+
+def test_budget_evicts_cheapest_caches_least_recently_used_first():
+    budget = MemoryBudget(max_bytes=20_000)
+    cheap, costly = LRUCache(10), LRUCache(10)
+    budget.register('cheap', cheap.nbytes, cheap.evict, priority=0)
+    budget.register('costly', costly.nbytes, costly.evict, priority=1)
+    pinned = [np.zeros(500)]
+    budget.register('pinned', lambda: sum(map(sizeof, pinned)))
+    for key in 'abc':
+        cheap.get_or_compute(key, lambda: np.zeros(1000))
+    costly.get_or_compute('x', lambda: np.zeros(1000))
+    cheap.get_or_compute('a', lambda: pytest.fail('cached'))
+    assert budget.usage() == {'cheap': 24_000, 'costly': 8000, 'pinned': 4000}
+
+    assert budget.enforce() == 16_000 and budget.evictions == 2
+    assert budget.used == 20_000
+    # 'b' and 'c' went; 'a' was used more recently.
+    assert cheap.get_or_compute('a', lambda: None) is not None
+    assert cheap.get_or_compute('b', lambda: 'recomputed') == 'recomputed'
+    # Once the cheap cache is empty the next one is evicted; the pinned one never is.
+    budget.max_bytes = 1
+    budget.enforce()
+    assert budget.usage() == {'cheap': 0, 'costly': 0, 'pinned': 4000}
+    assert MemoryBudget(max_bytes=0).enforce() == 0
+
+
+def test_owned_cache_keeps_values_per_owner():
+    cache = OwnedCache('test.owned', maxsize=2)
+    first, second = Owner('first'), Owner('second')
+    values = [cache.get_or_compute(first, key, lambda: np.zeros(10)) for key in range(3)]
+    assert cache.get_or_compute(first, 2, lambda: pytest.fail('cached')) is values[2]
+    assert cache.get_or_compute(first, 0, lambda: 'recomputed') == 'recomputed'
+    cache.get_or_compute(second, 0, lambda: np.zeros(10))
+    assert cache.nbytes() == 2 * 80
+    assert cache.evict() == 80
+    # Shared values cannot be modified in place.
+    with pytest.raises(ValueError):
+        values[2][0] = 1
+    del first
+    assert cache.nbytes() == 80
+
+
+def test_derived_values_go_with_their_owner():
+    calls = []
+
+    @derived(maxsize=4)
+    def doubled(owner, value):
+        calls.append(value)
+        return 2 * value
+
+    owner = Owner('owner')
+    assert doubled(owner, 2) == doubled(owner, 2) == 4 and calls == [2]
+    assert doubled(Owner('other'), 2) == 4 and calls == [2, 2]
+    doubled.cache_clear()
+    assert doubled(owner, 2) == 4 and calls == [2, 2, 2]
+
+
+def test_admission_queues_computations_beyond_its_slots():
+    admission = Admission(slots=1)
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def compute():
+        with admission:
+            with admission:  # Nested on one thread: the same slot.
+                with lock:
+                    running[0] += 1
+                    peak[0] = max(peak[0], running[0])
+                time.sleep(0.02)
+                with lock:
+                    running[0] -= 1
+
+    threads = [threading.Thread(target=compute) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert peak[0] == 1 and admission.waiting == 0
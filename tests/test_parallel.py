@@ -0,0 +1,34 @@
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from conftest import sorted_cube
+from electrapulse import snapshot
+from electrapulse.aggregations import Cells
+from electrapulse.parallel import build_cells, partitions, stream_partials_parallel
+from electrapulse.streaming import stream_partials
+
+
+def test_partitions_cover_every_row():
+    assert partitions(10, 3) == [(0, 3), (3, 6), (6, 10)]
+    assert partitions(2, 4) == [(0, 1), (1, 2)]
+    assert partitions(0, 2) == []
+
+
+def test_cells_match_serial(cleaned):
+    frame = cleaned.frame
+    serial, parallel = Cells.build(frame), build_cells(frame, parts=3)
+    np.testing.assert_array_equal(parallel.ids, serial.ids)
+    pd.testing.assert_frame_equal(parallel.keys, serial.keys)
+    pd.testing.assert_frame_equal(parallel.cube(), serial.cube())
+
+
+def test_streamed_partials_match_serial(registrations_csv, tmp_path):
+    path = str(shutil.copy2(registrations_csv, tmp_path / 'registrations.csv'))
+    snapshot.compile_snapshot(path)
+    serial, parallel = stream_partials(path, 700), stream_partials_parallel(path, 700, parts=3)
+    pd.testing.assert_frame_equal(sorted_cube(parallel.cube), sorted_cube(serial.cube))
+    np.testing.assert_array_equal(parallel.ranges.counts, serial.ranges.counts)
+    np.testing.assert_array_equal(parallel.locations.counts, serial.locations.counts)
+    assert parallel.rows_read == serial.rows_read and parallel.rows_dropped == serial.rows_dropped
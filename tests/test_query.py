@@ -0,0 +1,111 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from electrapulse import query, snapshot
+from electrapulse.loader import load_dataset
+from electrapulse.query import QueryError, parse, run_query
+
+
+@pytest.fixture(scope='module', params=['csv', 'snapshot'])
+def data_path(request, registrations_csv, tmp_path_factory):
+    path = str(shutil.copy2(registrations_csv, tmp_path_factory.mktemp('query') / 'registrations.csv'))
+    if request.param == 'snapshot':
+        snapshot.compile_snapshot(path)
+    return path
+
+
+@pytest.fixture(scope='module')
+def frame(data_path):
+    return load_dataset(data_path, columns=None).frame
+
+
+def test_grouped_aggregates_match_pandas(data_path, frame):
+    result = run_query('SELECT County, Make, count(*) AS vehicles, mean("Electric Range") AS range, '
+                       'max("Model Year") AS newest WHERE "Model Year" >= 2015 GROUP BY County, Make',
+                       data_path).to_frame()
+    rows = frame[frame['Model Year'] >= 2015]
+    grouped = rows.groupby(['County', 'Make'], observed=True)
+    expected = pd.DataFrame({'vehicles': grouped.size(), 'range': grouped['Electric Range'].mean(),
+                             'newest': grouped['Model Year'].max()}).reset_index()
+    # Rows with a missing County form their own group in the query, as in SQL.
+    missing = rows[rows['County'].isna()]
+    assert result['County'].isna().sum() == missing['Make'].nunique()
+    result = result.dropna(subset=['County']).reset_index(drop=True)
+    assert result[['County', 'Make']].values.tolist() == expected[['County', 'Make']].astype(str).values.tolist()
+    np.testing.assert_array_equal(result['vehicles'], expected['vehicles'])
+    np.testing.assert_allclose(result['range'], expected['range'].astype(float))
+    np.testing.assert_array_equal(result['newest'], expected['newest'])
+
+
+def test_top_k_and_row_listing(data_path, frame):
+    top = run_query('SELECT Make, count(*) AS n ORDER BY n DESC LIMIT 3', data_path).to_frame()
+    assert top['n'].tolist() == frame['Make'].value_counts().head(3).tolist()
+    rows = run_query("SELECT \"DOL Vehicle ID\", City WHERE City IN ('SEATTLE', 'TACOMA') LIMIT 50", data_path)
+    assert len(rows.table) == 50 and set(rows.to_frame()['City']) <= {'SEATTLE', 'TACOMA'}
+
+
+def test_like_on_dictionary_columns(data_path, frame):
+    result = run_query("SELECT City, count(*) AS n WHERE City LIKE '%VUE' OR Make LIKE 'TES_A' GROUP BY City",
+                       data_path).to_frame()
+    mask = frame['City'].astype(str).str.endswith('VUE') | (frame['Make'] == 'TESLA')
+    expected = frame[mask].groupby('City', observed=True, dropna=False).size()
+    assert dict(zip(result['City'], result['n'])) == expected.to_dict()
+    negated = run_query("SELECT count(*) AS n WHERE Make NOT LIKE 'TES%'", data_path).to_frame()
+    assert negated['n'][0] == (frame['Make'] != 'TESLA').sum()
+
+
+def test_empty_aggregate_is_null(data_path):
+    result = run_query("SELECT count(*) AS n, mean(\"Electric Range\") AS range WHERE County = 'Nowhere'", data_path)
+    assert result.table.to_pylist() == [{'n': 0, 'range': None}]
+
+
+@pytest.mark.parametrize('text', [
+    "SELECT count(*) WHERE \"Model Year\" = 'recent'",
+    'SELECT count(*) WHERE County > 3',
+    'SELECT sum(Make)',
+    "SELECT count(*) WHERE \"Electric Range\" LIKE '2%'",
+    'SELECT count(*) WHERE County = NULL',
+])
+def test_type_errors_are_query_errors(data_path, text):
+    with pytest.raises(QueryError):
+        run_query(text, data_path)
+
+
+@pytest.mark.parametrize('text', [
+    'SELECT Make, Make',
+    'SELECT count(*) AS n, mean("Electric Range") AS n',
+    'SELECT Make, count(*) AS n ORDER BY County',
+    'SELECT Make FROM vehicles',
+    'SELECT "No Such Column"',
+    'SELECT',
+])
+def test_malformed_queries(data_path, text):
+    with pytest.raises(QueryError):
+        run_query(text, data_path)
+
+
+def test_normalized_text_shares_results(data_path):
+    first = run_query("select make, COUNT(*) as n where county in ('King') group by make", data_path)
+    second = run_query("SELECT Make, count(*) AS n WHERE County IN ('King')", data_path)
+    assert parse(first.query).text() == first.query == second.query
+    assert second is first
+
+
+def test_source_is_the_mapped_snapshot(registrations_csv, tmp_path, monkeypatch):
+    monkeypatch.setattr(query, '_sources', {})
+    path = str(shutil.copy2(registrations_csv, tmp_path / 'registrations.csv'))
+    version, table = query.source_table(path)
+    # A CSV without a snapshot gets one compiled, rather than a resident copy of its rows.
+    assert snapshot.is_fresh(path)
+    assert query.source_table(path) == (version, table)
+    monkeypatch.setattr(query.settings, 'STREAMING', True)
+    assert query._evict_source() == 0 and path not in query._sources
+    assert query.source_table(path)[1].equals(table)
+    os.remove(snapshot.snapshot_path(path))
+    query._evict_source()
+    with pytest.raises(QueryError, match='streaming'):
+        query.source_table(path)
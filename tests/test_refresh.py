@@ -0,0 +1,59 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import sorted_cube
+from electrapulse import loader, snapshot, streaming, synthetic
+from electrapulse.refresh import diff, refresh
+from electrapulse.streaming import load_partials, partials_path, read_partials, stream_partials
+
+SEED = 5
+
+
+@pytest.fixture
+def data_path(tmp_path):
+    return synthetic.write_csv(str(tmp_path / 'registrations.csv'), 10_000, seed=SEED)
+
+
+def test_diff_classifies_rows():
+    previous = pd.DataFrame({'DOL Vehicle ID': [1, 2, 3, 4], 'City': ['A', 'B', 'C', 'D'], 'Make': list('wxyz')})
+    release = pd.DataFrame({'DOL Vehicle ID': [4, 2, 5, 1], 'City': ['D', 'Q', 'E', 'A'], 'Make': list('zxvw')})
+    delta = diff(previous, release, columns=('City', 'Make'))
+    assert delta.inserted.tolist() == [2]
+    assert delta.removed.tolist() == [2]
+    assert (delta.changed.tolist(), delta.previous.tolist()) == ([1], [1])
+    assert delta.churn == 3
+    with pytest.raises(ValueError):
+        diff(previous, release.assign(**{'DOL Vehicle ID': [4, 4, 5, 1]}))
+
+
+def test_refresh_matches_full_restream(data_path, tmp_path):
+    release = synthetic.write_release(str(tmp_path / 'release.csv'), data_path, churn=0.02, seed=SEED)
+    delta, partials = refresh(release, data_path)
+    expected = stream_partials(release)
+
+    assert len(delta.inserted) and len(delta.removed) and len(delta.changed)
+    pd.testing.assert_frame_equal(sorted_cube(partials.cube), sorted_cube(expected.cube), check_dtype=False)
+    np.testing.assert_array_equal(partials.ranges.counts, expected.ranges.counts)
+    assert partials.locations.total == expected.locations.total
+    assert partials.rows_read == expected.rows_read
+
+    # The CSV, its snapshot and the persisted partials now all describe the release.
+    with open(data_path, 'rb') as current, open(release, 'rb') as published:
+        assert current.read() == published.read()
+    assert snapshot.is_fresh(data_path)
+    persisted = read_partials(data_path, loader.file_version(data_path))
+    pd.testing.assert_frame_equal(sorted_cube(persisted.cube), sorted_cube(partials.cube))
+
+
+def test_partials_persist_across_restarts(data_path):
+    streamed = load_partials(data_path)
+    assert streamed.source == 'stream' and os.path.exists(partials_path(data_path))
+    streaming._cache.clear()
+    restored = load_partials(data_path)
+    assert restored.source == 'persisted'
+    pd.testing.assert_frame_equal(restored.cube, streamed.cube)
+    # Partials of another data version are ignored.
+    assert read_partials(data_path, (0, 0)) is None
@@ -0,0 +1,31 @@
+import json
+import os
+
+from electrapulse.analysis import analyze
+from electrapulse.report import generate_report, main
+
+
+def test_writes_every_chart_and_metric(registrations_csv, cleaned, tmp_path):
+    manifest = generate_report(str(tmp_path), registrations_csv, formats=('png',), dpi=30, streaming=False)
+    analysis = analyze(cleaned)
+    forecast = analysis.forecast()
+    assert list(manifest['figures']) == list(analysis.figures(forecast))
+    for name, files in manifest['figures'].items():
+        assert files == [f'{name}.png']
+        with open(tmp_path / files[0], 'rb') as image:
+            assert image.read(4) == b'\x89PNG'
+    with open(tmp_path / 'metrics.json') as stream:
+        metrics = json.load(stream)
+    expected = json.loads(json.dumps(analysis.metrics(forecast), default=str))
+    assert metrics == expected
+    with open(tmp_path / 'report.json') as stream:
+        assert json.load(stream)['registrations'] == len(cleaned.frame)
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.partial')]
+
+
+def test_streamed_report_matches_in_memory(registrations_csv, tmp_path):
+    main([str(tmp_path / 'rows'), '--csv', registrations_csv, '--format', 'svg', '--dpi', '30'])
+    main([str(tmp_path / 'streamed'), '--csv', registrations_csv, '--format', 'svg', '--dpi', '30', '--streaming'])
+    with open(tmp_path / 'rows' / 'metrics.json') as rows, open(tmp_path / 'streamed' / 'metrics.json') as streamed:
+        assert json.load(rows) == json.load(streamed)
+    assert os.path.exists(tmp_path / 'streamed' / 'range_distribution.svg')
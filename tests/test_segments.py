@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from electrapulse.aggregations import cube_for
+from electrapulse.segments import LOG_LINEAR, NAIVE, fit_log_linear, forecast_segments, year_matrix
+
+
+@pytest.mark.parametrize('by', ['County', 'Make'])
+def test_year_matrix_matches_pivot(cleaned, by):
+    frame = cleaned.frame
+    expected = frame.pivot_table(index=by, columns='Model Year', values='Electric Range', aggfunc='size',
+                                 fill_value=0, observed=True)
+    expected = expected.reindex(columns=range(frame['Model Year'].min(), frame['Model Year'].max() + 1),
+                                fill_value=0)
+    matrix = year_matrix(cube_for(cleaned), by)
+    np.testing.assert_array_equal(matrix.to_numpy(), expected.to_numpy())
+    assert list(matrix.index) == list(expected.index.astype(str))
+    assert list(matrix.columns) == list(expected.columns)
+
+
+def test_log_linear_matches_weighted_polyfit(cleaned):
+    matrix = year_matrix(cube_for(cleaned), 'City')
+    counts = matrix.to_numpy()
+    x = np.arange(counts.shape[1], dtype=float)
+    intercept, rate, points, r2 = fit_log_linear(x, counts)
+    for row in range(len(counts)):
+        registered = counts[row] > 0
+        assert points[row] == registered.sum()
+        # np.polyfit weights multiply the residuals, so pass the square root of the count.
+        slope, offset = np.polyfit(x[registered], np.log(counts[row, registered]), 1,
+                                   w=np.sqrt(counts[row, registered]))
+        assert rate[row] == pytest.approx(slope) and intercept[row] == pytest.approx(offset)
+        assert 0 <= r2[row] <= 1
+
+
+def test_short_series_get_the_naive_forecast():
+    intercept, rate, points, r2 = fit_log_linear(np.arange(4.0), np.array([[0, 0, 5, 0]]))
+    assert points[0] == 1 and np.isnan(rate[0]) and np.isnan(r2[0])
+    cube = pd.DataFrame({
+        'Make': ['NEW'] * 2 + ['OLD'] * 6,
+        'Model Year': [2022, 2023] + list(range(2018, 2024)),
+        'count': [10, 20] + [round(50 * 1.4 ** step) for step in range(6)],
+    })
+    result = forecast_segments(cube, 'Make', horizon=2, complete_through=2023)
+    diagnostics = result.diagnostics
+    assert diagnostics.loc['NEW', 'Method'] == NAIVE
+    assert diagnostics.loc['OLD', 'Method'] == LOG_LINEAR
+    assert diagnostics.loc['OLD', 'Growth Rate'] == pytest.approx(0.4, abs=0.01)
+    assert list(diagnostics['Last Year Count']) == [20, round(50 * 1.4 ** 5)]
+    table = result.table()
+    assert table.loc['NEW', 2024] == table.loc['NEW', 2025] == pytest.approx(10)
+    assert table.loc['OLD', 2024] == pytest.approx(50 * 1.4 ** 6, rel=0.02)
+
+
+def test_every_segment_forecast_once(cleaned):
+    cube = cube_for(cleaned)
+    result = forecast_segments(cube, 'County', horizon=3)
+    assert set(result.diagnostics.index) == set(cube['County'])
+    assert len(result.forecasts) == 3 * len(result.diagnostics)
+    assert (result.forecasts['Forecast'] >= 0).all()
+    assert forecast_segments(cube, 'County', horizon=3) is result
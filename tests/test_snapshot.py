@@ -0,0 +1,65 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from electrapulse import loader, snapshot
+from electrapulse.schema import ANALYSIS_COLUMNS, add_derived, narrow_integers, read_csv
+
+
+@pytest.fixture
+def csv_path(registrations_csv, tmp_path):
+    path = tmp_path / 'registrations.csv'
+    shutil.copy(registrations_csv, path)
+    loader.clear_cache()
+    yield str(path)
+    loader.clear_cache()
+
+
+def test_round_trip_matches_csv(csv_path):
+    path = snapshot.compile_snapshot(csv_path)
+    assert path == snapshot.snapshot_path(csv_path)
+    expected = narrow_integers(add_derived(read_csv(csv_path)))
+    pd.testing.assert_frame_equal(snapshot.read_snapshot(path), expected)
+    pd.testing.assert_frame_equal(snapshot.read_snapshot(path, ANALYSIS_COLUMNS),
+                                  narrow_integers(add_derived(read_csv(csv_path, ANALYSIS_COLUMNS), ANALYSIS_COLUMNS)))
+
+
+def test_only_complete_numbers_stay_mapped(csv_path):
+    table = snapshot.read_table(snapshot.compile_snapshot(csv_path))
+    frame = snapshot.to_frame(table)
+
+    def mapped(name):
+        address = table.column(name).chunk(0).buffers()[1].address
+        return np.asarray(frame[name]).ctypes.data == address
+
+    assert mapped('Model Year') and mapped('DOL Vehicle ID')
+    assert frame['Electric Range'].hasnans and not mapped('Electric Range')
+
+
+def test_freshness_follows_csv(csv_path):
+    assert not snapshot.is_fresh(csv_path)
+    snapshot.compile_snapshot(csv_path)
+    assert snapshot.is_fresh(csv_path)
+    stat = os.stat(csv_path)
+    assert snapshot.source_version(snapshot.snapshot_path(csv_path)) == (stat.st_mtime_ns, stat.st_size)
+    with open(csv_path, 'a') as stream:
+        stream.write(open(csv_path).read().splitlines()[1] + '\n')
+    assert not snapshot.is_fresh(csv_path)
+
+
+def test_loader_prefers_fresh_snapshot(csv_path):
+    assert loader.load_dataset(csv_path).source == 'csv'
+    snapshot.compile_snapshot(csv_path)
+    loader.clear_cache()
+    from_snapshot = loader.load_dataset(csv_path)
+    assert from_snapshot.source == 'snapshot'
+    # A snapshot deployed without its CSV still loads, under the recorded version.
+    version = from_snapshot.version
+    os.remove(csv_path)
+    loader.clear_cache()
+    alone = loader.load_dataset(csv_path)
+    assert alone.source == 'snapshot' and alone.version == version
+    pd.testing.assert_frame_equal(alone.frame, from_snapshot.frame)
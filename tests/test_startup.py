@@ -0,0 +1,24 @@
+from electrapulse.startup import DEFERRED, ImportTime, measure, startup_imports, summarize
+
+
+def test_startup_imports_are_top_level_only(tmp_path):
+    script = tmp_path / 'app.py'
+    script.write_text('import os\nfrom json import dumps as d\n\ndef later():\n    import csv\n')
+    assert startup_imports(str(script)) == ['import os', 'from json import dumps as d']
+
+
+def test_measure_and_summarize():
+    timings = measure(['import json'])
+    assert 'json' in [timing.module for timing in timings]
+    assert all(timing.cumulative_us >= timing.self_us >= 0 for timing in timings)
+    report = summarize([ImportTime('pandas', 300, 900, 0), ImportTime('pandas.core', 600, 600, 1),
+                        ImportTime('scipy', 100, 100, 0)], top=2)
+    assert report['seconds'] == 0.001 and report['modules'] == 3
+    assert [row['module'] for row in report['slowest_modules']] == ['pandas.core', 'pandas']
+    assert report['packages'] == {'pandas': 0.9, 'scipy': 0.1}
+    assert report['deferred_imported'] == ['scipy']
+
+
+def test_dashboard_start_up_defers_chart_libraries():
+    timings = measure(startup_imports())
+    assert not {timing.package for timing in timings} & set(DEFERRED)
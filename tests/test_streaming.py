@@ -0,0 +1,48 @@
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import sorted_cube
+from electrapulse import snapshot
+from electrapulse.aggregations import cube_for
+from electrapulse.distribution import distribution_for
+from electrapulse.streaming import load_partials, stream_partials
+
+
+def assert_partials_match(partials, cleaned):
+    pd.testing.assert_frame_equal(sorted_cube(partials.cube), sorted_cube(cube_for(cleaned)), check_dtype=False)
+    np.testing.assert_array_equal(partials.ranges.counts, distribution_for(cleaned).counts)
+    assert partials.locations.total == cleaned.frame['Longitude'].notna().sum()
+    assert partials.rows_read - partials.rows_dropped == len(cleaned.frame)
+
+
+@pytest.mark.parametrize('chunk_rows', [700, 1_000_000])
+def test_streamed_csv_matches_in_memory(registrations_csv, cleaned, chunk_rows):
+    partials = stream_partials(registrations_csv, chunk_rows)
+    assert partials.chunks == -(-partials.rows_read // chunk_rows)
+    assert_partials_match(partials, cleaned)
+
+
+def test_streamed_snapshot_matches_in_memory(registrations_csv, cleaned, tmp_path):
+    path = str(shutil.copy2(registrations_csv, tmp_path / 'registrations.csv'))
+    snapshot.compile_snapshot(path)
+    assert snapshot.is_fresh(path)
+    assert_partials_match(stream_partials(path, 700), cleaned)
+
+
+def test_streamed_rollups_match_in_memory(registrations_csv, cleaned):
+    streamed = stream_partials(registrations_csv, 700).rollups()
+    in_memory = cleaned.frame
+    assert streamed.total == len(in_memory)
+    assert streamed.mean_range == pytest.approx(in_memory['Electric Range'].mean())
+    assert streamed.county_counts.to_dict() == in_memory['County'].value_counts().loc[lambda c: c > 0].to_dict()
+
+
+def test_cached_per_file_version(registrations_csv, tmp_path):
+    path = str(shutil.copy2(registrations_csv, tmp_path / 'registrations.csv'))
+    first = load_partials(path, 700)
+    assert load_partials(path, 700) is first
+    pd.read_csv(path).iloc[:100].to_csv(path, index=False)
+    assert load_partials(path, 700).rows_read == 100
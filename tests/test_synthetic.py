@@ -0,0 +1,48 @@
+import pandas as pd
+
+from electrapulse import synthetic
+from electrapulse.benchmark import NOISE_SECONDS, regressions
+from electrapulse.loader import load_dataset
+from electrapulse.schema import ANALYSIS_COLUMNS, source_columns
+
+
+def test_shape_and_relationships():
+    frame = synthetic.generate(50_000, seed=3)
+    assert set(frame.columns) == set(source_columns(ANALYSIS_COLUMNS)) | {'DOL Vehicle ID'}
+    assert frame['DOL Vehicle ID'].is_unique
+    assert len(frame) == 50_000
+    assert frame['Model Year'].between(synthetic.FIRST_YEAR, synthetic.LAST_YEAR).all()
+    assert frame['County'].nunique() > 30 and frame['City'].nunique() > 300 and frame['Model'].nunique() > 100
+    # Cities belong to one county, models to one make and one type.
+    complete = frame.dropna()
+    assert (complete.groupby('City', observed=True)['County'].nunique() == 1).all()
+    assert (complete.groupby('Model', observed=True)['Make'].nunique() == 1).all()
+    assert (complete.groupby('Model', observed=True)['Electric Vehicle Type'].nunique() == 1).all()
+    # Registrations grow, and the newest year is a partial release.
+    years = frame['Model Year'].value_counts().sort_index()
+    assert years[2023] > years[2018] > years[2012]
+    assert years[synthetic.LAST_YEAR] < years[synthetic.LAST_YEAR - 1] / 2
+
+
+def test_deterministic():
+    pd.testing.assert_frame_equal(synthetic.generate(1000, seed=1), synthetic.generate(1000, seed=1))
+    assert not synthetic.generate(1000, seed=1).equals(synthetic.generate(1000, seed=2))
+
+
+def test_written_file_loads_with_the_schema(tmp_path):
+    first = synthetic.write_csv(str(tmp_path / 'first.csv'), 2_500, seed=4, chunk_rows=1_000)
+    second = synthetic.write_csv(str(tmp_path / 'second.csv'), 2_500, seed=4, chunk_rows=1_000)
+    with open(first, 'rb') as left, open(second, 'rb') as right:
+        assert left.read() == right.read()
+    frame = load_dataset(first).frame
+    assert len(frame) == 2_500
+    assert set(frame.columns) == set(ANALYSIS_COLUMNS)
+
+
+def test_regressions_only_flag_slower_sections():
+    def results(seconds):
+        return {'results': [{'rows': 1000, 'sections': {name: {'seconds': value} for name, value in seconds.items()}}]}
+
+    baseline = results({'load': 1.0, 'clean': 1.0, 'tiny': 0.001})
+    current = results({'load': 1.1, 'clean': 2.0, 'tiny': 0.001 + NOISE_SECONDS / 2, 'new': 5.0})
+    assert regressions(current, baseline) == [(1000, 'clean', 1.0, 2.0)]
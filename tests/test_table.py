@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from electrapulse.cleaning import clean
+from electrapulse.filters import Selection
+from electrapulse.loader import load_dataset
+from electrapulse.table import sort_order, table_view
+
+
+@pytest.fixture(scope='module')
+def uncleaned(registrations_csv):
+    # Nothing dropped, so the columns keep their missing values.
+    return clean(load_dataset(registrations_csv).frame, {})
+
+
+@pytest.mark.parametrize('ascending', [True, False])
+@pytest.mark.parametrize('column', ['County', 'Model Year', 'Electric Range', 'Model'])
+def test_sort_matches_pandas_stable_sort(uncleaned, column, ascending):
+    frame = uncleaned.frame
+    expected = frame[column].sort_values(ascending=ascending, kind='stable', na_position='last').index
+    np.testing.assert_array_equal(sort_order(uncleaned, column, ascending), expected)
+
+
+def test_keeps_the_most_recent_orders(uncleaned):
+    sort_order.cache_clear()
+    orders = [sort_order(uncleaned, column) for column in ('County', 'City', 'Make', 'Model', 'Model Year')]
+    assert sort_order(uncleaned, 'Model Year') is orders[-1]
+    assert sort_order.cache.nbytes() == sum(order.nbytes for order in orders[1:])
+    assert sort_order(uncleaned, 'County') is not orders[0]
+    assert sort_order.cache.evict() == orders[1].nbytes
+
+
+@pytest.mark.parametrize('selection', [Selection(), Selection(counties=('King',), years=(2016, 2021))])
+def test_pages_match_pandas(cleaned, selection):
+    frame = cleaned.frame
+    expected = frame
+    if selection:
+        expected = frame[frame['County'].isin(selection.counties) & frame['Model Year'].between(*selection.years)]
+    expected = expected.sort_values('Make', ascending=False, kind='stable')
+    view = table_view(cleaned, selection, 'Make', ascending=False)
+    assert view.total == len(expected)
+    assert view.pages(100) == -(-len(expected) // 100)
+    for number in (0, 3, view.pages(100) - 1):
+        pd.testing.assert_frame_equal(view.page(number, 100), expected.iloc[number * 100:(number + 1) * 100])
+
+
+def test_unsorted_pages_keep_file_order(cleaned):
+    view = table_view(cleaned)
+    assert view.order is None and view.total == len(cleaned.frame)
+    pd.testing.assert_frame_equal(view.page(2, 25), cleaned.frame.iloc[50:75])
+    assert table_view(cleaned, Selection(makes=('NO SUCH MAKE',))).pages(25) == 1